@@ -0,0 +1,104 @@
+"""Shared per-file source analysis.
+
+A Python file is parsed once into a ``PythonAnalysis`` record (symbols,
+docstrings, imports and line spans). The semantic sampler and the summarizer
+both read the record instead of parsing the text again. The record lives
+on the file's candidate (its lazy ``analysis``), not in a global cache, so
+sources are released with the candidate.
+"""
+from __future__ import annotations
+
+import ast
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True)
+class PySymbol:
+    """A class or function definition found in a Python file."""
+
+    kind: str  # class|function
+    name: str
+    lineno: int
+    end_lineno: int
+    first_lineno: int  # including decorators
+    signature: str
+    docstring: Optional[str]
+    top_level: bool
+
+
+@dataclass(frozen=True)
+class PythonAnalysis:
+    """Everything downstream stages need from one ``ast.parse``."""
+
+    module_doc: Optional[str]
+    symbols: Tuple[PySymbol, ...]  # ast.walk order
+    imports: Tuple[str, ...]  # top-level imported names
+    modules: Tuple[str, ...] = ()  # imported module paths anywhere in the file; relative ones keep their dots
+
+    @property
+    def classes(self) -> Tuple[str, ...]:
+        return tuple(s.name for s in self.symbols if s.top_level and s.kind == "class")
+
+    @property
+    def functions(self) -> Tuple[str, ...]:
+        return tuple(s.name for s in self.symbols if s.top_level and s.kind == "function")
+
+
+def _signature(node: ast.AST) -> str:
+    if isinstance(node, ast.ClassDef):
+        bases = ", ".join(ast.unparse(base) for base in node.bases) if node.bases else ""
+        if bases:
+            return f"class {node.name}({bases})"
+        return f"class {node.name}"
+    args = ast.unparse(node.args) if node.args else ""
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    decorators = "".join(f"@{ast.unparse(d)}\n" for d in node.decorator_list)
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    return f"{decorators}{prefix} {node.name}({args}){returns}"
+
+
+def analyze_python(source: str) -> Optional[PythonAnalysis]:
+    """Parse ``source`` once; return None when it is not valid Python."""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+
+    top = {id(n) for n in tree.body}
+    symbols = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append(PySymbol(
+                kind="class" if isinstance(node, ast.ClassDef) else "function",
+                name=node.name,
+                lineno=node.lineno,
+                end_lineno=node.end_lineno or node.lineno,
+                first_lineno=min([node.lineno] + [d.lineno for d in node.decorator_list]),
+                signature=_signature(node),
+                docstring=ast.get_docstring(node),
+                top_level=id(node) in top,
+            ))
+
+    imports: list[str] = []
+    for n in tree.body:
+        if isinstance(n, (ast.Import, ast.ImportFrom)):
+            imports.extend(a.name for a in n.names)
+
+    modules: list[str] = []
+    for n in ast.walk(tree):
+        if isinstance(n, ast.Import):
+            modules.extend(a.name for a in n.names)
+        elif isinstance(n, ast.ImportFrom):
+            base = "." * n.level + (n.module or "")
+            modules.append(base)
+            # ``from pkg import mod`` may name a submodule rather than an attribute
+            sep = "." if n.module else ""
+            modules.extend(f"{base}{sep}{a.name}" for a in n.names if a.name != "*")
+
+    return PythonAnalysis(
+        module_doc=ast.get_docstring(tree),
+        symbols=tuple(symbols),
+        imports=tuple(imports),
+        modules=tuple(dict.fromkeys(modules)),
+    )
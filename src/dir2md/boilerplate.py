@@ -0,0 +1,99 @@
+"""Shared license/boilerplate header detection.
+
+The first ``HEADER_SCAN_LINES`` lines of every candidate are hashed after
+normalization (comment markers and surrounding space dropped, digits folded
+so copyright years match). Comment lines that recur in many files are
+boilerplate; a file's header is the run of boilerplate comment lines at its
+top, so shared code such as common imports is never cut. Headers shared by
+enough files are cut from each file's content before simhash and token
+estimation and emitted once with the number of files they were removed from.
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+HEADER_SCAN_LINES = 40
+HEADER_SCAN_BYTES = 16 * 1024
+MIN_HEADER_FILES = 3
+MIN_HEADER_SHARE = 0.1  # of all candidates
+MIN_HEADER_LINES = 3
+
+_COMMENT_LINE = re.compile(r"^\s*(?:#(?![A-Za-z])|//|/\*|\*|--|;|<!--|-->|$)")  # not #include/#define
+_COMMENT_MARKERS = re.compile(r"^[\s#/*;!<>\-=%]+|[\s/*\->=]+$")
+_DIGITS = re.compile(r"\d+")
+
+
+@dataclass(frozen=True)
+class SharedHeader:
+    """A header block and how many files it was elided from."""
+
+    text: str
+    files: int
+
+
+def _norm(line: str) -> str:
+    """Line content without comment markers; empty for blank or punctuation-only lines."""
+    return _DIGITS.sub("0", _COMMENT_MARKERS.sub("", line))
+
+
+def _balanced(lines: Sequence[str]) -> bool:
+    """Cutting these lines must not leave a block comment open."""
+    text = "".join(lines)
+    return text.count("/*") == text.count("*/") and text.count("<!--") == text.count("-->")
+
+
+def _header_span(lines: Sequence[str], shared: set) -> Optional[Tuple[int, int, Tuple[str, ...]]]:
+    start = 1 if lines and lines[0].startswith("#!") else 0
+    end, signature = start, []
+    for ln in lines[start:]:
+        norm = _norm(ln)
+        if not _COMMENT_LINE.match(ln) or (norm and norm not in shared):
+            break
+        if norm:
+            signature.append(norm)
+        end += 1
+    if len(signature) < MIN_HEADER_LINES or not _balanced(lines[start:end]):
+        return None
+    return start, end, tuple(signature)
+
+
+def find_shared_headers(heads: Dict[Hashable, List[str]]) -> Tuple[Dict[Hashable, Tuple[int, int]], List[SharedHeader]]:
+    """Detect shared headers in ``key -> first lines (with line endings)``.
+
+    Returns the ``(start, end)`` line span to cut per key and the distinct
+    headers, most common first.
+    """
+    threshold = max(MIN_HEADER_FILES, math.ceil(len(heads) * MIN_HEADER_SHARE))
+    counts: Counter = Counter()
+    for lines in heads.values():
+        counts.update({norm for norm in map(_norm, lines) if norm})
+    shared = {norm for norm, n in counts.items() if n >= threshold}
+    if not shared:
+        return {}, []
+
+    spans: Dict[Hashable, Tuple[int, int, Tuple[str, ...]]] = {}
+    for key, lines in heads.items():
+        span = _header_span(lines, shared)
+        if span is not None:
+            spans[key] = span
+    by_signature = Counter(sig for _, _, sig in spans.values())
+
+    cuts: Dict[Hashable, Tuple[int, int]] = {}
+    canonical: Dict[Tuple[str, ...], str] = {}
+    for key, (start, end, sig) in spans.items():
+        if by_signature[sig] < threshold:
+            continue
+        cuts[key] = (start, end)
+        canonical.setdefault(sig, "".join(heads[key][start:end]).rstrip())
+    headers = [SharedHeader(canonical[sig], n) for sig, n in by_signature.most_common() if sig in canonical]
+    return cuts, headers
+
+
+def cut_lines(text: str, span: Tuple[int, int]) -> str:
+    start, end = span
+    lines = text.splitlines(keepends=True)
+    return "".join(lines[:start] + lines[end:])
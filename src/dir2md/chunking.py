@@ -0,0 +1,113 @@
+"""Content-defined chunking and cross-file chunk dedup.
+
+``iter_chunks`` cuts a text into chunks of lines with a gear hash: each line
+is hashed (CRC32 of its stripped content) into ``h = (h << 1) + crc``, and a
+chunk ends where the low ``GEAR_BITS`` bits of ``h`` are zero. Those bits
+depend only on the last ``GEAR_BITS`` lines, so boundaries follow the
+content: a block pasted into another file is cut the same way wherever it
+lands. The scan is one streaming pass, each line hashed once. ``ChunkStore``
+remembers where each chunk was first emitted and names the later copies.
+"""
+from __future__ import annotations
+
+import hashlib
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+GEAR_BITS = 4  # a boundary every ~16 lines on average
+MIN_CHUNK_LINES = 4
+MAX_CHUNK_LINES = 64
+MIN_DUP_CHARS = 120  # shorter chunks cost about as much as the reference that would replace them
+
+_MASK = (1 << GEAR_BITS) - 1
+_WORD = (1 << 64) - 1
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """Lines ``first..last`` (0-based, end exclusive) of a text and their digest."""
+
+    first: int
+    last: int
+    digest: str
+    chars: int  # non-whitespace characters
+
+
+def iter_chunks(lines: Iterable[str]) -> Iterator[Chunk]:
+    """Content-defined chunks of ``lines``; leading and trailing whitespace is ignored."""
+    h, start, chars = 0, 0, 0
+    digest = hashlib.blake2b(digest_size=8)
+    i = -1
+    for i, line in enumerate(lines):
+        data = line.strip().encode("utf-8")
+        h = ((h << 1) + zlib.crc32(data)) & _WORD
+        digest.update(data + b"\n")
+        chars += len(data)
+        size = i + 1 - start
+        if (size >= MIN_CHUNK_LINES and not h & _MASK) or size >= MAX_CHUNK_LINES:
+            yield Chunk(start, i + 1, digest.hexdigest(), chars)
+            start, chars = i + 1, 0
+            digest = hashlib.blake2b(digest_size=8)
+    if start <= i:
+        yield Chunk(start, i + 1, digest.hexdigest(), chars)
+
+
+def chunk_text(text: str) -> Tuple[Chunk, ...]:
+    return tuple(iter_chunks(text.splitlines()))
+
+
+def dup_marker(first: int, last: int, source: str, src_first: int, src_last: int) -> str:
+    return f"<!-- duplicate: {last - first} lines, same as {source}:{src_first + 1}-{src_last} -->"
+
+
+class ChunkStore:
+    """Chunks already emitted in a run, by digest, with where they first appeared."""
+
+    def __init__(self) -> None:
+        self._first: Dict[str, Tuple[str, int, int]] = {}
+
+    def duplicates(self, chunks: Sequence[Chunk]) -> Tuple[Tuple[int, int, str], ...]:
+        """``(first, last, marker)`` for each chunk emitted before, in line order."""
+        out = []
+        for chunk in chunks:
+            seen = self._first.get(chunk.digest) if chunk.chars >= MIN_DUP_CHARS else None
+            if seen is not None:
+                out.append((chunk.first, chunk.last, dup_marker(chunk.first, chunk.last, *seen)))
+        return tuple(out)
+
+    def add(self, rel: str, chunks: Sequence[Chunk], shown: Sequence[Tuple[int, int]]) -> None:
+        """Record the chunks of ``rel`` that lie wholly inside the ``shown`` line ranges."""
+        ranges = sorted(shown)
+        j = 0
+        for chunk in chunks:
+            while j < len(ranges) and ranges[j][1] < chunk.last:
+                j += 1
+            if j == len(ranges):
+                break
+            if chunk.chars >= MIN_DUP_CHARS and ranges[j][0] <= chunk.first:
+                self._first.setdefault(chunk.digest, (rel, chunk.first, chunk.last))
+
+
+def replace_duplicates(
+    first: int,
+    last: int,
+    dups: Sequence[Tuple[int, int, str]],
+    lines_of: Callable[[int, int], List[str]],
+) -> List[str]:
+    """Lines ``first..last`` with each duplicate chunk wholly inside them replaced by its marker.
+
+    ``dups`` index raw lines, so the kept stretches between them are fetched
+    through ``lines_of(a, b)`` one by one: masking can merge lines (a
+    multi-line key becomes one placeholder), which must not shift the chunks.
+    """
+    out: List[str] = []
+    pos = first
+    for a, b, marker in dups:
+        if a < pos or b > last:
+            continue
+        out.extend(lines_of(pos, a))
+        out.append(marker)
+        pos = b
+    out.extend(lines_of(pos, last))
+    return out
@@ -20,7 +20,6 @@ from .core import Config
 from .orchestrator import run_pipeline
 from . import __version__
 from .manifest import sha256_string
-from .compressors.gravitas import GravitasCompressor
 from .query.expander import QueryExpander
 from .query.corrector import QueryCorrector
 
@@ -121,6 +120,21 @@ _CONFIG_KEYS = {
     "masking",
     "mask_patterns",
     "mask_pattern_files",
+    "mask_profile",
+    "mask_timeout",
+    "strip_comments",
+    "symbol_index",
+    "elide_headers",
+    "tokenizer",
+    "optimize",
+    "rank_centrality",
+    "early_stop",
+    "rollup",
+    "chunk_dedup",
+    "dir_quota",
+    "ext_quota",
+    "tree_depth",
+    "tree_entries",
     "defaults_file",  # Added in v1.2.1: custom defaults file path
 }
 
@@ -201,13 +215,19 @@ def _load_pyproject_config() -> dict[str, Any]:
                 else:
                     sanitized[key] = str(value)
                 continue
-            if key in {"budget_tokens", "max_file_tokens", "dedup", "sample_head", "sample_tail", "max_bytes", "max_lines"}:
+            if key in {"budget_tokens", "max_file_tokens", "dedup", "sample_head", "sample_tail", "max_bytes", "max_lines", "tree_depth", "tree_entries"}:
                 try:
                     sanitized[key] = int(value)
                 except (TypeError, ValueError):
                     continue
                 continue
-            if key in {"respect_gitignore", "follow_symlinks", "emit_manifest", "stats", "capsule", "dry_run", "no_timestamp", "explain"}:
+            if key in {"mask_timeout", "dir_quota", "ext_quota"}:
+                try:
+                    sanitized[key] = float(value)
+                except (TypeError, ValueError):
+                    continue
+                continue
+            if key in {"respect_gitignore", "follow_symlinks", "emit_manifest", "stats", "capsule", "dry_run", "no_timestamp", "explain", "mask_profile", "strip_comments", "symbol_index", "elide_headers", "optimize", "rank_centrality", "early_stop", "rollup", "chunk_dedup"}:
                 sanitized[key] = bool(value)
                 continue
             sanitized[key] = value
@@ -215,8 +235,13 @@ def _load_pyproject_config() -> dict[str, Any]:
     return {}
 
 
-def _load_patterns_from_file(source: str) -> list[str]:
-    """Load regex patterns from a file or file:// URI."""
+def _load_patterns_from_file(source: str, anchors: dict[str, list[str]] | None = None) -> list[str]:
+    """Load regex patterns from a file or file:// URI.
+
+    JSON entries may be objects ``{"pattern": ..., "anchors": [...]}``; the
+    anchors (literal prefixes of every match) are collected into ``anchors``
+    so masking can skip the pattern on files that never contain them.
+    """
     raw = source
     if raw.startswith("file://"):
         raw = raw[7:]
@@ -239,14 +264,20 @@ def _load_patterns_from_file(source: str) -> list[str]:
         except json.JSONDecodeError as exc:
             print(f"[WARN] Could not parse JSON mask pattern file {source!r}: {exc}")
             return patterns
-        if isinstance(data, list):
-            patterns.extend(str(item) for item in data)
-        elif isinstance(data, dict):
-            items = data.get("patterns")
-            if isinstance(items, list):
-                patterns.extend(str(item) for item in items)
-            elif items:
-                patterns.append(str(items))
+        items = data.get("patterns") if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            items = [items] if items else []
+        for item in items:
+            if isinstance(item, dict):
+                pattern = item.get("pattern")
+                if not pattern:
+                    continue
+                patterns.append(str(pattern))
+                declared = item.get("anchors")
+                if anchors is not None and isinstance(declared, list) and declared:
+                    anchors[str(pattern)] = [str(lit) for lit in declared]
+            else:
+                patterns.append(str(item))
     else:
         for line in text.splitlines():
             line = line.strip()
@@ -255,7 +286,11 @@ def _load_patterns_from_file(source: str) -> list[str]:
     return patterns
 
 
-def _resolve_custom_mask_patterns(explicit: list[str] | None, files: list[str] | None) -> list[str]:
+def _resolve_custom_mask_patterns(
+    explicit: list[str] | None,
+    files: list[str] | None,
+    anchors: dict[str, list[str]] | None = None,
+) -> list[str]:
     combined: list[str] = []
     seen: set[str] = set()
     for pattern in explicit or []:
@@ -263,7 +298,7 @@ def _resolve_custom_mask_patterns(explicit: list[str] | None, files: list[str] |
             seen.add(pattern)
             combined.append(pattern)
     for source in files or []:
-        for pattern in _load_patterns_from_file(source):
+        for pattern in _load_patterns_from_file(source, anchors):
             if pattern and pattern not in seen:
                 seen.add(pattern)
                 combined.append(pattern)
@@ -299,6 +334,19 @@ def main(argv: list[str] | None = None) -> int:
     ap.add_argument("--follow-symlinks", action="store_true")
     ap.add_argument("--max-bytes", type=positive_int)
     ap.add_argument("--max-lines", type=positive_int)
+    ap.add_argument("--strip-comments", action="store_true", help="Drop comments and blank lines from code before sampling (py, js/ts, c-family, go, rust, shell, yaml, toml)")
+    ap.add_argument("--tokenizer", help="Count tokens with a local BPE vocabulary (.tiktoken rank file or GPT-2 style merges.txt) instead of the len/4 estimate")
+    ap.add_argument("--elide-headers", action="store_true", help="Cut license/boilerplate headers shared by many files and emit each once with a file count")
+    ap.add_argument("--optimize", action="store_true", help="Choose inline, sampled, summary, ref or omitted per file to maximize value (query match, centrality, recency) within the budget")
+    ap.add_argument("--rank-centrality", action="store_true", help="Without --query, order files by import-graph centrality (entry points and most-imported modules first) instead of walk order")
+    ap.add_argument("--early-stop", action="store_true", help="Rank files from path and size alone and stop reading once the budget is full (runtime scales with the budget, not the repository)")
+    ap.add_argument("--rollup", action="store_true", help="Summarize directories whose files do not fit (file and symbol counts, top exports, key files) within a fixed share of the budget")
+    ap.add_argument("--chunk-dedup", action="store_true", help="In inline mode, replace blocks of lines already emitted by an earlier file with a short reference (content-defined chunking)")
+    ap.add_argument("--dir-quota", type=float, help="With --optimize, cap each top-level directory at this share of the budget (e.g. 0.3)")
+    ap.add_argument("--ext-quota", type=float, help="With --optimize, cap each file extension at this share of the budget")
+    ap.add_argument("--tree-depth", type=positive_int, help="Collapse directories deeper than this into one aggregate line (files, bytes, ~tokens, top extensions); default 6")
+    ap.add_argument("--tree-entries", type=positive_int, help="Show at most this many entries per directory in the tree; the rest become one '... N more' line; default 40")
+    ap.add_argument("--symbol-index", action="store_true", help="Add a cross-file symbol index (name, kind, file, lines) and write a ctags file next to the output")
     ap.add_argument("--query", help="Optional search query to prioritize matching files/snippets")
 
     ap.add_argument("--emit-manifest", action="store_true", help="Write JSON manifest (raw preset overrides to off)")
@@ -309,11 +357,13 @@ def main(argv: list[str] | None = None) -> int:
     ap.add_argument("--masking", choices=["off", "basic", "advanced"], help="Secret masking mode (default: basic, advanced requires Pro license)")
     ap.add_argument("--mask-pattern", action="append", dest="mask_patterns", help="Additional custom regex patterns to mask (applies alongside built-in rules)")
     ap.add_argument("--mask-pattern-file", action="append", dest="mask_pattern_files", help="Load custom mask regex patterns from file (JSON array or newline separated list). Supports file:// URIs.")
+    ap.add_argument("--mask-profile", action="store_true", help="Report time and match counts for the slowest masking rules")
+    ap.add_argument("--mask-timeout", type=float, help="Per-file time budget (seconds) for custom mask patterns; patterns that exceed it are disabled and reported")
     ap.add_argument("--output-format", choices=["md", "json", "jsonl", "both"], help="Output format: md (human), json/jsonl (LLM); default produces md+jsonl")
     ap.add_argument("--progress", choices=["full", "dots", "none"], help="Progress verbosity for CLI output (default: dots)")
     ap.add_argument("--spicy", dest="spicy", action="store_true", default=True, help="Enable spicy risk report (default: on)")
     ap.add_argument("--no-spicy", dest="spicy", action="store_false", help="Disable spicy risk report")
-    ap.add_argument("--spicy-strict", action="store_true", help="Exit non-zero if spicy finds high/critical findings")
+    ap.add_argument("--spicy-strict", action="store_true", help="Exit non-zero if spicy finds high/critical findings; adds a masking pass over the parts of every candidate that were not emitted")
     ap.add_argument("-V", "--version", action="version", version=f"dir2md {__version__}")
 
     if config_from_file:
@@ -347,6 +397,7 @@ def main(argv: list[str] | None = None) -> int:
     # Build final exclude list (system < project < user)
     # Note: User excludes come first to ensure they take precedence in pathspec matching
     final_excludes = user_excludes + project_excludes + system_defaults
+    custom_mask_anchors: dict[str, list[str]] = {}
 
     cfg = Config(
         root=root,
@@ -368,7 +419,19 @@ def main(argv: list[str] | None = None) -> int:
         dedup_bits=int(ns.dedup) if ns.dedup is not None else 16,
         sample_head=int(ns.sample_head) if ns.sample_head is not None else 120,
         sample_tail=int(ns.sample_tail) if ns.sample_tail is not None else 40,
-        strip_comments=False,
+        strip_comments=bool(ns.strip_comments or False),
+        symbol_index=bool(ns.symbol_index or False),
+        elide_headers=bool(ns.elide_headers or False),
+        tokenizer=ns.tokenizer,
+        optimize=bool(ns.optimize or False),
+        rank_centrality=bool(ns.rank_centrality or False),
+        early_stop=bool(ns.early_stop or False),
+        rollup=bool(ns.rollup or False),
+        chunk_dedup=bool(ns.chunk_dedup or False),
+        dir_quota=float(ns.dir_quota) if ns.dir_quota else None,
+        ext_quota=float(ns.ext_quota) if ns.ext_quota else None,
+        tree_max_depth=int(ns.tree_depth) if ns.tree_depth is not None else 6,
+        tree_max_entries=int(ns.tree_entries) if ns.tree_entries is not None else 40,
         emit_manifest=bool(ns.emit_manifest if ns.emit_manifest is not None else True),
         preset=str(ns.preset or "pro"),
         explain_capsule=bool(ns.explain or False),
@@ -377,10 +440,15 @@ def main(argv: list[str] | None = None) -> int:
         custom_mask_patterns=_resolve_custom_mask_patterns(
             list(ns.mask_patterns or []),
             list(ns.mask_pattern_files or []),
+            custom_mask_anchors,
         ),
+        custom_mask_anchors=custom_mask_anchors,
+        mask_profile=bool(ns.mask_profile or False),
+        mask_timeout=float(ns.mask_timeout) if ns.mask_timeout else None,
         query=ns.query,
         output_format=str(ns.output_format or "md"),
         spicy=bool(ns.spicy),
+        spicy_strict=bool(ns.spicy_strict),
         # Note: progress handled in CLI output, not in Config
     )
 
@@ -400,6 +468,8 @@ def main(argv: list[str] | None = None) -> int:
 
     preset_opts = PRESET_OPTIMIZATIONS.get(cfg.preset, {'gravitas': 'off', 'expand': False})
     gravitas_level = preset_opts['gravitas']
+    # Compression runs inside the report so the budget is planned on compressed sizes
+    cfg.gravitas = gravitas_level if gravitas_level != "off" else None
     enable_expand = preset_opts['expand'] and bool(cfg.query)
 
     # Phase 2: Query typo correction (auto-enabled when query provided)
@@ -451,12 +521,10 @@ def main(argv: list[str] | None = None) -> int:
             _print_status("INFO", f"DRY_RUN format={fmt} preset={cfg.preset} mode={cfg.llm_mode} est_tokens~{cfg.budget_tokens} md={h}", ns.progress or "dots")
             continue
 
-        # Phase 1: Apply Gravitas compression if enabled (v1.2.0, auto-activated by preset)
+        # Phase 1: Gravitas compression (v1.2.0, auto-activated by preset) was applied by the report
         final_content = content
-        if gravitas_level and gravitas_level != "off" and fmt == "md":
-            compressor = GravitasCompressor(level=gravitas_level)
-            compressed_content = compressor.compress(content)
-            stats = compressor.get_stats(content)
+        stats = cfg.gravitas_stats
+        if cfg.gravitas and fmt == "md" and stats:
 
             # Add compression stats as HTML comment at the end
             stats_comment = (
@@ -465,7 +533,7 @@ def main(argv: list[str] | None = None) -> int:
                 f"({stats['original_size']} -> {stats['compressed_size']} bytes, "
                 f"{stats['symbols_used']} symbols, auto: {cfg.preset}) -->\n"
             )
-            final_content = compressed_content + stats_comment
+            final_content = content + stats_comment
             _print_status("INFO", f"Gravitas-{gravitas_level}: {stats['reduction_percent']:.1f}% reduction (auto: {cfg.preset})", ns.progress or "dots")
 
         out_path.write_text(final_content, encoding="utf-8")
@@ -480,9 +548,14 @@ def main(argv: list[str] | None = None) -> int:
         for fmt, path in outputs.items():
             _print_status("INFO", f"WROTE format={fmt} path={path}", ns.progress or "dots")
 
+    for line in cfg.mask_profile_lines:
+        _print_status("INFO", line, "none" if ns.progress == "none" else "full")
+    for pattern, reason in cfg.mask_disabled_rules.items():
+        _print_status("WARN", f"MASK_DISABLED pattern={pattern!r} ({reason})", ns.progress or "dots")
+
     # Spicy strict exit if high/critical exists
     if ns.spicy_strict and cfg.spicy:
-        counts = getattr(cfg, "spicy_counts", {}) or {}
+        counts = cfg.spicy_counts
         has_high = counts.get("high", 0) or counts.get("critical", 0)
         if has_high:
             _print_status("WARN", "SPICY_STRICT triggered (high/critical findings)", ns.progress or "dots")
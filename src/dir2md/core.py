@@ -1,15 +1,21 @@
 """Core config and generation orchestrator helpers."""
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 import json
 
+from .compressors.gravitas import GravitasCompressor
 from .manifest import write_manifest
-from .spicy import evaluate_spicy
+from .masking import MaskingSession
+from .spicy import evaluate_spicy, scan_secrets
 from .walker import collect_files
-from .selector import build_candidates
+from .tree import TREE_BUDGET_SHARE, fit_tree, render_tree
+from .selector import build_candidates, plan_stages
+from .rollup import ROLLUP_BUDGET_SHARE, build_rollups, fit_rollups, rollup_record
+from .symbols import format_symbol_index, sort_symbols, symbol_record, write_ctags
+from .token import TokenLedger, load_tokenizer, set_tokenizer
 from .renderer import (
     render_blocks,
     build_manifest,
@@ -25,6 +31,8 @@ class Stats:
     total_omitted: int = 0
     total_with_contents: int = 0
     est_tokens_prompt: int = 0
+    comment_bytes_saved: int = 0
+    token_sections: Dict[str, int] = field(default_factory=dict)  # TokenLedger sections
 
 
 @dataclass
@@ -49,15 +57,38 @@ class Config:
     sample_head: int = 120
     sample_tail: int = 40
     strip_comments: bool = False
+    symbol_index: bool = False
+    elide_headers: bool = False
+    tokenizer: Optional[str] = None  # BPE vocabulary file; None keeps the len/4 heuristic
+    optimize: bool = False  # pick a tier per file by value per token instead of first-fit
+    rank_centrality: bool = False  # without a query, order files by import-graph centrality instead of walk order
+    early_stop: bool = False  # rank from metadata and stop reading once the budget is full
+    rollup: bool = False  # summarize directories whose files do not fit, within a fixed share of the budget
+    chunk_dedup: bool = False  # replace chunks an earlier inline block already emitted with a marker
+    gravitas: Optional[str] = None  # Gravitas level for md output; blocks are budgeted at compressed size
+    tree_max_depth: Optional[int] = 6  # deeper directories collapse to aggregate lines
+    tree_max_entries: Optional[int] = 40  # entries shown per directory before a "... N more" line
+    dir_quota: Optional[float] = None  # max share of the budget per top-level directory (with optimize)
+    ext_quota: Optional[float] = None  # max share of the budget per extension (with optimize)
     emit_manifest: bool = True
     preset: str = "pro"
     explain_capsule: bool = False
     no_timestamp: bool = False
     masking_mode: str = "basic"
     custom_mask_patterns: List[str] = field(default_factory=list)
+    custom_mask_anchors: Dict[str, List[str]] = field(default_factory=dict)
+    mask_profile: bool = False
+    mask_timeout: Optional[float] = None
     query: Optional[str] = None
     output_format: str = "md"
     spicy: bool = False
+    spicy_strict: bool = False  # scan every candidate for secrets, not only what is emitted
+    # Filled in by generate_markdown_report for the CLI to report
+    mask_profile_lines: List[str] = field(default_factory=list)
+    mask_disabled_rules: Dict[str, str] = field(default_factory=dict)  # custom pattern -> why it was disabled
+    spicy_score: int = 0
+    spicy_counts: Dict[str, int] = field(default_factory=dict)
+    gravitas_stats: Optional[dict] = None  # compressor stats of the last md report
 
 
 _DEFAULT_ONLY_EXT = {"py", "ts", "tsx", "js", "jsx", "md", "txt", "toml", "yaml", "yml", "json", ""}
@@ -87,6 +118,14 @@ def apply_preset(cfg: Config) -> Config:
         cfg.dedup_bits = 0
         cfg.only_ext = None
         cfg.emit_manifest = False
+        cfg.strip_comments = False
+        cfg.elide_headers = False
+        cfg.optimize = False
+        cfg.rollup = False
+        cfg.chunk_dedup = False
+        cfg.tree_max_depth = None
+        cfg.tree_max_entries = None
+        cfg.gravitas = None
     elif cfg.preset == "pro":
         cfg.llm_mode = cfg.llm_mode or "summary"
     elif cfg.preset == "fast":
@@ -106,8 +145,9 @@ def generate_markdown_report(cfg: Config) -> str:
     if not root.is_dir():
         raise NotADirectoryError(f"Path is not a directory: {root}")
 
+    set_tokenizer(load_tokenizer(cfg.tokenizer) if cfg.tokenizer else None)
     stats = Stats()
-    files, tree_lines, is_included, is_omitted = collect_files(
+    files, tree, is_included, is_omitted = collect_files(
         root,
         cfg.include_globs,
         cfg.exclude_globs,
@@ -117,31 +157,99 @@ def generate_markdown_report(cfg: Config) -> str:
         stats,
     )
 
-    candidates, candidate_hash = build_candidates(cfg, files, root, is_included, is_omitted)
-    selected_blocks, json_entries, est_total = render_blocks(cfg, root, candidates)
+    masker = MaskingSession(
+        cfg.masking_mode,
+        cfg.custom_mask_patterns,
+        cfg.custom_mask_anchors,
+        profile=cfg.mask_profile,
+        custom_timeout=cfg.mask_timeout,
+    )
+    compressor = GravitasCompressor(level=cfg.gravitas) if cfg.gravitas and cfg.output_format == "md" else None
+    ledger = TokenLedger(transform=compressor.compress if compressor else None)
+    tree_lines: List[str] = []
+    block_budget = cfg.budget_tokens
+    if cfg.output_format == "md":
+        if cfg.preset == "raw":
+            tree_lines = render_tree(tree, str(root))
+        else:
+            # The tree is part of the prompt: bound it to its share and pack blocks into the rest
+            share = 1.0 if cfg.llm_mode == "off" else TREE_BUDGET_SHARE
+            tree_lines = fit_tree(tree, str(root), cfg.tree_max_depth, cfg.tree_max_entries, int(cfg.budget_tokens * share), ledger.measure)
+        tree_tokens = ledger.cost(None, "tree", "\n".join(tree_lines))
+        ledger.charge("tree", tree_tokens)
+        if cfg.preset != "raw":
+            block_budget = max(0, block_budget - tree_tokens)
+    plan = plan_stages(cfg)
+    # Roll-ups hold back a fixed share for capsules; whatever the blocks leave over adds to it
+    reserve = min(block_budget, int(cfg.budget_tokens * ROLLUP_BUDGET_SHARE)) if plan.rollup else 0
+    rollups = {}
+    capsules = []
+    symbols = []
+    symbol_section = None
+    try:
+        candidates, candidate_hash, shared_headers = build_candidates(cfg, files, root, is_included, is_omitted, stats)
+        # Shared headers are emitted once, masked like any file text, and charged before the blocks
+        shared_headers = [replace(h, text=masker.mask(h.text)) for h in shared_headers]
+        ledger.charge("headers", sum(ledger.cost(i, "header", h.text) for i, h in enumerate(shared_headers)))
+        if plan.symbols:
+            # The index covers every candidate, so it is known, and charged, before packing too
+            symbols = sort_symbols(sym for rec in candidates for sym in rec["symbols"])
+            symbol_section = format_symbol_index(symbols)
+            ledger.charge("symbols", ledger.cost(None, "symbols", symbol_section))
+        if cfg.preset != "raw":
+            block_budget = max(0, block_budget - ledger.total("headers", "symbols"))
+            reserve = min(reserve, block_budget)
+        selected_blocks, json_entries, est_total = render_blocks(cfg, root, candidates, masker=masker, ledger=ledger, budget=block_budget - reserve)
+        if plan.rollup:
+            shown = {p.relative_to(root).as_posix() for p, _, _ in selected_blocks}
+            # Files are read and digested in the roll-up workers; unreadable ones are left out
+            records = [(rec._rel(), rec) for rec in candidates]
+            rollups = build_rollups(records)
+            hidden = [rel for rel, rec in records if rel not in shown and rec["text"] is not None]
+            capsules = fit_rollups(rollups, hidden, block_budget - est_total, lambda path, text: ledger.cost(path, "rollup", text))
+            ledger.charge("rollup", sum(c.tokens for c in capsules))
+        if cfg.spicy and cfg.spicy_strict:
+            # The strict gate must not pass a secret just because its file did not fit
+            scan_secrets(masker, candidates)
+    finally:
+        masker.close()
+    cfg.mask_profile_lines = masker.profile.report_lines() if masker.profile else []
+    cfg.mask_disabled_rules = masker.disabled_rules
 
     stats.total_files_in_tree = len(files)
     stats.total_omitted = max(0, len(files) - len(selected_blocks))
     stats.total_with_contents = len(selected_blocks)
-    stats.est_tokens_prompt = est_total
+    if plan.symbols:
+        write_ctags(symbols, cfg.output.with_suffix('.tags'))
+    stats.est_tokens_prompt = ledger.total("tree", "blocks", "rollup", "headers", "symbols")
+    stats.token_sections = ledger.sections
 
     spicy_score = 0
     spicy_counts = {}
     spicy_findings = []
     spicy_bundle = None
     if cfg.spicy:
-        spicy_score, spicy_counts, spicy_findings = evaluate_spicy(cfg, stats, candidates, selected_blocks)
+        # Oversized files are masked while they stream in, so their hits are kept on the candidate
+        secret_hits = masker.hits + [hit for rec in candidates for hit in rec.secret_hits]
+        spicy_score, spicy_counts, spicy_findings = evaluate_spicy(
+            cfg, stats, candidates, selected_blocks, secret_hits=secret_hits, written_hits=masker.written_hits
+        )
         spicy_rows = [f.__dict__ if hasattr(f, "__dict__") else f for f in spicy_findings]
         spicy_bundle = {
             "score": spicy_score,
             "counts": spicy_counts,
             "findings": spicy_rows,
         }
-        cfg.spicy_score = spicy_score  # type: ignore[attr-defined]
-        cfg.spicy_counts = spicy_counts  # type: ignore[attr-defined]
+        spicy_text = (
+            render_spicy_md("", spicy_counts, spicy_score, spicy_rows)
+            if cfg.output_format == "md" else json.dumps(spicy_bundle, ensure_ascii=False)
+        )
+        ledger.charge("spicy", ledger.cost(None, "spicy", spicy_text))
+        cfg.spicy_score = spicy_score
+        cfg.spicy_counts = spicy_counts
 
     if cfg.emit_manifest:
-        full_manifest = build_manifest(cfg, stats, selected_blocks, root, candidate_hash, spicy_bundle)
+        full_manifest = build_manifest(cfg, stats, selected_blocks, root, candidate_hash, spicy_bundle, [e["mode"] for e in json_entries])
         write_manifest(full_manifest, cfg.output.with_suffix('.manifest.json'))
 
     if cfg.output_format == "json":
@@ -156,8 +264,13 @@ def generate_markdown_report(cfg: Config) -> str:
                     "total_omitted": stats.total_omitted,
                     "total_with_contents": stats.total_with_contents,
                     "est_tokens_prompt": stats.est_tokens_prompt,
+                    "comment_bytes_saved": stats.comment_bytes_saved,
+                    "token_sections": stats.token_sections,
                 },
                 "files": json_entries,
+                "symbols": [symbol_record(sym) for sym in symbols] if symbol_section is not None else None,
+                "shared_headers": [h.__dict__ for h in shared_headers],
+                "rollups": [rollup_record(rollups[c.path], c.hidden) for c in capsules],
                 "spicy": spicy_bundle,
             },
             ensure_ascii=False,
@@ -166,12 +279,18 @@ def generate_markdown_report(cfg: Config) -> str:
 
     if cfg.output_format == "jsonl":
         lines = [json.dumps(entry, ensure_ascii=False) for entry in json_entries]
+        lines.extend(json.dumps({"shared_header": h.__dict__}, ensure_ascii=False) for h in shared_headers)
+        lines.extend(json.dumps({"rollup": rollup_record(rollups[c.path], c.hidden)}, ensure_ascii=False) for c in capsules)
+        lines.extend(json.dumps({"symbol": symbol_record(sym)}, ensure_ascii=False) for sym in symbols)
         if spicy_bundle:
             lines.append(json.dumps({"spicy": spicy_bundle}, ensure_ascii=False))
         return "\n".join(lines)
 
-    md_output = render_markdown(cfg, tree_lines, selected_blocks, stats)
+    md_output = render_markdown(cfg, tree_lines, selected_blocks, stats, symbol_section, shared_headers, [c.text for c in capsules])
     if cfg.spicy and spicy_bundle:
         md_output = render_spicy_md(md_output, spicy_counts, spicy_score, spicy_bundle["findings"])
+    if compressor is not None:
+        cfg.gravitas_stats = compressor.get_stats(md_output)
+        md_output = compressor.compress(md_output)
 
     return md_output
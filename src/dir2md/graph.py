@@ -0,0 +1,130 @@
+"""Import graph and centrality ranking.
+
+Without a query, candidates are ordered by how central they are in the
+repository's import graph, so the modules everything else depends on (and
+the entry points that tie them together) are packed into the budget first.
+Each file's import specs are a per-candidate artifact (Python from the shared
+``PythonAnalysis``, JS/TS relative specifiers by regex); this module resolves
+them to files and runs PageRank over the resulting edges.
+"""
+from __future__ import annotations
+
+import posixpath
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .analysis import PythonAnalysis
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_MAX_ITER = 100
+PAGERANK_TOL = 1e-9
+MAX_AMBIGUOUS_TARGETS = 3  # a bare ``import utils`` matching more files than this is dropped
+
+JS_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs", ".mts", ".cts")
+_JS_SPECIFIER = re.compile(
+    r"""(?:\bfrom\s*|\bimport\s*\(?\s*|\brequire\s*\(\s*)(['"])(\.{1,2}/[^'"\n]*|\.{1,2})\1"""
+)
+ENTRY_POINT_NAMES = {"__main__.py", "main.py", "cli.py", "app.py", "manage.py", "wsgi.py", "asgi.py",
+                     "index.js", "index.ts", "main.js", "main.ts", "server.js", "server.ts"}
+_MAIN_GUARD = re.compile(r"""^if\s+__name__\s*==\s*['"]__main__['"]\s*:""", re.MULTILINE)
+
+
+def import_specs(path: Path, text: str, analysis: Optional[PythonAnalysis]) -> Tuple[str, ...]:
+    """Module paths (Python) or relative specifiers (JS/TS) that ``path`` imports."""
+    ext = path.suffix.lower()
+    if ext == ".py":
+        return analysis.modules if analysis is not None else ()
+    if ext in JS_EXTENSIONS:
+        return tuple(dict.fromkeys(m.group(2) for m in _JS_SPECIFIER.finditer(text)))
+    return ()
+
+
+def is_entry_point(path: Path, text: str) -> bool:
+    return path.name in ENTRY_POINT_NAMES or (path.suffix == ".py" and bool(_MAIN_GUARD.search(text)))
+
+
+class _Resolver:
+    """Map import specs to candidate paths (POSIX, relative to the root)."""
+
+    def __init__(self, files: Iterable[str]):
+        self.files = set(files)
+        self.modules: Dict[str, List[str]] = {}
+        for rel in sorted(self.files):
+            if not rel.endswith(".py"):
+                continue
+            parts = rel[:-3].split("/")
+            if parts[-1] == "__init__":
+                parts = parts[:-1]
+            # Every suffix is a possible import name, which covers src/ layouts
+            for k in range(len(parts)):
+                self.modules.setdefault(".".join(parts[k:]), []).append(rel)
+
+    def python(self, rel: str, spec: str) -> List[str]:
+        if spec.startswith("."):
+            level = len(spec) - len(spec.lstrip("."))
+            base = posixpath.dirname(rel)
+            for _ in range(level - 1):
+                base = posixpath.dirname(base)
+            target = posixpath.join(base, *spec[level:].split(".")) if spec[level:] else base
+            found = [t for t in (f"{target}.py", f"{target}/__init__.py") if t in self.files]
+            return found[:1]
+        targets = self.modules.get(spec, [])
+        return targets if len(targets) <= MAX_AMBIGUOUS_TARGETS else []
+
+    def js(self, rel: str, spec: str) -> List[str]:
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(rel), spec))
+        options = [target] + [target + ext for ext in JS_EXTENSIONS] + [f"{target}/index{ext}" for ext in JS_EXTENSIONS]
+        return next(([t] for t in options if t in self.files), [])
+
+
+def import_edges(specs: Mapping[str, Sequence[str]]) -> Dict[str, List[str]]:
+    """Resolve ``rel -> import specs`` into ``rel -> imported rels`` (self-imports dropped)."""
+    resolver = _Resolver(specs)
+    edges: Dict[str, List[str]] = {}
+    for rel, file_specs in specs.items():
+        resolve = resolver.python if rel.endswith(".py") else resolver.js
+        targets: List[str] = []
+        for spec in file_specs:
+            targets.extend(t for t in resolve(rel, spec) if t != rel and t not in targets)
+        edges[rel] = targets
+    return edges
+
+
+def pagerank(nodes: Sequence[str], edges: Mapping[str, Sequence[str]], damping: float = PAGERANK_DAMPING) -> Dict[str, float]:
+    """Power-iteration PageRank; rank flows from importer to imported."""
+    n = len(nodes)
+    if not n:
+        return {}
+    index = {node: i for i, node in enumerate(nodes)}
+    out = [[index[t] for t in edges.get(node, ()) if t in index] for node in nodes]
+    rank = [1.0 / n] * n
+    for _ in range(PAGERANK_MAX_ITER):
+        dangling = sum(rank[i] for i in range(n) if not out[i])
+        base = (1.0 - damping) / n + damping * dangling / n
+        nxt = [base] * n
+        for i, targets in enumerate(out):
+            if targets:
+                share = damping * rank[i] / len(targets)
+                for j in targets:
+                    nxt[j] += share
+        delta = sum(abs(a - b) for a, b in zip(nxt, rank))
+        rank = nxt
+        if delta < PAGERANK_TOL:
+            break
+    return {node: rank[i] for node, i in index.items()}
+
+
+def centrality(specs: Mapping[str, Sequence[str]], entry_points: Iterable[str] = ()) -> Dict[str, float]:
+    """PageRank over the import graph; entry points are lifted to the top score.
+
+    Entry points import much and are imported by little, so plain PageRank
+    ranks them last even though they explain how the pieces fit together.
+    """
+    nodes = list(specs)
+    scores = pagerank(nodes, import_edges(specs))
+    top = max(scores.values(), default=0.0)
+    for rel in entry_points:
+        if rel in scores:
+            scores[rel] = top
+    return scores
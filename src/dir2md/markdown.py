@@ -1,9 +1,10 @@
 from __future__ import annotations
 from datetime import datetime
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional, Sequence
 
 if TYPE_CHECKING:
+    from .boilerplate import SharedHeader
     from .core import Config, Stats
 
 
@@ -30,7 +31,7 @@ def _escape_fence(text: str, lang: str = "") -> tuple[str, str]:
     return fence, text
 
 
-def to_markdown(cfg: 'Config', tree_lines: list[str], file_blocks: list[tuple[Path, str, str]], stats: 'Stats') -> str:
+def to_markdown(cfg: 'Config', tree_lines: list[str], file_blocks: list[tuple[Path, str, str]], stats: 'Stats', symbol_section: Optional[str] = None, shared_headers: Sequence['SharedHeader'] = (), rollups: Sequence[str] = ()) -> str:
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     parts: list[str] = []
     parts.append("# Project Blueprint\n")
@@ -44,6 +45,13 @@ def to_markdown(cfg: 'Config', tree_lines: list[str], file_blocks: list[tuple[Pa
     parts.append("## Directory Tree\n")
     # Tree lines are safe (no user content), use standard fence
     parts.append("```\n" + "\n".join(tree_lines) + "\n```\n\n")
+    if shared_headers:
+        parts.append("## Shared Headers\n")
+        for header in shared_headers:
+            parts.append(f"Elided from {header.files} files:\n")
+            fence, escaped_text = _escape_fence(header.text)
+            parts.append(f"{fence}text\n{escaped_text}\n{fence}\n")
+        parts.append("")
     if cfg.llm_mode != "off" and file_blocks:
         parts.append("## File Contents\n")
         for path, lang, text in file_blocks:
@@ -52,6 +60,14 @@ def to_markdown(cfg: 'Config', tree_lines: list[str], file_blocks: list[tuple[Pa
             # Escape fence to prevent markdown injection
             fence, escaped_text = _escape_fence(text, lang)
             parts.append(f"{fence}{lang}\n{escaped_text}\n{fence}\n\n")
+    if rollups:
+        parts.append("## Directory Summaries\n")
+        fence, escaped_text = _escape_fence("\n\n".join(rollups))
+        parts.append(f"{fence}text\n{escaped_text}\n{fence}\n\n")
+    if symbol_section is not None:
+        parts.append("## Symbol Index\n")
+        fence, escaped_text = _escape_fence(symbol_section)
+        parts.append(f"{fence}text\n{escaped_text}\n{fence}\n\n")
     if cfg.add_stats:
         parts.append("## Summary\n")
         parts.append("| metric | value |\n|---|---:|")
@@ -59,5 +75,9 @@ def to_markdown(cfg: 'Config', tree_lines: list[str], file_blocks: list[tuple[Pa
         parts.append(f"| files in tree | {stats.total_files_in_tree} |")
         parts.append(f"| selected files | {stats.total_with_contents} |")
         parts.append(f"| omitted | {stats.total_omitted} |")
-        parts.append(f"| est tokens (prompt) | {stats.est_tokens_prompt} |\n")
+        if cfg.strip_comments:
+            parts.append(f"| comment bytes saved | {stats.comment_bytes_saved} |")
+        parts.append(f"| est tokens (prompt) | {stats.est_tokens_prompt} |")
+        sections = ", ".join(f"{name}={n}" for name, n in stats.token_sections.items())
+        parts.append(f"| tokens by section | {sections or '-'} |\n")
     return "\n".join(parts)
\ No newline at end of file
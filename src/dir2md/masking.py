@@ -1,8 +1,20 @@
+import bisect
+import multiprocessing
 import re
-from typing import Iterable, Dict, Pattern
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Dict, List, Mapping, Optional, Pattern, Set, Tuple
 
-# Guard extremely large inputs from expensive regex processing (ReDoS safety)
+try:  # Python 3.11+
+    from re import _parser as _sre_parse
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre_parse
+
+# Ranges of loaded text above this size are scanned window by window
+# (``_spans_between``) so a single regex never runs over an unbounded payload
+# (ReDoS safety). Files too large to load stream through ``mask_stream``.
 MAX_MASK_INPUT_CHARS = 1_000_000
+MASK_WINDOW_CHARS = 256 * 1024
 
 # Basic masking rules (available in OSS version)
 BASIC_MASKING_RULES = {
@@ -27,6 +39,30 @@ ADVANCED_MASKING_RULES = {
     "GCP_KEY": r"(?i)google[_-]?api[_-]?key\s*=\s*['\"]?[A-Za-z0-9_.-]{39}['\"]?",
 }
 
+# Longest match each rule can produce, used to size the overlap between
+# streaming windows. Unbounded quantifiers are capped at realistic secret
+# lengths; PEM blocks are multi-line and get the largest window.
+RULE_MAX_MATCH_CHARS: Dict[str, int] = {
+    "AWS_ACCESS_KEY_ID": 20,
+    "BEARER_TOKEN": 4096,
+    "PRIVATE_KEY": 32 * 1024,
+    "GENERIC_API_KEY": 256,
+    "DATABASE_URL": 4096,
+    "JWT_TOKEN": 8192,
+    "OAUTH_CLIENT_SECRET": 256,
+    "AWS_SECRET_ACCESS_KEY": 256,
+    "SLACK_TOKEN": 128,
+    "GITHUB_TOKEN": 40,
+    "GITHUB_PAT": 40,
+    "AZURE_KEY": 36,
+    "GCP_KEY": 256,
+}
+CUSTOM_MAX_MATCH_CHARS = 4096
+
+# Derived anchors shorter than this occur almost everywhere and are not used.
+MIN_ANCHOR_CHARS = 3
+MAX_ANCHOR_VARIANTS = 32
+
 MASK_REPLACEMENT = "[*** MASKED_SECRET ***]"
 PRO_MASK_REPLACEMENT = "[*** MASKED_SECRET_PRO ***]"
 CUSTOM_MASK_REPLACEMENT = "[*** MASKED_SECRET ***]"
@@ -36,7 +72,7 @@ _COMPILED_RULES: Dict[str, Dict[str, Pattern[str]]] = {"basic": {}, "advanced":
 
 
 def _compile_rules() -> None:
-    """Compile masking regex patterns at import time."""
+    """Compile masking regex patterns and derive their anchors at import time."""
     for name, pattern in BASIC_MASKING_RULES.items():
         flags = re.DOTALL if name == "PRIVATE_KEY" else 0
         _COMPILED_RULES["basic"][name] = re.compile(pattern, flags=flags)
@@ -45,7 +81,82 @@ def _compile_rules() -> None:
     for name, pattern in ADVANCED_MASKING_RULES.items():
         _COMPILED_RULES["advanced"][name] = re.compile(pattern)
 
+    for rules in _COMPILED_RULES.values():
+        for compiled in rules.values():
+            _RULE_LITERALS.setdefault(compiled.pattern, rule_literals(compiled.pattern))
+
+
+def _literal_prefixes(items, prefixes: Set[str]) -> Tuple[Set[str], bool]:
+    """Extend ``prefixes`` through the literal start of a parsed sequence.
+
+    Returns the extended set and whether the whole sequence was consumed, so a
+    caller knows if it may keep extending past it. Character classes of a few
+    literals, alternations and optional groups branch the set.
+    """
+    for op, arg in items:
+        if op is _sre_parse.LITERAL:
+            prefixes = {p + chr(arg) for p in prefixes}
+            continue
+        if op is _sre_parse.IN and all(kind is _sre_parse.LITERAL for kind, _ in arg):
+            choices = {chr(c) for _, c in arg}
+            options = {p + ch for p in prefixes for ch in choices}
+            if len(options) > MAX_ANCHOR_VARIANTS:
+                return prefixes, False
+            prefixes = options
+            continue
+        if op is _sre_parse.SUBPATTERN:
+            prefixes, complete = _literal_prefixes(arg[-1], prefixes)
+        elif op is _sre_parse.BRANCH:
+            options, complete = set(), True
+            for branch in arg[1]:
+                extended, done = _literal_prefixes(branch, prefixes)
+                options |= extended
+                complete = complete and done
+            prefixes = options
+        elif op in (_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT) and arg[0] <= 1:
+            extended, complete = _literal_prefixes(arg[2], prefixes)
+            if arg[0] == 0:
+                prefixes |= extended
+                complete = complete and arg[1] == 1
+            else:
+                prefixes, complete = extended, complete and arg[1] == 1
+        else:
+            return prefixes, False
+        if len(prefixes) > MAX_ANCHOR_VARIANTS or not complete:
+            return prefixes, False
+    return prefixes, True
 
+
+def rule_literals(pattern: str) -> Tuple[Tuple[str, ...], str]:
+    """Derive ``(anchors, required)`` from a rule's pattern, both lowercase.
+
+    ``anchors`` are literal prefixes, one of which begins every match; when
+    the pattern has no usable prefix (JWT or UUID shapes) they are empty and
+    ``required`` is the longest literal every match contains instead ("" if
+    none). A rule only runs at its anchors, or only on text containing its
+    required literal.
+    """
+    try:
+        parsed = _sre_parse.parse(pattern)
+    except (re.error, RecursionError):
+        return (), ""
+    prefixes, _ = _literal_prefixes(list(parsed), {""})
+    anchors = sorted({p.lower() for p in prefixes})
+    if anchors and len(anchors) <= MAX_ANCHOR_VARIANTS and min(map(len, anchors)) >= MIN_ANCHOR_CHARS:
+        # A literal that has a shorter anchor as its prefix is found through it.
+        return tuple(a for a in anchors if not any(a != b and a.startswith(b) for b in anchors)), ""
+    runs, run = [], ""
+    for op, arg in parsed:
+        if op is _sre_parse.LITERAL:
+            run += chr(arg)
+        elif run:
+            runs.append(run)
+            run = ""
+    runs.append(run)
+    return (), max(runs, key=len).lower()
+
+
+_RULE_LITERALS: Dict[str, Tuple[Tuple[str, ...], str]] = {}
 _compile_rules()
 
 
@@ -56,32 +167,662 @@ def get_active_masking_rules(mode: str = "basic") -> dict[str, Pattern[str]]:
     return _COMPILED_RULES["basic"]
 
 
-def apply_masking(text: str, mode: str = "basic", custom_patterns: Iterable[str] | None = None) -> str:
-    """Apply masking rules with optional custom patterns (no license gating)."""
+def _trie_pattern(literals: Iterable[str]) -> str:
+    """Alternation of ``literals`` factored by shared prefixes, longest match first.
 
-    if not text:
-        return text
+    CPython's ``re`` tries a flat alternation branch by branch at every
+    offset; the factored form rejects most offsets on the first character.
+    """
+    root: dict = {}
+    for literal in literals:
+        node = root
+        for ch in literal:
+            node = node.setdefault(ch, {})
+        node[""] = {}
 
-    if mode == "off":
-        rules: dict[str, Pattern[str]] = {}
-    else:
-        rules = get_active_masking_rules(mode)
+    def emit(node: dict) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
 
-    # Anti-ReDoS: avoid running regexes on extremely large payloads
-    if len(text) > MAX_MASK_INPUT_CHARS:
+    return emit(root)
+
+
+def _anchor_index(anchors: Mapping[str, Tuple[str, ...]]) -> Tuple[Optional[Pattern[str]], Dict[str, Tuple[str, ...]]]:
+    """One combined regex of every anchor literal, and the rules each literal starts.
+
+    The regex matches the longest literal at an offset; a literal also starts
+    the rules of any shorter literal that is its prefix, since both occur there.
+    """
+    literals = sorted({lit for lits in anchors.values() for lit in lits})
+    if not literals:
+        return None, {}
+    rules: Dict[str, Tuple[str, ...]] = {}
+    for literal in literals:
+        rules[literal] = tuple(
+            name for name, lits in anchors.items() if any(literal.startswith(lit) for lit in lits)
+        )
+    return re.compile(_trie_pattern(literals)), rules
+
+
+def _find_anchor_hits(text: str, plan: "_MaskPlan") -> Optional[Dict[str, List[int]]]:
+    """Locate every anchor literal in one pass over the lowercased text.
+
+    Returns ``{rule_name: sorted_positions}`` for rules with at least one hit,
+    or ``None`` when positions cannot be trusted (lowercasing changed length).
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        return None
+    hits: Dict[str, List[int]] = {}
+    for name, literal in plan.required.items():
+        if literal not in lowered:
+            hits[name] = []
+    if plan.anchor_regex is None:
+        return hits
+    search = plan.anchor_regex.search
+    m = search(lowered)
+    while m:
+        for name in plan.anchor_rules[m.group()]:
+            hits.setdefault(name, []).append(m.start())
+        # Resume one character on, so overlapping literals are found too.
+        m = search(lowered, m.start() + 1)
+    return hits
+
+
+def _rule_spans(pattern: Pattern[str], text: str, starts: Optional[List[int]]) -> List[Tuple[int, int]]:
+    """Return match spans, trying only ``starts`` when given.
+
+    Every anchor offset is tried, even inside an earlier match, so a greedy
+    match cannot swallow the prefix of a secret that follows it; overlaps are
+    merged later by ``_splice_spans``.
+    """
+    spans: List[Tuple[int, int]] = []
+    if starts is None:
+        for m in pattern.finditer(text):
+            if m.end() > m.start():
+                spans.append((m.start(), m.end()))
+        return spans
+    for pos in starts:
+        m = pattern.match(text, pos)
+        if m and m.end() > pos:
+            spans.append((pos, m.end()))
+    return spans
+
+
+def _splice_spans(text: str, spans: List[Tuple[int, int, int, str]]) -> str:
+    """Replace (start, end, priority, replacement) spans, merging overlaps.
+
+    Overlapping matches collapse into one masked region labelled with the
+    replacement of the highest-priority (lowest number) rule involved.
+    """
+    if not spans:
         return text
+    spans.sort()
+    parts: List[str] = []
+    cursor = 0
+    cur_start, cur_end, cur_prio, cur_repl = spans[0]
+    for start, end, prio, repl in spans[1:]:
+        if start < cur_end:
+            if end > cur_end:
+                cur_end = end
+            if prio < cur_prio:
+                cur_prio, cur_repl = prio, repl
+            continue
+        parts.append(text[cursor:cur_start])
+        parts.append(cur_repl)
+        cursor = cur_end
+        cur_start, cur_end, cur_prio, cur_repl = start, end, prio, repl
+    parts.append(text[cursor:cur_start])
+    parts.append(cur_repl)
+    parts.append(text[cur_end:])
+    return "".join(parts)
+
+
+@dataclass
+class RuleTiming:
+    """Accumulated masking cost for one rule or one file."""
+
+    seconds: float = 0.0
+    matches: int = 0
+    slowest_item: str = ""
+    slowest_seconds: float = 0.0
+
+
+class MaskingProfile:
+    """Per-rule and per-file timing and match counts for a masking run."""
+
+    def __init__(self) -> None:
+        self.rules: Dict[str, RuleTiming] = {}
+        self.files: Dict[str, RuleTiming] = {}
+
+    def record(self, rule: str, path: str, seconds: float, matches: int) -> None:
+        for table, key, item in ((self.rules, rule, path), (self.files, path, rule)):
+            entry = table.setdefault(key, RuleTiming())
+            entry.seconds += seconds
+            entry.matches += matches
+            if seconds > entry.slowest_seconds:
+                entry.slowest_item, entry.slowest_seconds = item, seconds
+
+    def slowest_rules(self, limit: int = 5) -> List[Tuple[str, RuleTiming]]:
+        return sorted(self.rules.items(), key=lambda kv: kv[1].seconds, reverse=True)[:limit]
+
+    def slowest_files(self, limit: int = 5) -> List[Tuple[str, RuleTiming]]:
+        return sorted(self.files.items(), key=lambda kv: kv[1].seconds, reverse=True)[:limit]
+
+    def report_lines(self, limit: int = 5) -> List[str]:
+        lines = []
+        for name, entry in self.slowest_rules(limit):
+            lines.append(
+                f"MASK_PROFILE rule={name} time={entry.seconds:.3f}s matches={entry.matches} "
+                f"slowest_file={entry.slowest_item} ({entry.slowest_seconds:.3f}s)"
+            )
+        return lines
+
+
+def _watchdog_worker(conn) -> None:
+    """Worker loop: evaluate (pattern, text, starts) requests until told to stop."""
+    compiled: Dict[str, Pattern[str]] = {}
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        pattern, text, starts = request
+        if pattern not in compiled:
+            compiled[pattern] = re.compile(pattern, flags=re.DOTALL)
+        conn.send(_rule_spans(compiled[pattern], text, starts))
+
+
+class RegexWatchdog:
+    """Run untrusted patterns in a worker process with a per-file time budget.
+
+    CPython cannot interrupt a regex from another thread, so a pattern that
+    overruns ``budget_seconds`` on a file has its worker killed; the caller
+    disables the rule and the next request starts a fresh worker.
+    """
+
+    def __init__(self, budget_seconds: float):
+        self.budget_seconds = budget_seconds
+        self._proc = None
+        self._conn = None
+
+    def _ensure_worker(self) -> None:
+        if self._proc is not None and self._proc.is_alive():
+            return
+        parent, child = multiprocessing.Pipe()
+        self._proc = multiprocessing.Process(target=_watchdog_worker, args=(child,), daemon=True)
+        self._proc.start()
+        child.close()
+        self._conn = parent
+
+    def run(self, pattern: str, text: str, starts: Optional[List[int]]) -> Optional[List[Tuple[int, int]]]:
+        """Return match spans, or ``None`` if the pattern exceeded its budget."""
+        self._ensure_worker()
+        self._conn.send((pattern, text, starts))
+        if self._conn.poll(self.budget_seconds):
+            return self._conn.recv()
+        self._kill()
+        return None
+
+    def _kill(self) -> None:
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.join()
+        if self._conn is not None:
+            self._conn.close()
+        self._proc = None
+        self._conn = None
+
+    def close(self) -> None:
+        if self._proc is None:
+            return
+        try:
+            self._conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self._proc.join(timeout=1)
+        self._kill()
+
+
+@dataclass(frozen=True)
+class SecretHit:
+    """One masked secret: the rule that matched and where (1-based line)."""
+
+    rule: str
+    file: str
+    line: int
+
+
+@dataclass
+class _MaskPlan:
+    """Compiled rules for one masking configuration, in priority order."""
+
+    rules: List[Tuple[str, Pattern[str], str]] = field(default_factory=list)
+    anchors: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    required: Dict[str, str] = field(default_factory=dict)
+    anchor_regex: Optional[Pattern[str]] = None
+    anchor_rules: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    overlap: int = 0
+    untrusted: Set[str] = field(default_factory=set)
+    profile: Optional[MaskingProfile] = None
+    watchdog: Optional[RegexWatchdog] = None
+    disabled: Dict[str, str] = field(default_factory=dict)
+    hits: List[SecretHit] = field(default_factory=list)
+    written: List[SecretHit] = field(default_factory=list)
 
-    # Apply custom patterns first so project-specific rules run before bundled ones.
+
+def _build_plan(
+    mode: str,
+    custom_patterns: Iterable[str] | None,
+    custom_anchors: Mapping[str, Iterable[str]] | None,
+) -> _MaskPlan:
+    plan = _MaskPlan()
+    # Custom patterns come first so project-specific rules win when matches
+    # overlap bundled ones.
     if custom_patterns:
         for pattern in custom_patterns:
             try:
                 compiled = re.compile(pattern, flags=re.DOTALL)
-                text = compiled.sub(CUSTOM_MASK_REPLACEMENT, text)
             except re.error as exc:
                 print(f"[WARN] Skipping invalid custom mask pattern: {pattern!r} ({exc})")
+                continue
+            key = f"CUSTOM:{pattern}"
+            plan.rules.append((key, compiled, CUSTOM_MASK_REPLACEMENT))
+            plan.untrusted.add(key)
+            plan.overlap = max(plan.overlap, CUSTOM_MAX_MATCH_CHARS)
+            declared = (custom_anchors or {}).get(pattern)
+            if declared:
+                plan.anchors[key] = tuple(str(lit).lower() for lit in declared if lit)
 
+    rules = {} if mode == "off" else get_active_masking_rules(mode)
     for rule_name, pattern in rules.items():
         replacement = PRO_MASK_REPLACEMENT if rule_name in ADVANCED_MASKING_RULES else MASK_REPLACEMENT
-        text = pattern.sub(replacement, text)
+        plan.rules.append((rule_name, pattern, replacement))
+        plan.overlap = max(plan.overlap, RULE_MAX_MATCH_CHARS.get(rule_name, CUSTOM_MAX_MATCH_CHARS))
+        anchors, required = _RULE_LITERALS.get(pattern.pattern) or rule_literals(pattern.pattern)
+        if anchors:
+            plan.anchors[rule_name] = anchors
+        elif required:
+            plan.required[rule_name] = required
+    plan.anchor_regex, plan.anchor_rules = _anchor_index(plan.anchors)
+    return plan
+
+
+def _find_spans(text: str, plan: _MaskPlan, path: str = "-") -> List[Tuple[int, int, int, str]]:
+    """Return (start, end, priority, replacement) for every rule match."""
+    profile = plan.profile
+    clock = time.perf_counter
+    t0 = clock() if profile else 0.0
+    hits = _find_anchor_hits(text, plan) if plan.anchors or plan.required else {}
+    if profile:
+        profile.record("(anchor scan)", path, clock() - t0, 0)
+    spans: List[Tuple[int, int, int, str]] = []
+    for priority, (key, pattern, replacement) in enumerate(plan.rules):
+        if key in plan.disabled:
+            continue
+        if hits is None or (key not in plan.anchors and key not in hits):
+            starts = None
+        else:
+            starts = hits.get(key)
+            if not starts:
+                continue
+        t0 = clock() if profile else 0.0
+        if plan.watchdog is not None and key in plan.untrusted:
+            found = plan.watchdog.run(pattern.pattern, text, starts)
+            if found is None:
+                plan.disabled[key] = f"exceeded {plan.watchdog.budget_seconds:g}s on {path}"
+                print(f"[WARN] Disabling custom mask pattern {pattern.pattern!r}: {plan.disabled[key]}")
+                found = []
+        else:
+            found = _rule_spans(pattern, text, starts)
+        if profile:
+            profile.record(key, path, clock() - t0, len(found))
+        for start, end in found:
+            spans.append((start, end, priority, replacement))
+    return spans
+
+
+def _window_spans(buf: str, core: int, plan: _MaskPlan, path: str = "-") -> Tuple[List[Tuple[int, int, int, str]], int]:
+    """Return spans that start inside ``buf[:core]`` and the next window start.
+
+    The cut moves past any accepted match that runs into the overlap.
+    """
+    accepted: List[Tuple[int, int, int, str]] = []
+    cut = core
+    for span in sorted(_find_spans(buf, plan, path)):
+        if span[0] >= cut:
+            break
+        accepted.append(span)
+        cut = max(cut, span[1])
+    return accepted, cut
+
+
+def _spans_between(text: str, lo: int, hi: int, plan: _MaskPlan, path: str = "-") -> List[Tuple[int, int, int, str]]:
+    """Collect spans in ``text[lo:hi]``, window by window for large ranges."""
+    spans: List[Tuple[int, int, int, str]] = []
+    pos = lo
+    while hi - pos > MAX_MASK_INPUT_CHARS:
+        accepted, cut = _window_spans(text[pos:pos + MASK_WINDOW_CHARS + plan.overlap], MASK_WINDOW_CHARS, plan, path)
+        spans.extend((a + pos, b + pos, prio, repl) for a, b, prio, repl in accepted)
+        pos += cut
+    spans.extend((a + pos, b + pos, prio, repl) for a, b, prio, repl in _find_spans(text[pos:hi], plan, path))
+    return spans
+
+
+def _merge_spans(spans: Iterable[Tuple[int, int, int, str]]) -> List[List[int]]:
+    """``[start, end, priority]`` of each masked region, as ``_splice_spans`` merges them."""
+    merged: List[List[int]] = []
+    for start, end, prio, _ in sorted(spans):
+        if merged and start < merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+            merged[-1][2] = min(merged[-1][2], prio)
+        else:
+            merged.append([start, end, prio])
+    return merged
+
+
+def _stream_with_plan(
+    chunks: Iterable[str], plan: _MaskPlan, window_chars: int, path: str = "-", record: bool = False,
+) -> Iterator[str]:
+    window_chars = max(1, window_chars)
+    pending: List[str] = []
+    pending_len = 0
+    carry = ""
+    line = 1  # of the start of ``carry``, counted only when hits are recorded
+
+    def emit(buf: str, spans: List[Tuple[int, int, int, str]], end: int) -> str:
+        nonlocal line
+        if record:
+            pos = 0
+            for start, _, prio in _merge_spans(spans):
+                line += buf.count("\n", pos, start)
+                pos = start
+                plan.hits.append(SecretHit(plan.rules[prio][0], path, line))
+            line += buf.count("\n", pos, end)
+        return _splice_spans(buf[:end], spans)
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if not plan.rules:
+            yield chunk
+            continue
+        pending.append(chunk)
+        pending_len += len(chunk)
+        if len(carry) + pending_len < window_chars + plan.overlap:
+            continue
+        buf = carry + "".join(pending)
+        pending, pending_len = [], 0
+        pos = 0
+        while len(buf) - pos >= window_chars + plan.overlap:
+            window = buf[pos:pos + window_chars + plan.overlap]
+            accepted, cut = _window_spans(window, window_chars, plan, path)
+            yield emit(window, accepted, cut)
+            pos += cut
+        carry = buf[pos:]
+    buf = carry + "".join(pending)
+    if buf:
+        yield emit(buf, _find_spans(buf, plan, path), len(buf))
+
+
+def mask_stream(
+    chunks: Iterable[str],
+    mode: str = "basic",
+    custom_patterns: Iterable[str] | None = None,
+    custom_anchors: Mapping[str, Iterable[str]] | None = None,
+    window_chars: int = MASK_WINDOW_CHARS,
+    hits: Optional[List[SecretHit]] = None,
+    path: str = "-",
+) -> Iterator[str]:
+    """Mask a stream of text chunks in overlapping windows.
+
+    Each window scans ``window_chars`` plus an overlap equal to the longest
+    match any active rule can produce, so a secret straddling a chunk
+    boundary is still masked whole. Work is linear in the input and memory is
+    bounded by one window plus the overlap plus the incoming chunk. When
+    ``hits`` is given, a ``SecretHit`` for ``path`` is appended to it for each
+    masked region.
+    """
+    plan = _build_plan(mode, custom_patterns, custom_anchors)
+    if hits is not None:
+        plan.hits = hits
+    return _stream_with_plan(chunks, plan, window_chars, path, record=hits is not None)
+
+
+class MaskingSession:
+    """Masking state for one run: rules compiled once, optional instruments.
+
+    ``profile=True`` records time and matches per rule and per file;
+    ``custom_timeout`` runs custom patterns through a ``RegexWatchdog`` and
+    disables any that exceed the budget on a file. Every match is also kept
+    as a ``SecretHit`` for spicy findings; those in regions that went into
+    the output are also in ``written_hits``. Views are kept per path, so a
+    later scan of the same text only covers what emitting did not.
+    """
+
+    def __init__(
+        self,
+        mode: str = "basic",
+        custom_patterns: Iterable[str] | None = None,
+        custom_anchors: Mapping[str, Iterable[str]] | None = None,
+        profile: bool = False,
+        custom_timeout: Optional[float] = None,
+    ):
+        self.plan = _build_plan(mode, custom_patterns, custom_anchors)
+        if profile:
+            self.plan.profile = MaskingProfile()
+        if custom_timeout and self.plan.untrusted:
+            self.plan.watchdog = RegexWatchdog(custom_timeout)
+        self._views: Dict[str, MaskedView] = {}
+
+    @property
+    def active(self) -> bool:
+        return bool(self.plan.rules)
+
+    @property
+    def profile(self) -> Optional[MaskingProfile]:
+        return self.plan.profile
+
+    @property
+    def disabled_rules(self) -> Dict[str, str]:
+        """Custom patterns turned off by the watchdog, with the reason."""
+        return {key.split(":", 1)[1]: reason for key, reason in self.plan.disabled.items()}
+
+    @property
+    def hits(self) -> List[SecretHit]:
+        """Every secret found so far, one record per match."""
+        return self.plan.hits
+
+    @property
+    def written_hits(self) -> List[SecretHit]:
+        """The hits inside masked text that was committed as output (see ``MaskedView.commit``)."""
+        return self.plan.written
 
-    return text
+    def mask(self, text: str, path: str = "-") -> str:
+        """Mask all of ``text``, which the caller writes out."""
+        if not text or not self.plan.rules:
+            return text
+        view = self.view(text, path)
+        masked = view.region(0, len(text))
+        view.commit()
+        return masked
+
+    def view(self, text: str, path: str = "-") -> "MaskedView":
+        """Return a lazily masked view of one file's raw text, reused while the text is the same."""
+        view = self._views.get(path)
+        if view is None or view.text is not text:
+            view = self._views[path] = MaskedView(self.plan, text, path)
+        return view
+
+    def mask_regions(self, text: str, regions: List[Tuple[int, int]], path: str = "-") -> List[str]:
+        """Mask only the raw ``(start, end)`` regions of ``text``."""
+        return self.view(text, path).regions(regions)
+
+    def close(self) -> None:
+        if self.plan.watchdog is not None:
+            self.plan.watchdog.close()
+
+
+class MaskedView:
+    """Masked access to regions of one file's raw text.
+
+    Only regions that will be emitted are scanned. Each region is widened to
+    whole secrets, so output is never cut from the middle of one, and scanned
+    offsets are remembered so repeated requests (summary head, snippet,
+    inline window) never rescan the same part of the file.
+    """
+
+    def __init__(self, plan: _MaskPlan, text: str, path: str = "-"):
+        self._plan = plan
+        self._text = text
+        self._path = path
+        self._spans: List[Tuple[int, int, int, str]] = []
+        # Disjoint [lo, hi) ranges where every match *starting* there is known.
+        self._covered: List[Tuple[int, int]] = []
+        self._hit_spans: List[Tuple[int, int]] = []  # masked regions already recorded as hits, sorted
+        self._hit_at: Dict[Tuple[int, int], SecretHit] = {}
+        self._pending: List[Tuple[int, int]] = []  # hit spans in regions returned since the last commit
+        self._written: Set[Tuple[int, int]] = set()
+        self._line_at = (0, 1)  # (offset, line) of the last hit, so line numbers are counted incrementally
+
+    def _cover(self, lo: int, hi: int) -> None:
+        lo, hi = max(0, lo), min(len(self._text), hi)
+        gaps: List[Tuple[int, int]] = []
+        cursor = lo
+        for c_lo, c_hi in self._covered:
+            if c_hi <= cursor or c_lo >= hi:
+                continue
+            if c_lo > cursor:
+                gaps.append((cursor, c_lo))
+            cursor = max(cursor, c_hi)
+        if cursor < hi:
+            gaps.append((cursor, hi))
+        margin = self._plan.overlap
+        found: List[Tuple[int, int, int, str]] = []
+        for g_lo, g_hi in gaps:
+            scan_hi = min(len(self._text), g_hi + margin)
+            for span in _spans_between(self._text, g_lo, scan_hi, self._plan, self._path):
+                if g_lo <= span[0] < g_hi:
+                    found.append(span)
+            self._covered.append((g_lo, g_hi))
+        self._spans.extend(found)
+        self._record_hits(found)
+        if gaps:
+            self._covered.sort()
+            merged: List[Tuple[int, int]] = []
+            for c_lo, c_hi in self._covered:
+                if merged and c_lo <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], c_hi))
+                else:
+                    merged.append((c_lo, c_hi))
+            self._covered = merged
+
+    def _record_hits(self, spans: List[Tuple[int, int, int, str]]) -> None:
+        """Turn newly found spans into ``SecretHit`` records (no extra scan).
+
+        Overlapping matches are one masked region (see ``_splice_spans``), so
+        they are one hit, credited to the highest-priority rule: a ``ghp_``
+        token is a ``GITHUB_TOKEN`` and not also a ``GITHUB_PAT``.
+        """
+        for start, end, prio in _merge_spans(spans):
+            i = bisect.bisect_left(self._hit_spans, (start, end))
+            if (i and self._hit_spans[i - 1][1] > start) or (i < len(self._hit_spans) and self._hit_spans[i][0] < end):
+                continue  # part of a region recorded by an earlier scan
+            self._hit_spans.insert(i, (start, end))
+            hit = self._hit_at[(start, end)] = SecretHit(self._plan.rules[prio][0], self._path, self._line_of(start))
+            self._plan.hits.append(hit)
+
+    def _line_of(self, offset: int) -> int:
+        """1-based line of ``offset``, counted from the previous hit rather than the start of the text."""
+        pos, line = self._line_at
+        if offset >= pos:
+            line += self._text.count("\n", pos, offset)
+        else:
+            line -= self._text.count("\n", offset, pos)
+        self._line_at = (offset, line)
+        return line
+
+    def region(self, start: int, end: int) -> str:
+        """Masked text covering raw ``[start, end)``, widened to whole secrets."""
+        if not self._plan.rules:
+            return self._text[start:end]
+        margin = self._plan.overlap
+        while True:
+            # A match that reaches into the region starts at most ``margin`` before it.
+            self._cover(start - margin, end)
+            new_start, new_end = start, end
+            for a, b, _, _ in self._spans:
+                if a < new_end and b > new_start:
+                    new_start, new_end = min(new_start, a), max(new_end, b)
+            if (new_start, new_end) == (start, end):
+                break
+            start, end = new_start, new_end
+        inside = [(a - start, b - start, prio, repl) for a, b, prio, repl in self._spans if a >= start and b <= end]
+        i = bisect.bisect_left(self._hit_spans, (start, start))
+        while i < len(self._hit_spans) and self._hit_spans[i][0] < end:
+            if self._hit_spans[i][1] <= end:
+                self._pending.append(self._hit_spans[i])
+            i += 1
+        return _splice_spans(self._text[start:end], inside)
+
+    def regions(self, regions: List[Tuple[int, int]]) -> List[str]:
+        return [self.region(start, end) for start, end in regions]
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def scan(self) -> None:
+        """Record the hits of the whole text, scanning only what no region has covered yet."""
+        if self._plan.rules:
+            self._cover(0, len(self._text))
+
+    def mark(self) -> int:
+        """Checkpoint before masking a block that may be rejected (see ``discard``)."""
+        return len(self._pending)
+
+    def discard(self, mark: int) -> None:
+        """Forget the hits of regions returned since ``mark``: that block was not written."""
+        del self._pending[mark:]
+
+    def commit(self) -> None:
+        """The regions returned since the last commit were written; their hits count as output."""
+        for span in self._pending:
+            if span not in self._written:
+                self._written.add(span)
+                self._plan.written.append(self._hit_at[span])
+        self._pending.clear()
+
+    def mask_derived(self, text: str) -> str:
+        """Mask a short string derived from this file (e.g. a symbol summary)."""
+        if not text or not self._plan.rules:
+            return text
+        return _splice_spans(text, _find_spans(text, self._plan, self._path))
+
+
+def apply_masking(
+    text: str,
+    mode: str = "basic",
+    custom_patterns: Iterable[str] | None = None,
+    custom_anchors: Mapping[str, Iterable[str]] | None = None,
+) -> str:
+    """Apply masking rules with optional custom patterns (no license gating).
+
+    A single anchor pass decides where each rule can possibly match; rules run
+    only at those offsets, and rules without a literal prefix (JWT, UUID) only
+    when their required literal occurs (see ``rule_literals``).
+    ``custom_anchors`` maps a custom pattern to the literal prefixes that
+    begin all of its matches; custom patterns without anchors are scanned in
+    full. Inputs above ``MAX_MASK_INPUT_CHARS`` are scanned in overlapping
+    windows (``MaskingSession.mask`` -> ``_spans_between``) instead of one
+    whole-text scan; the input itself is already in memory.
+    """
+
+    if not text:
+        return text
+    return MaskingSession(mode, custom_patterns, custom_anchors).mask(text)
@@ -0,0 +1,182 @@
+"""Jupyter notebook ingestion.
+
+``.ipynb`` files are mostly cell outputs (base64 images, tables, logs). The
+notebook is streamed with the incremental JSON tokenizer from
+``dir2md.structure`` and only each cell's type, execution count and source
+are kept; outputs and metadata are skipped without being materialized. The
+result is a compact percent-format text (``# %% [markdown]`` / ``# %% In[3]``)
+that the rest of the pipeline treats like any other file.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+from .analysis import analyze_python
+from .structure import JsonTokens, Skeleton
+
+MAX_NOTEBOOK_SCAN_BYTES = 256 * 1024 * 1024
+CELL_MARKER = re.compile(r"^# %% (?:\[(\w+)\]|In\[([^\]]*)\])\s*$")
+_MAGIC = re.compile(r"^\s*[%!]")
+
+
+class _Cells:
+    """Pull-parser over notebook tokens: yields (cell_type, execution_count, source)."""
+
+    def __init__(self, stream: TextIO):
+        self.tokens = JsonTokens(stream, Skeleton(), max_scan=MAX_NOTEBOOK_SCAN_BYTES)
+        self.it = iter(self.tokens)
+        self.seen_cells = False
+
+    def _next(self, keep: Optional[int] = 0) -> Tuple[Optional[str], Optional[str]]:
+        self.tokens.keep_chars = keep
+        return next(self.it, (None, None))
+
+    def _skip(self, tok: Optional[str]) -> None:
+        """Skip the value starting with ``tok`` without keeping any of it."""
+        depth = 1 if tok in ("{", "[") else 0
+        while depth:
+            tok, _ = self._next()
+            if tok is None:
+                return
+            if tok in ("{", "["):
+                depth += 1
+            elif tok in ("}", "]"):
+                depth -= 1
+
+    def _members(self) -> Iterator[str]:
+        """Keys of the object whose ``{`` was just read; the caller consumes each value."""
+        while True:
+            tok, val = self._next(keep=256)
+            if tok in ("}", None):
+                return
+            if tok == ",":
+                continue
+            self._next()  # ':'
+            yield _decode(val or "")
+
+    def _source(self) -> str:
+        tok, val = self._next(keep=None)
+        if tok == "str":
+            return _decode(val or "")
+        parts: List[str] = []
+        if tok == "[":
+            while True:
+                tok, val = self._next(keep=None)
+                if tok in ("]", None):
+                    break
+                if tok == "str":
+                    parts.append(_decode(val or ""))
+        else:
+            self._skip(tok)
+        return "".join(parts)
+
+    def _cell(self) -> Tuple[str, Optional[str], str]:
+        cell_type, count, source = "code", None, ""
+        for key in self._members():
+            if key == "cell_type":
+                cell_type = _decode(self._next(keep=64)[1] or "")
+            elif key == "execution_count":
+                tok, val = self._next(keep=64)
+                count = val if tok == "atom" and val != "null" else None
+            elif key == "source":
+                source = self._source()
+            else:
+                self._skip(self._next()[0])  # outputs, metadata, attachments, id
+        return cell_type, count, source
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[str], str]]:
+        if self._next()[0] != "{":
+            return
+        for key in self._members():
+            if key == "cells":
+                self.seen_cells = True
+                tok, _ = self._next()
+                if tok != "[":
+                    self._skip(tok)
+                    continue
+                while True:
+                    tok, _ = self._next()
+                    if tok in ("]", None):
+                        break
+                    if tok == "{":
+                        yield self._cell()
+            else:
+                self._skip(self._next()[0])
+
+
+def _decode(raw: str) -> str:
+    try:
+        return json.loads(f'"{raw}"')
+    except ValueError:
+        return raw.rstrip("\\")
+
+
+def notebook_text(stream: TextIO, max_chars: Optional[int] = None) -> Optional[str]:
+    """Compact percent-format text of a notebook, or None if it is not one.
+
+    Collection stops once ``max_chars`` characters of cell text are kept.
+    """
+    cells = _Cells(stream)
+    parts: List[str] = []
+    size = 0
+    for cell_type, count, source in cells:
+        if cell_type == "code":
+            header = f"# %% In[{count or ' '}]"
+        else:
+            header = f"# %% [{cell_type}]"
+        block = f"{header}\n{source.rstrip()}\n"
+        parts.append(block)
+        size += len(block)
+        if max_chars is not None and size >= max_chars:
+            break
+    if not cells.seen_cells:
+        return None
+    text = "\n".join(parts)
+    return text[:max_chars] if max_chars is not None else text
+
+
+def _cells_of(content: str) -> Iterator[Tuple[str, str]]:
+    kind, body = None, []
+    for line in content.splitlines():
+        m = CELL_MARKER.match(line)
+        if m:
+            if kind is not None:
+                yield kind, "\n".join(body)
+            kind, body = (m.group(1) or "code"), []
+        elif kind is not None:
+            body.append(line)
+    if kind is not None:
+        yield kind, "\n".join(body)
+
+
+def summarize_notebook(content: str, max_lines: int = 40) -> Optional[str]:
+    """Headings from markdown cells plus an outline of the code cells."""
+    counts = {"code": 0, "markdown": 0}
+    headings: List[str] = []
+    imports: List[str] = []
+    functions: List[str] = []
+    classes: List[str] = []
+    for kind, body in _cells_of(content):
+        counts[kind] = counts.get(kind, 0) + 1
+        if kind == "markdown":
+            headings.extend(ln.strip() for ln in body.splitlines() if ln.lstrip().startswith("#"))
+        elif kind == "code":
+            code = "\n".join(ln for ln in body.splitlines() if not _MAGIC.match(ln))
+            analysis = analyze_python(code)
+            if analysis is not None:
+                imports.extend(i for i in analysis.imports if i not in imports)
+                functions.extend(analysis.functions)
+                classes.extend(analysis.classes)
+    if not sum(counts.values()):
+        return None
+    lines = [f"- cells: {counts.get('code', 0)} code, {counts.get('markdown', 0)} markdown"]
+    lines.extend(f"- {h}" for h in headings[: max(0, max_lines - 5)])
+    if imports:
+        lines.append(f"- imports: {', '.join(imports)[:200]}")
+    if classes:
+        lines.append(f"- classes: {', '.join(classes)[:200]}")
+    if functions:
+        lines.append(f"- functions: {', '.join(functions)[:200]}")
+    return "\n".join(lines)
@@ -0,0 +1,113 @@
+"""Value-per-token budget optimizer.
+
+Every candidate offers a ladder of tiers (ref, summary, a sampled head/tail
+window, the inline file), each with a token cost and a value: the file's
+value score times the tier's weight. Choosing one tier per file (or none)
+under the budget is a multiple-choice knapsack, solved greedily: per file,
+the steps along the upper convex hull of its ``(tokens, value)`` points are
+listed with their marginal value per token; all steps are sorted once and
+taken in that order while they fit the budget and the file's quota groups.
+A step that does not fit freezes its file at the tier reached so far, since
+the later steps of a ladder build on it. Sorting dominates: O(n log n).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+TIER_WEIGHTS = {"ref": 0.1, "summary": 0.4, "sampled": 0.7, "inline": 1.0}
+TIER_ORDER = ("ref", "summary", "sampled", "inline")  # cheapest first
+VALUE_WEIGHTS = {"match": 2.0, "centrality": 1.0, "recency": 0.5}
+
+
+@dataclass(frozen=True)
+class Tier:
+    """One way to emit a file: ``name`` from ``TIER_ORDER``, its cost and value."""
+
+    name: str
+    tokens: int
+    value: float
+
+
+def value_scores(signals: Sequence[Mapping[str, float]]) -> List[float]:
+    """``1 + sum(weight * signal)`` per file, each signal min-max scaled over the run.
+
+    ``signals`` holds ``VALUE_WEIGHTS`` keys (match score, import-graph
+    centrality, modification time); a signal that is constant or missing
+    contributes nothing, so files without any signal all score 1.
+    """
+    scores = [1.0] * len(signals)
+    for name, weight in VALUE_WEIGHTS.items():
+        values = [s.get(name, 0.0) for s in signals]
+        lo, hi = min(values, default=0.0), max(values, default=0.0)
+        if hi <= lo:
+            continue
+        for i, v in enumerate(values):
+            scores[i] += weight * (v - lo) / (hi - lo)
+    return scores
+
+
+def tier_ladder(value: float, costs: Mapping[str, int]) -> List[Tier]:
+    """Tiers for a file of ``value`` given ``tier name -> tokens`` (absent tiers are not offered)."""
+    return [Tier(name, costs[name], value * TIER_WEIGHTS[name]) for name in TIER_ORDER if name in costs]
+
+
+def _hull(tiers: Sequence[Tier]) -> List[Tier]:
+    """Upper convex hull of the ladder from the origin (omitted), cheapest first."""
+    hull: List[Tier] = []
+    for tier in sorted(tiers, key=lambda t: (t.tokens, -t.value)):
+        if hull and tier.value <= hull[-1].value:
+            continue  # dominated: costs as much or more for no more value
+        while hull:
+            base_tokens, base_value = (hull[-2].tokens, hull[-2].value) if len(hull) > 1 else (0, 0.0)
+            last = hull[-1]
+            # Drop ``last`` if it lies on or below the segment from its predecessor to ``tier``
+            if (last.value - base_value) * (tier.tokens - base_tokens) <= (tier.value - base_value) * (last.tokens - base_tokens):
+                hull.pop()
+            else:
+                break
+        hull.append(tier)
+    return hull
+
+
+def optimize_tiers(
+    ladders: Sequence[Sequence[Tier]],
+    budget: int,
+    groups: Sequence[Sequence[Hashable]] = (),
+    quotas: Optional[Mapping[Hashable, int]] = None,
+) -> List[Optional[Tier]]:
+    """Pick at most one tier per file, maximizing value within ``budget`` tokens.
+
+    ``groups[i]`` names the quota groups file ``i`` counts against (e.g. its
+    top-level directory and its extension); ``quotas`` caps the tokens spent
+    per group. Ties in value per token keep the input order, so a ranked
+    candidate list stays ranked. Returns the chosen tier per file, or None.
+    """
+    quotas = quotas or {}
+    hulls = [_hull(ladder) for ladder in ladders]
+    steps: List[Tuple[float, int, int]] = []
+    for i, hull in enumerate(hulls):
+        prev_tokens, prev_value = 0, 0.0
+        for s, tier in enumerate(hull):
+            steps.append((-(tier.value - prev_value) / max(1, tier.tokens - prev_tokens), i, s))
+            prev_tokens, prev_value = tier.tokens, tier.value
+    steps.sort()
+
+    level = [-1] * len(hulls)
+    frozen = [False] * len(hulls)
+    spent = 0
+    group_spent: Dict[Hashable, int] = {}
+    for _, i, s in steps:
+        if frozen[i] or level[i] != s - 1:
+            continue
+        prev = hulls[i][s - 1].tokens if s else 0
+        delta = hulls[i][s].tokens - prev
+        file_groups = [g for g in (groups[i] if i < len(groups) else ()) if g in quotas]
+        if spent + delta > budget or any(group_spent.get(g, 0) + delta > quotas[g] for g in file_groups):
+            frozen[i] = True
+            continue
+        spent += delta
+        for g in file_groups:
+            group_spent[g] = group_spent.get(g, 0) + delta
+        level[i] = s
+    return [hulls[i][s] if s >= 0 else None for i, s in enumerate(level)]
@@ -0,0 +1,229 @@
+"""Structural outlines for non-Python sources.
+
+Each outliner is a single pass of anchored, line-level regexes (no nested
+quantifiers, long minified lines skipped), so it is cheap enough to run on
+every candidate. Outliners are registered per extension in ``OUTLINERS``;
+``register_outliner`` adds more.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+from .analysis import analyze_python
+
+MAX_OUTLINE_LINE_CHARS = 400  # longer lines are minified/generated code
+
+
+@dataclass(frozen=True)
+class OutlineItem:
+    """One declaration: what it is, where, and a compact signature."""
+
+    kind: str  # package|module|class|impl|interface|type|function|method|export
+    name: str
+    line: int
+    signature: str
+    exported: bool
+
+
+Outliner = Callable[[str], List[OutlineItem]]
+OUTLINERS: Dict[str, Outliner] = {}
+
+
+def register_outliner(extensions: Iterable[str], outliner: Outliner) -> None:
+    """Use ``outliner`` for files with any of ``extensions`` (e.g. ``".ts"``)."""
+    for ext in extensions:
+        OUTLINERS[ext.lower()] = outliner
+
+
+def _code_lines(content: str) -> Iterator[Tuple[int, str]]:
+    """Yield (1-based line, text) for lines outside ``/* */`` comments."""
+    in_block = False
+    for lineno, ln in enumerate(content.splitlines(), 1):
+        if len(ln) > MAX_OUTLINE_LINE_CHARS:
+            continue
+        stripped = ln.lstrip()
+        if in_block:
+            if "*/" in ln:
+                in_block = False
+            continue
+        if stripped.startswith("/*"):
+            in_block = "*/" not in stripped[2:]
+            continue
+        if not stripped or stripped.startswith("//"):
+            continue
+        yield lineno, ln
+
+
+def _sig(name: str, m: "re.Match[str]", group: int) -> str:
+    """``name(params)`` from a match; ``...`` marks parameters that continue on later lines."""
+    params = re.sub(r"\s+", " ", (m.group(group) or "").strip())
+    end = m.end(group)
+    if m.group(group) is not None and not m.string.startswith(")", end):
+        params = f"{params} ..." if params else "..."
+    return f"{name}({params})"
+
+
+_JS_RULES: List[Tuple[str, Pattern[str]]] = [
+    ("function", re.compile(r"(export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(\w+)\s*(?:<[^>]*>)?\s*\(([^)]*)\)?")),
+    ("class", re.compile(r"(export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(\w+)()")),
+    ("interface", re.compile(r"(export\s+)?(?:declare\s+)?interface\s+(\w+)()")),
+    ("type", re.compile(r"(export\s+)?(?:declare\s+)?(?:const\s+)?(?:type|enum)\s+(\w+)()")),
+    ("function", re.compile(r"(export\s+)?(?:const|let|var)\s+(\w+)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:function\b[^(]*\(([^)]*)\)?|\(([^)]*)\)\s*(?::[^=]+)?=>|(\w+)\s*=>)")),
+]
+_JS_EXPORT_LIST = re.compile(r"export\s*\{([^}]*)\}")
+
+
+def _outline_js(content: str) -> List[OutlineItem]:
+    items: List[OutlineItem] = []
+    for lineno, ln in _code_lines(content):
+        if ln[:1].isspace():
+            continue  # top-level declarations only
+        for kind, rx in _JS_RULES:
+            m = rx.match(ln)
+            if m:
+                group = next((g for g in range(3, len(m.groups()) + 1) if m.group(g) is not None), 0)
+                sig = _sig(m.group(2), m, group) if kind == "function" and group else m.group(2)
+                items.append(OutlineItem(kind, m.group(2), lineno, sig, bool(m.group(1))))
+                break
+        else:
+            m = _JS_EXPORT_LIST.match(ln)
+            if m:
+                for name in m.group(1).split(","):
+                    name = name.split(" as ")[-1].strip()
+                    if name:
+                        items.append(OutlineItem("export", name, lineno, name, True))
+    return items
+
+
+_GO_PACKAGE = re.compile(r"package\s+(\w+)")
+_GO_FUNC = re.compile(r"func\s+(?:\(\s*\w*\s*\*?\s*([\w.]+)[^)]*\)\s*)?(\w+)\s*(?:\[[^\]]*\])?\(([^)]*)\)?")
+_GO_TYPE = re.compile(r"type\s+(\w+)(?:\[[^\]]*\])?\s+(struct|interface)?")
+
+
+def _outline_go(content: str) -> List[OutlineItem]:
+    items: List[OutlineItem] = []
+    for lineno, ln in _code_lines(content):
+        m = _GO_PACKAGE.match(ln)
+        if m:
+            items.append(OutlineItem("package", m.group(1), lineno, m.group(1), True))
+            continue
+        m = _GO_FUNC.match(ln)
+        if m:
+            recv, name = m.group(1), m.group(2)
+            qual = f"{recv}.{name}" if recv else name
+            items.append(OutlineItem("method" if recv else "function", qual, lineno, _sig(qual, m, 3), name[0].isupper()))
+            continue
+        m = _GO_TYPE.match(ln)
+        if m:
+            kind = "interface" if m.group(2) == "interface" else "type"
+            items.append(OutlineItem(kind, m.group(1), lineno, m.group(1), m.group(1)[0].isupper()))
+    return items
+
+
+_RS_VIS = r"(pub(?:\([^)]*\))?\s+)?"
+_RS_FN = re.compile(r"(\s*)" + _RS_VIS + r"(?:default\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?(?:extern\s+\"[^\"]*\"\s+)?fn\s+(\w+)\s*(?:<[^>]*>)?\s*\(([^)]*)\)?")
+_RS_TYPE = re.compile(_RS_VIS + r"(struct|enum|trait|type|union|mod)\s+(\w+)")
+_RS_IMPL = re.compile(r"impl\b(?:<[^>]*>)?\s+([^{]+?)\s*(?:\{|where\b|$)")
+
+
+def _outline_rust(content: str) -> List[OutlineItem]:
+    items: List[OutlineItem] = []
+    impl: Optional[str] = None
+    for lineno, ln in _code_lines(content):
+        if not ln[:1].isspace():
+            impl = None
+        m = _RS_IMPL.match(ln)
+        if m:
+            impl = m.group(1)
+            items.append(OutlineItem("impl", impl, lineno, impl, False))
+            continue
+        m = _RS_FN.match(ln)
+        if m and len(m.group(1)) <= 4:
+            name = m.group(3)
+            if m.group(1) and impl:
+                kind, name = "method", f"{impl.split()[-1]}::{name}"
+            elif m.group(1):
+                continue  # nested helper
+            else:
+                kind = "function"
+            items.append(OutlineItem(kind, name, lineno, _sig(name, m, 4), bool(m.group(2))))
+            continue
+        m = _RS_TYPE.match(ln)
+        if m:
+            kind = {"trait": "interface", "mod": "module"}.get(m.group(2), "type")
+            items.append(OutlineItem(kind, m.group(3), lineno, m.group(3), bool(m.group(1))))
+    return items
+
+
+_JAVA_MODIFIERS = r"(?:(?:public|protected|private|static|final|abstract|sealed|non-sealed|strictfp|synchronized|native|default)\s+)*"
+_JAVA_TYPE = re.compile(r"\s*(?:@\w+\s+)*(" + _JAVA_MODIFIERS + r")(class|interface|enum|record|@interface)\s+(\w+)")
+_JAVA_METHOD = re.compile(r"(\s*)(" + _JAVA_MODIFIERS + r")(?:<[^>]*>\s+)?([\w.$]+(?:<[^;{}()]*>)?(?:\[\])*)\s+(\w+)\s*\(([^)]*)\)?")
+_JAVA_NOT_TYPES = {"return", "new", "else", "throw", "yield", "case", "await", "package", "import"}
+
+
+def _outline_java(content: str) -> List[OutlineItem]:
+    items: List[OutlineItem] = []
+    for lineno, ln in _code_lines(content):
+        m = _JAVA_TYPE.match(ln)
+        if m:
+            kind = "interface" if "interface" in m.group(2) else "class"
+            items.append(OutlineItem(kind, m.group(3), lineno, m.group(3), "public" in m.group(1)))
+            continue
+        m = _JAVA_METHOD.match(ln)
+        if m and len(m.group(1).expandtabs(4)) <= 4 and m.group(3) not in _JAVA_NOT_TYPES:
+            items.append(OutlineItem("method", m.group(4), lineno, _sig(m.group(4), m, 5), "public" in m.group(2)))
+    return items
+
+
+_PY_KEYWORD = re.compile(r"^(?:async\s+)?(?:def|class)\s+")
+
+
+def _outline_python(content: str) -> List[OutlineItem]:
+    analysis = analyze_python(content)
+    if analysis is None:
+        return []
+    return [
+        OutlineItem(s.kind, s.name, s.lineno, _PY_KEYWORD.sub("", s.signature.splitlines()[-1]), not s.name.startswith("_"))
+        for s in analysis.symbols
+    ]
+
+
+register_outliner((".py", ".pyi"), _outline_python)
+register_outliner((".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".mts", ".cts"), _outline_js)
+register_outliner((".go",), _outline_go)
+register_outliner((".rs",), _outline_rust)
+register_outliner((".java",), _outline_java)
+
+
+def extract_outline(path: Path, content: str) -> Optional[List[OutlineItem]]:
+    """Outline ``content`` with the outliner registered for ``path``'s extension, if any."""
+    outliner = OUTLINERS.get(path.suffix.lower())
+    if outliner is None:
+        return None
+    return outliner(content)
+
+
+def format_outline(items: List[OutlineItem]) -> str:
+    """Group an outline into summary bullets, like the Python summary."""
+    labels = {
+        "package": "package",
+        "module": "modules",
+        "class": "classes",
+        "impl": "impls",
+        "interface": "interfaces",
+        "type": "types",
+        "function": "functions",
+        "method": "methods",
+    }
+    groups: Dict[str, List[str]] = {}
+    for item in items:
+        if item.kind in labels:
+            groups.setdefault(labels[item.kind], []).append(item.signature)
+    lines = [f"- {label}: {', '.join(groups[label])[:200]}" for label in labels.values() if label in groups]
+    exported = [i.name for i in items if i.exported and i.kind != "package"]
+    if exported:
+        lines.append(f"- exports: {', '.join(exported)[:200]}")
+    return "\n".join(lines)
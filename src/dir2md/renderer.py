@@ -3,107 +3,416 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+from .chunking import ChunkStore, replace_duplicates
 from .markdown import to_markdown
-from .token import estimate_tokens
+from .masking import MaskedView, MaskingSession
+from .search import format_snippet, match_windows
+from .summary import summarize
+from .token import TokenLedger
+from .optimizer import TIER_ORDER, optimize_tiers, tier_ladder, value_scores
+from .selector import plan_stages, stream_candidates
 from .spicy import LEVEL_TO_CHILI
 
+_SHA256_PLACEHOLDER = "0" * 64
+REF_OVERHEAD_TOKENS = 16  # framing allowance per ref block
+EARLY_STOP_MISSES = 32  # consecutive misfits after which an early-stop run treats the budget as full
 
-def render_blocks(cfg, root: Path, candidates: List[dict]) -> Tuple[List[tuple], List[dict], int]:
+
+def _emit_snippet(rec: dict, view) -> str:
+    span = rec.get("snippet_span")
+    if not span:
+        return ""
+    start, end = span
+    region = view.region(start, end) if view is not None else rec["text"][start:end]
+    return format_snippet(region)
+
+
+QUERY_CONTEXT_LINES = 4  # lines kept either side of a query hit in query-focused windows
+
+
+def _truncation_marker(omitted: int) -> str:
+    return f"\n<!-- [truncated middle: {omitted} lines omitted] -->\n"
+
+
+def _line_anchor(first: int, last: int, hits: int) -> str:
+    plural = "es" if hits != 1 else ""
+    return f"<!-- lines {first + 1}-{last}: {hits} match{plural} -->"
+
+
+def _window_lines(cfg, text: str) -> List[str]:
+    lines = text.splitlines()
+    return lines[: cfg.max_lines] if cfg.max_lines else lines
+
+
+def _inline_content(cfg, text: str, view, cut: Optional[Tuple[Tuple[int, int, int], ...]] = None, anchored: bool = False, dups=()) -> str:
+    """Cut the inline window from raw text, masking only the lines emitted.
+
+    ``cut`` lists the ``(first, last, hits)`` line ranges to keep (from
+    ``_inline_window``); None keeps the whole window. A head/tail cut is
+    joined by a truncation marker; ``anchored`` query windows are each
+    headed by their line numbers and match count instead. ``dups`` lists
+    ``(first, last, marker)`` chunks already emitted by another file; each
+    one wholly inside a kept range is written as its marker.
+    """
+    lines = text.splitlines()
+    kept = text.splitlines(keepends=True)
+    if cfg.max_lines and len(lines) > cfg.max_lines:
+        lines = lines[: cfg.max_lines]
+        kept = kept[: cfg.max_lines]
+    offsets = [0]
+    for ln in kept:
+        offsets.append(offsets[-1] + len(ln))
+
+    def region_lines(first: int, last: int) -> list[str]:
+        if first >= last:
+            return []
+        if view is None:
+            return lines[first:last]
+        return view.region(offsets[first], offsets[last]).splitlines()
+
+    def masked_lines(first: int, last: int) -> list[str]:
+        if dups:
+            return replace_duplicates(first, last, dups, region_lines)
+        return region_lines(first, last)
+
+    if cut is None:
+        return "\n".join(masked_lines(0, len(lines)))
+    if anchored:
+        return "\n".join(f"{_line_anchor(*r)}\n" + "\n".join(masked_lines(r[0], r[1])) for r in cut)
+    (_, head_n, _), (tail_start, _, _) = cut
+    head = masked_lines(0, head_n)
+    tail = masked_lines(tail_start, len(lines))
+    return "\n".join(head + [_truncation_marker(tail_start - head_n)] + tail)
+
+
+def _fit_cut(cfg, prefix: Sequence[int], marker: int, target: int, limit: int) -> Optional[Tuple[int, int]]:
+    """Largest ``(head, tail)`` cut of at most ``limit`` lines costing at most ``target`` tokens.
+
+    Head and tail keep the ``sample_head:sample_tail`` proportion. ``prefix[i]``
+    is the cost of the first ``i`` lines, so a probe is O(1) and the search
+    O(log lines).
+    """
+    n = len(prefix) - 1
+    head_w, tail_w = max(0, cfg.sample_head), max(0, cfg.sample_tail)
+    if not head_w + tail_w:
+        head_w = 1
+
+    def split(k: int) -> Tuple[int, int]:
+        head = -(-k * head_w // (head_w + tail_w))
+        return head, k - head
+
+    def cost(k: int) -> int:
+        head, tail = split(k)
+        return prefix[head] + prefix[n] - prefix[n - tail] + marker
+
+    lo, hi = 0, min(limit, n - 1)
+    while lo < hi:
+        k = (lo + hi + 1) // 2
+        if cost(k) <= target:
+            lo = k
+        else:
+            hi = k - 1
+    return split(lo) if lo else None
+
+
+def _fit_query_windows(windows: Sequence[Tuple[int, int, int]], prefix: Sequence[int], anchor: int, target: int):
+    """Densest match windows first (hits per line), while their lines fit ``target``; file order out."""
+    chosen, spent = [], 0
+    for first, last, hits in sorted(windows, key=lambda w: (-w[2] / (w[1] - w[0]), w[0])):
+        cost = prefix[last] - prefix[first] + anchor
+        if spent + cost <= target:
+            chosen.append((first, last, hits))
+            spent += cost
+    return tuple(sorted(chosen))
+
+
+def _query_windows(cfg, rec: dict, rel: str, ledger: TokenLedger, prefix: Sequence[int], target: int, dups=()):
+    """Query-focused cut of ``rec`` within ``target`` tokens, or None without matches that fit."""
+    offsets = rec.get("match_offsets") if cfg.query else None
+    if not offsets:
+        return None
+    line_starts = [0]
+    for ln in rec["text"].splitlines(keepends=True)[: len(prefix) - 1]:
+        line_starts.append(line_starts[-1] + len(ln))
+    windows = match_windows(line_starts, offsets, QUERY_CONTEXT_LINES)
+    anchor = ledger.cost(rel, "anchor", _line_anchor(len(prefix), len(prefix), len(offsets)))
+    for _ in range(3):
+        cut = _fit_query_windows(windows, prefix, anchor, target)
+        if not cut:
+            return None
+        raw = _inline_content(cfg, rec["text"], None, cut, anchored=True, dups=dups)
+        tok = ledger.cost(rel, f"cut:{cut}" + ("+dups" if dups else ""), raw)
+        if tok <= target:
+            return cut, raw, tok
+        target -= tok - target
+    return None
+
+
+def _inline_window(cfg, rec: dict, rel: str, tier: str, ledger: TokenLedger, room: Optional[int] = None, dups=()):
+    """Size ``rec``'s inline window to ``room`` and the ``max_file_tokens`` cap.
+
+    The whole window is kept when it fits. Otherwise, with a query, the
+    windows around its hits are kept, densest first; failing that, the
+    head/tail cut is the largest that fits (the ``sampled`` tier never keeps
+    more than ``sample_head + sample_tail`` lines). Returns ``(cut, anchored,
+    raw text, tokens)``, or None when nothing fits. Per-line costs are
+    counted once per file; a cut is checked against a real count and shrunk
+    by the overshoot if the line estimate was low. Windows are priced with
+    the ``dups`` markers in place (see ``_inline_content``).
+    """
+    lines = _window_lines(cfg, rec["text"])
+    target = cfg.max_file_tokens if room is None else min(room, cfg.max_file_tokens)
+    suffix = "+dups" if dups else ""
+    if tier == "inline":
+        raw = _inline_content(cfg, rec["text"], None, dups=dups) if dups else "\n".join(lines)
+        tok = ledger.cost(rel, "window" + suffix, raw)
+        if tok <= target:
+            return None, False, raw, tok
+        limit = len(lines)
+    else:
+        limit = max(0, cfg.sample_head) + max(0, cfg.sample_tail)
+    prefix = ledger.prefix(rel, lines)
+    if tier == "inline":
+        focused = _query_windows(cfg, rec, rel, ledger, prefix, target, dups)
+        if focused is not None:
+            return focused[0], True, focused[1], focused[2]
+    n = len(lines)
+    marker = ledger.cost(rel, "marker", _truncation_marker(n))
+    for _ in range(3):
+        split = _fit_cut(cfg, prefix, marker, target, limit)
+        if split is None:
+            return None
+        head, tail = split
+        cut = ((0, head, 0), (n - tail, n, 0))
+        raw = _inline_content(cfg, rec["text"], None, cut, dups=dups)
+        tok = ledger.cost(rel, f"cut:{cut}{suffix}", raw)
+        if tok <= target:
+            return cut, False, raw, tok
+        target -= tok - target
+    return None
+
+
+def _ref_payload(cfg, rec: dict, snippet: str, drift: float) -> dict:
+    # Hash only files that fit: a digest-sized placeholder sizes the meta exactly.
+    payload = {"sha256": _SHA256_PLACEHOLDER, "path": str(rec["path"]), "drift": drift}
+    if cfg.query:
+        payload["query"] = cfg.query
+        if rec.get("match_score"):
+            payload["match_score"] = rec["match_score"]
+        if snippet:
+            payload["snippet"] = snippet
+    return payload
+
+
+def _drift(sh: int, hashes: Sequence[int]) -> float:
+    """Share of the 64 SimHash bits by which ``sh`` differs from the nearest of ``hashes`` (1.0 when empty)."""
+    return round(min(((sh ^ prev).bit_count() for prev in hashes), default=64) / 64, 3)  # type: ignore[attr-defined]
+
+
+def _raw_tier(cfg, rec: dict, rel: str, tier: str, snippet: str, drift: float, ledger: TokenLedger) -> Tuple[str, int]:
+    """Unmasked ref or summary text of ``rec`` and its tokens, for pricing before anything is masked."""
+    if tier == "ref":
+        meta = json.dumps(_ref_payload(cfg, rec, snippet, drift), ensure_ascii=False)
+        return meta, ledger.cost(rel, "ref", meta) + REF_OVERHEAD_TOKENS
+    raw = summarize(rec["path"], rec["text"], max_lines=rec.get("summary_lines", 40), analysis=rec.get("analysis"), skeleton=rec.get("skeleton"))
+    return raw, ledger.cost(rel, "summary", raw)
+
+
+def _tier_block(cfg, rec: dict, rel: str, tier: str, view, snippet: str, drift: float, ledger: TokenLedger, room: int, dups=()):
+    """Emit ``rec`` as ``tier`` if it fits in ``room`` tokens.
+
+    Returns ``(tokens, lang, block text, json content, shown)``, or None;
+    ``shown`` lists the ``(first, last)`` line ranges written out (none for
+    ref and summary blocks). An inline window's raw cost gates first;
+    masking can change the count, so the masked block is checked again.
+    Summaries are masked as they are built and priced once. Inline windows
+    shrink to the room left instead of being skipped.
+    """
+    if tier in ("inline", "sampled"):
+        window = _inline_window(cfg, rec, rel, tier, ledger, room, dups)
+        if window is None:
+            return None
+        cut, anchored, raw, raw_tok = window
+        content = _inline_content(cfg, rec["text"], view, cut, anchored, dups)
+        variant = ("window" if cut is None else f"cut:{cut}") + ("+dups" if dups else "")
+        tok = raw_tok if content == raw else ledger.cost(rel, f"{variant}.masked", content)
+        if tok > room:
+            return None
+        if cfg.query and snippet and not anchored:
+            content = f"<!-- query: {snippet} -->\n{content}"
+        if cfg.explain_capsule:
+            content += f"\n\n<!-- why: {tier}; drift={drift}; tok={tok} -->"
+        shown = ((0, len(_window_lines(cfg, rec["text"]))),) if cut is None else tuple((a, b) for a, b, _ in cut)
+        return tok, rec["path"].suffix.lstrip(".") or "text", content, content, shown
+
+    if tier == "ref":
+        raw, raw_tok = _raw_tier(cfg, rec, rel, tier, snippet, drift, ledger)
+        if raw_tok > room:
+            return None
+        payload = _ref_payload(cfg, rec, snippet, drift)
+        payload["sha256"] = rec["sha256"]
+        return raw_tok, "json", json.dumps(payload, ensure_ascii=False), payload, ()
+    # Summaries mask only the lines they quote, so the masked text is built once and priced directly
+    text = summarize(
+        rec["path"], rec["text"], max_lines=rec.get("summary_lines", 40), view=view,
+        analysis=rec.get("analysis"), skeleton=rec.get("skeleton"),
+    )
+    tok = ledger.cost(rel, "summary", text)
+    if tok > room:
+        return None
+    if cfg.query and snippet:
+        text += f"\n\n<!-- query: {snippet} -->"
+    if cfg.explain_capsule:
+        text += f"\n\n<!-- why: summary; drift={drift} -->"
+    return tok, "markdown", text, text, ()
+
+
+def _optimized_tiers(cfg, root: Path, candidates: List[dict], snippets: Dict[str, str], ledger: TokenLedger, budget: int) -> List[List[str]]:
+    """Per candidate, the tiers to try, best first: the optimizer's pick and the cheaper ones below it."""
+    ceiling = TIER_ORDER.index("inline" if cfg.llm_mode == "inline" else cfg.llm_mode)
+    ladders, groups, signals = [], [], []
+    newest = max((getattr(rec, "mtime", 0.0) for rec in candidates), default=0.0)
+    hashes: List[int] = []
+    for rec in candidates:
+        rel = str(rec["path"].relative_to(root))
+        # The drift the block is rendered with when the files ahead of it are emitted
+        drift = _drift(rec["simhash"], hashes)
+        hashes.append(rec["simhash"])
+        raws = {}
+        for tier in TIER_ORDER[: ceiling + 1]:
+            if tier in ("ref", "summary"):
+                raws[tier] = _raw_tier(cfg, rec, rel, tier, snippets[rel], drift, ledger)
+            elif tier == "inline" or len(_window_lines(cfg, rec["text"])) > cfg.sample_head + cfg.sample_tail:
+                window = _inline_window(cfg, rec, rel, tier, ledger)
+                if window is not None:
+                    raws[tier] = window[2:]
+        if "inline" in raws and "sampled" in raws and raws["inline"][0] == raws["sampled"][0]:
+            del raws["inline"]  # over the per-file cap the inline window is the sampled one
+        ladders.append({tier: tok for tier, (_, tok) in raws.items()})
+        parts = Path(rel).parts
+        groups.append((("dir", parts[0] if len(parts) > 1 else "."), ("ext", rec["path"].suffix.lower())))
+        signals.append({
+            "match": float(rec.get("match_score") or 0),
+            "centrality": float(rec.get("centrality", 0.0)),
+            "recency": getattr(rec, "mtime", newest) - newest,
+        })
+    scores = value_scores(signals)
+    quotas = {}
+    for fraction, kind in ((getattr(cfg, "dir_quota", None), "dir"), (getattr(cfg, "ext_quota", None), "ext")):
+        if fraction:
+            quotas.update({g: int(budget * fraction) for file_groups in groups for g in file_groups if g[0] == kind})
+    picks = optimize_tiers([tier_ladder(v, costs) for v, costs in zip(scores, ladders)], budget, groups, quotas)
+    tiers = []
+    for pick, costs in zip(picks, ladders):
+        if pick is None:
+            tiers.append([])
+            continue
+        below = [t for t in TIER_ORDER[: TIER_ORDER.index(pick.name)] if t in costs]
+        tiers.append([pick.name] + below[::-1])
+    return tiers
+
+
+def render_blocks(cfg, root: Path, candidates: List[dict], masker=None, ledger=None, budget: Optional[int] = None) -> Tuple[List[tuple], List[dict], int]:
+    """Pack candidates into the token budget.
+
+    ``masker`` (a ``MaskingSession``, built from ``cfg`` when omitted) is
+    applied here, at emit time, and only to the summary, snippet and inline
+    window that go into the output. Each block variant is counted once in
+    ``ledger`` (a ``TokenLedger``), and emitted blocks are charged to its
+    ``"blocks"`` section. ``budget`` defaults to ``cfg.budget_tokens``; the
+    caller passes less when other sections (the tree) are charged first.
+
+    By default blocks are packed first-fit in candidate order, all in
+    ``cfg.llm_mode``. With ``cfg.optimize`` each file gets the tier (up to
+    that mode) the value-per-token optimizer picks, within the optional
+    ``cfg.dir_quota``/``cfg.ext_quota`` shares of the budget, and its JSON
+    entry records the tier as ``mode``.
+
+    With ``cfg.early_stop`` candidates are consumed from ``stream_candidates``
+    and packing stops once the remaining budget is below the cheapest
+    possible block, or after ``EARLY_STOP_MISSES`` files in a row did not
+    fit, so files ranked below that point are never read or masked.
+
+    With ``cfg.chunk_dedup`` inline windows are cut into content-defined
+    chunks; a chunk already emitted by an earlier file is written as a
+    marker naming where it appeared first.
+    """
+    if masker is None:
+        masker = MaskingSession(cfg.masking_mode, cfg.custom_mask_patterns, getattr(cfg, "custom_mask_anchors", None))
+    if ledger is None:
+        ledger = TokenLedger()
+    if budget is None:
+        budget = cfg.budget_tokens
     est_total = 0
     selected_blocks: list[tuple[Path, str, str]] = []
     selected_hashes: list[int] = []
     json_entries: list[dict] = []
 
-    def drift_score_bits(sh: int) -> int:
-        if not selected_hashes:
-            return 64
-        return min((sh ^ prev).bit_count() for prev in selected_hashes)  # type: ignore[arg-type]
+    views: Dict[str, MaskedView] = {}
+    snippets: Dict[str, str] = {}
 
-    for rec in candidates:
-        if cfg.llm_mode == "off":
-            break
+    def prepare(rec: dict) -> str:
+        rel = str(rec["path"].relative_to(root))
+        if rel not in views:
+            views[rel] = masker.view(rec["text"], rel)
+            snippets[rel] = _emit_snippet(rec, views[rel]) if cfg.query else ""
+        return rel
+
+    plan = plan_stages(cfg)
+    stream = plan.stream
+    store = ChunkStore() if plan.chunks else None
+    if cfg.llm_mode == "off":
+        order: Iterable[Tuple[dict, List[str]]] = ()
+    elif getattr(cfg, "optimize", False):
+        readable = [rec for rec in candidates if rec["text"] is not None]
+        for rec in readable:
+            prepare(rec)
+        order = zip(readable, _optimized_tiers(cfg, root, readable, snippets, ledger, budget))
+    elif stream:
+        order = ((rec, [cfg.llm_mode]) for rec in stream_candidates(cfg, candidates))
+    else:
+        order = ((rec, [cfg.llm_mode]) for rec in candidates if rec["text"] is not None)
+
+    floor = REF_OVERHEAD_TOKENS + 1 if cfg.llm_mode == "ref" else 1  # the cheapest block there can be
+    misses = 0
+    for rec, tiers in order:
+        if stream and (budget - est_total < floor or misses >= EARLY_STOP_MISSES):
+            break  # budget full: leave the rest of the ranking unread
         sh = rec["simhash"]
-        drift_bits = drift_score_bits(sh)
-        drift = round(drift_bits / 64, 3)
-        if cfg.llm_mode == "ref":
-            meta_payload = {"sha256": rec["sha256"], "path": str(rec["path"]), "drift": drift}
-            if cfg.query:
-                meta_payload["query"] = cfg.query
-                if rec.get("match_score"):
-                    meta_payload["match_score"] = rec["match_score"]
-                if rec.get("snippet"):
-                    meta_payload["snippet"] = rec["snippet"]
-            meta = json.dumps(meta_payload, ensure_ascii=False)
-            tok = estimate_tokens(meta) + 16
-            if est_total + tok > cfg.budget_tokens:
-                continue
-            est_total += tok
-            selected_blocks.append((rec["path"], "json", meta))
-            selected_hashes.append(sh)
-            json_entries.append({
-                "path": str(rec["path"].relative_to(root)),
-                "mode": cfg.llm_mode,
-                "lang": "json",
-                "sha256": rec["sha256"],
-                "match_score": rec.get("match_score", 0),
-                "snippet": rec.get("snippet", ""),
-                "content": meta_payload,
-            })
-        elif cfg.llm_mode == "summary":
-            payload = rec["summary"]
-            tok = estimate_tokens(payload)
-            if est_total + tok > cfg.budget_tokens:
-                continue
-            est_total += tok
-            text = payload
-            if cfg.query and rec.get("snippet"):
-                text += f"\n\n<!-- query: {rec['snippet']} -->"
-            if cfg.explain_capsule:
-                text += f"\n\n<!-- why: summary; drift={drift} -->"
-            selected_blocks.append((rec["path"], "markdown", text))
-            selected_hashes.append(sh)
-            json_entries.append({
-                "path": str(rec["path"].relative_to(root)),
-                "mode": cfg.llm_mode,
-                "lang": "markdown",
-                "sha256": rec["sha256"],
-                "match_score": rec.get("match_score", 0),
-                "snippet": rec.get("snippet", ""),
-                "content": text,
-            })
-        else:  # inline
-            lines = rec["text"].splitlines()
-            if cfg.max_lines and len(lines) > cfg.max_lines:
-                lines = lines[: cfg.max_lines]
-            content = "\n".join(lines)
-            if estimate_tokens(content) > cfg.max_file_tokens:
-                head = lines[: cfg.sample_head]
-                tail = lines[-cfg.sample_tail:] if cfg.sample_tail > 0 else []
-                mid = f"\n<!-- [truncated middle: {max(0, len(lines)-len(head)-len(tail))} lines omitted] -->\n"
-                content = "\n".join(head + [mid] + tail)
-            tok = min(cfg.max_file_tokens, estimate_tokens(content))
-            if est_total + tok > cfg.budget_tokens:
-                continue
-            est_total += tok
-            if cfg.query and rec.get("snippet"):
-                content = f"<!-- query: {rec['snippet']} -->\n{content}"
-            if cfg.explain_capsule:
-                content += f"\n\n<!-- why: inline; drift={drift}; tok={tok} -->"
-            lang = rec["path"].suffix.lstrip(".") or "text"
-            selected_blocks.append((rec["path"], lang, content))
-            selected_hashes.append(sh)
-            json_entries.append({
-                "path": str(rec["path"].relative_to(root)),
-                "mode": cfg.llm_mode,
-                "lang": lang,
-                "sha256": rec["sha256"],
-                "match_score": rec.get("match_score", 0),
-                "snippet": rec.get("snippet", ""),
-                "content": content,
-            })
+        drift = _drift(sh, selected_hashes)
+        rel = prepare(rec)
+        dups = store.duplicates(rec["chunks"]) if store is not None else ()
+        view = views[rel]
+        for tier in tiers:
+            mark = view.mark()
+            block = _tier_block(cfg, rec, rel, tier, view, snippets[rel], drift, ledger, budget - est_total, dups)
+            if block is not None:
+                break
+            view.discard(mark)  # secrets masked for a block that did not fit are not in the output
+        else:
+            misses += 1
+            continue
+        misses = 0
+        view.commit()
+        tok, lang, text, content, shown = block
+        if store is not None:
+            store.add(rel, rec["chunks"], shown)
+        est_total += tok
+        selected_blocks.append((rec["path"], lang, text))
+        selected_hashes.append(sh)
+        json_entries.append({
+            "path": rel,
+            "mode": tier if getattr(cfg, "optimize", False) else cfg.llm_mode,
+            "lang": lang,
+            "sha256": rec["sha256"],
+            "match_score": rec.get("match_score", 0),
+            "snippet": snippets[rel],
+            "content": content,
+        })
 
+    ledger.charge("blocks", est_total)
     return selected_blocks, json_entries, est_total
 
 
@@ -118,6 +427,8 @@ def render_json(cfg, root: Path, stats, json_entries, spicy_bundle):
             "total_omitted": stats.total_omitted,
             "total_with_contents": stats.total_with_contents,
             "est_tokens_prompt": stats.est_tokens_prompt,
+            "comment_bytes_saved": stats.comment_bytes_saved,
+            "token_sections": stats.token_sections,
         },
         "files": json_entries,
     }
@@ -133,12 +444,17 @@ def render_jsonl(json_entries, spicy_bundle):
     return "\n".join(lines)
 
 
-def build_manifest(cfg, stats, selected_blocks, root: Path, candidate_hash: Dict[Path, str], spicy_bundle):
-    """Assemble manifest dictionary for writing or downstream use."""
+def build_manifest(cfg, stats, selected_blocks, root: Path, candidate_hash: Dict[Path, str], spicy_bundle, modes: Optional[Sequence[str]] = None):
+    """Assemble manifest dictionary for writing or downstream use.
+
+    ``modes`` is the tier each block was emitted in, parallel to
+    ``selected_blocks`` (the ``mode`` of ``render_blocks``' JSON entries);
+    without it every block is recorded as ``cfg.llm_mode``.
+    """
     file_manifest = []
-    for (p, _, t) in selected_blocks:
+    for i, (p, _, t) in enumerate(selected_blocks):
         try:
-            entry = {"path": str(p.relative_to(root)), "mode": cfg.llm_mode}
+            entry = {"path": str(p.relative_to(root)), "mode": modes[i] if modes is not None else cfg.llm_mode}
         except ValueError:
             continue
         entry["sha256"] = candidate_hash.get(p)
@@ -156,6 +472,8 @@ def build_manifest(cfg, stats, selected_blocks, root: Path, candidate_hash: Dict
             "total_omitted": stats.total_omitted,
             "total_with_contents": stats.total_with_contents,
             "est_tokens_prompt": stats.est_tokens_prompt,
+            "comment_bytes_saved": stats.comment_bytes_saved,
+            "token_sections": stats.token_sections,
         },
         "files": file_manifest,
     }
@@ -188,5 +506,5 @@ def render_spicy_md(md_output: str, spicy_counts: Dict[str, int], spicy_score: i
     return "\n".join(lines)
 
 
-def render_markdown(cfg, tree_lines, selected_blocks, stats):
-    return to_markdown(cfg, tree_lines, selected_blocks, stats)
+def render_markdown(cfg, tree_lines, selected_blocks, stats, symbol_section=None, shared_headers=None, rollups=None):
+    return to_markdown(cfg, tree_lines, selected_blocks, stats, symbol_section, shared_headers, rollups)
@@ -0,0 +1,219 @@
+"""Directory roll-up summaries.
+
+Each candidate is reduced to a ``FileDigest`` (size, extension, symbol
+counts by kind, public top-level names) from the same symbol pass that feeds
+the symbol index. Digests are combined bottom-up into one ``DirRollup`` per
+directory: every top-level subtree is reduced deepest directories first,
+and the subtree roots are merged into the root. A roll-up keeps only its
+``ROLLUP_EXPORTS`` best names and ``ROLLUP_KEY_FILES`` best files, so
+merging is O(files) and each capsule has a bounded size.
+``fit_rollups`` then picks, coarsest first, the capsules of directories whose
+files were not emitted, within a fixed token allowance.
+"""
+from __future__ import annotations
+
+import heapq
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import Callable, Collection, Dict, List, Optional, Sequence, Tuple
+
+from .tree import _ext, format_aggregate
+
+ROLLUP_BUDGET_SHARE = 0.25  # of budget_tokens, held back from file blocks for capsules
+ROLLUP_EXPORTS = 6
+ROLLUP_EXPORTS_PER_FILE = 2  # so one large module cannot fill a directory's export list
+ROLLUP_KEY_FILES = 3
+
+
+@dataclass(frozen=True)
+class FileDigest:
+    """What a directory capsule needs from one file."""
+
+    path: str  # relative to the root, POSIX separators
+    size: int
+    kinds: Tuple[Tuple[str, int], ...]  # (symbol kind, count)
+    exports: Tuple[str, ...]  # public top-level names, in file order
+    weight: float  # key-file rank: query match, centrality, then symbol count
+
+    @property
+    def parent(self) -> str:
+        return str(PurePosixPath(self.path).parent)
+
+
+@dataclass
+class DirRollup:
+    """Totals of a directory and everything below it."""
+
+    path: str  # "." for the root
+    files: int = 0
+    size: int = 0
+    exts: Counter = field(default_factory=Counter)
+    kinds: Counter = field(default_factory=Counter)
+    exports: List[Tuple[float, str]] = field(default_factory=list)  # (weight, name), best first
+    key_files: List[Tuple[float, str]] = field(default_factory=list)  # (weight, path), best first
+
+    def add(self, digest: FileDigest) -> None:
+        self.files += 1
+        self.size += digest.size
+        self.exts[_ext(digest.path)] += 1
+        self.kinds.update(dict(digest.kinds))
+        exports = digest.exports[:ROLLUP_EXPORTS_PER_FILE]
+        self._keep([(digest.weight, name) for name in exports], [(digest.weight, digest.path)])
+
+    def merge(self, child: "DirRollup") -> None:
+        self.files += child.files
+        self.size += child.size
+        self.exts.update(child.exts)
+        self.kinds.update(child.kinds)
+        self._keep(child.exports, child.key_files)
+
+    def _keep(self, exports: Sequence[Tuple[float, str]], key_files: Sequence[Tuple[float, str]]) -> None:
+        names = {name: (w, name) for w, name in self.exports}
+        for w, name in exports:
+            if name not in names or w > names[name][0]:
+                names[name] = (w, name)
+        self.exports = heapq.nsmallest(ROLLUP_EXPORTS, names.values(), key=_heaviest)
+        self.key_files = heapq.nsmallest(ROLLUP_KEY_FILES, [*self.key_files, *key_files], key=_heaviest)
+
+
+@dataclass(frozen=True)
+class Capsule:
+    """A directory summary chosen for output; ``hidden`` of its files were not emitted."""
+
+    path: str
+    hidden: int
+    text: str
+    tokens: int
+
+
+def _heaviest(item: Tuple[float, str]) -> Tuple[float, str]:
+    return -item[0], item[1]
+
+
+def digest_file(rec: dict, rel: str) -> Optional[FileDigest]:
+    """Digest of a candidate, reading it if needed; None when it cannot be read."""
+    if rec["text"] is None:
+        return None
+    symbols = rec["symbols"]
+    kinds = Counter(sym.kind for sym in symbols)
+    exports = tuple(dict.fromkeys(
+        sym.name for sym in symbols if sym.scope is None and sym.kind != "method" and not sym.name.startswith("_")
+    ))
+    weight = 1000.0 * float(rec.get("match_score") or 0) + 100.0 * float(rec.get("centrality", 0.0)) + len(symbols)
+    return FileDigest(rel, rec.get("size", 0), tuple(sorted(kinds.items())), exports, weight)
+
+
+def _parents(path: str) -> List[str]:
+    """Ancestors of a directory, nearest first, ending at the root (none for the root)."""
+    return [str(p) for p in PurePosixPath(path).parents] if path != "." else []
+
+
+def _depth(path: str) -> int:
+    return 0 if path == "." else len(PurePosixPath(path).parts)
+
+
+def _subtree(digests: List[FileDigest]) -> Dict[str, DirRollup]:
+    """Roll-ups of one top-level subtree; its top directory ends up holding the subtree's totals."""
+    dirs: Dict[str, DirRollup] = {}
+    for digest in digests:
+        dirs.setdefault(digest.parent, DirRollup(digest.parent)).add(digest)
+    for path in list(dirs):
+        for parent in _parents(path)[:-1]:
+            dirs.setdefault(parent, DirRollup(parent))
+    for path in sorted(dirs, key=lambda p: (-_depth(p), p)):
+        if _depth(path) > 1:
+            dirs[_parents(path)[0]].merge(dirs[path])
+    return dirs
+
+
+def build_rollups(records: Sequence[Tuple[str, dict]]) -> Dict[str, DirRollup]:
+    """``dir -> DirRollup`` for ``(rel, candidate)`` pairs, reduced per top-level subtree.
+
+    Each candidate is loaded once; unreadable ones are skipped.
+    """
+    subtrees: Dict[str, List[Tuple[str, dict]]] = {}
+    for rel, rec in records:
+        parts = PurePosixPath(rel).parts
+        subtrees.setdefault(parts[0] if len(parts) > 1 else ".", []).append((rel, rec))
+
+    root = DirRollup(".")
+    rollups: Dict[str, DirRollup] = {".": root}
+    for items in subtrees.values():
+        digests = (digest_file(rec, rel) for rel, rec in items)
+        dirs = _subtree([d for d in digests if d is not None])
+        for path, rollup in dirs.items():
+            if _depth(path) <= 1:
+                root.merge(rollup)
+            if path != ".":
+                rollups[path] = rollup
+    return rollups
+
+
+def format_rollup(rollup: DirRollup, hidden: int) -> str:
+    """Capsule text: aggregate, symbol counts, top exports, key files and how many files it stands in for."""
+    label = "./" if rollup.path == "." else f"{rollup.path}/"
+    lines = [f"{label} {format_aggregate(rollup.files, rollup.size, rollup.exts)}"]
+    if rollup.kinds:
+        counts = ", ".join(f"{kind} {n}" for kind, n in sorted(rollup.kinds.items(), key=lambda kv: (-kv[1], kv[0])))
+        lines.append(f"- symbols: {sum(rollup.kinds.values())} ({counts})")
+    if rollup.exports:
+        lines.append(f"- exports: {', '.join(name for _, name in rollup.exports)}")
+    if rollup.key_files:
+        base = "" if rollup.path == "." else rollup.path + "/"
+        lines.append(f"- key files: {', '.join(p[len(base):] for _, p in rollup.key_files)}")
+    lines.append(f"- not shown above: {hidden} of {rollup.files} files")
+    return "\n".join(lines)
+
+
+def rollup_record(rollup: DirRollup, hidden: int) -> dict:
+    return {
+        "path": rollup.path,
+        "files": rollup.files,
+        "hidden": hidden,
+        "bytes": rollup.size,
+        "extensions": dict(rollup.exts.most_common()),
+        "symbols": dict(rollup.kinds.most_common()),
+        "exports": [name for _, name in rollup.exports],
+        "key_files": [path for _, path in rollup.key_files],
+    }
+
+
+def fit_rollups(
+    rollups: Dict[str, DirRollup],
+    hidden_files: Collection[str],
+    budget: int,
+    cost: Callable[[str, str], int],
+) -> List[Capsule]:
+    """Capsules for directories with files in ``hidden_files``, coarsest first, within ``budget``.
+
+    A directory whose hidden files all sit in one subdirectory adds nothing
+    over that subdirectory and is skipped (the root is always offered).
+    ``cost(dir, text)`` prices a capsule. Returns the chosen capsules in path order.
+    """
+    hidden: Counter = Counter()
+    direct: Counter = Counter()
+    for rel in hidden_files:
+        parent = str(PurePosixPath(rel).parent)
+        direct[parent] += 1
+        for path in [parent, *_parents(parent)]:
+            hidden[path] += 1
+    children: Dict[str, List[str]] = {}
+    for path in hidden:
+        if path != ".":
+            children.setdefault(_parents(path)[0], []).append(path)
+
+    chosen: List[Capsule] = []
+    spent = 0
+    for path in sorted(hidden, key=lambda p: (_depth(p), p)):
+        if path not in rollups:
+            continue
+        kids = children.get(path, [])
+        if path != "." and not direct[path] and len(kids) == 1:
+            continue  # pass-through directory
+        text = format_rollup(rollups[path], hidden[path])
+        tok = cost(path, text)
+        if spent + tok <= budget:
+            chosen.append(Capsule(path, hidden[path], text, tok))
+            spent += tok
+    return sorted(chosen, key=lambda c: c.path)
@@ -5,11 +5,13 @@ reducing low-value implementation details. Reduces tokens while preserving
 semantic understanding.
 """
 
-import ast
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+from ..analysis import PythonAnalysis, analyze_python
+from ..token import estimate_tokens, get_tokenizer
+
 
 class NodePriority(Enum):
     """Priority levels for AST nodes."""
@@ -30,6 +32,11 @@ class CodeSegment:
     docstring: Optional[str]
     signature: str
     content: str
+    first_lineno: int = 0  # first line including decorators (0 = lineno)
+
+    def __post_init__(self):
+        if not self.first_lineno:
+            self.first_lineno = self.lineno
 
 
 class SemanticSampler:
@@ -47,22 +54,22 @@ class SemanticSampler:
         """
         self.preserve_ratio = max(0.1, min(1.0, preserve_ratio))
 
-    def _get_node_priority(self, node: ast.AST, name: str) -> NodePriority:
-        """Determine priority of an AST node.
+    def _get_node_priority(self, kind: str, name: str) -> NodePriority:
+        """Determine priority of a symbol.
 
         Args:
-            node: AST node
-            name: Name of the node
+            kind: Symbol kind ("class" or "function")
+            name: Name of the symbol
 
         Returns:
             NodePriority enum value
         """
         # Public classes are critical
-        if isinstance(node, ast.ClassDef) and not name.startswith('_'):
+        if kind == "class" and not name.startswith('_'):
             return NodePriority.CRITICAL
 
         # Main/entry functions are critical
-        if isinstance(node, ast.FunctionDef):
+        if kind == "function":
             if name in ['main', '__main__', 'run', 'execute']:
                 return NodePriority.CRITICAL
             # Public functions are high priority
@@ -74,99 +81,53 @@ class SemanticSampler:
         # Variables and other nodes
         return NodePriority.LOW
 
-    def _extract_signature(self, node: ast.AST) -> str:
-        """Extract function/class signature.
-
-        Args:
-            node: AST node (ClassDef or FunctionDef)
-
-        Returns:
-            Signature string
-        """
-        if isinstance(node, ast.ClassDef):
-            # Class signature with bases
-            bases = ", ".join(ast.unparse(base) for base in node.bases) if node.bases else ""
-            if bases:
-                return f"class {node.name}({bases})"
-            return f"class {node.name}"
-
-        elif isinstance(node, ast.FunctionDef):
-            # Function signature with args
-            args = ast.unparse(node.args) if node.args else ""
-            returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
-            decorators = "".join(f"@{ast.unparse(d)}\n" for d in node.decorator_list)
-            return f"{decorators}def {node.name}({args}){returns}"
-
-        return str(node)
-
-    def _extract_docstring(self, node: ast.AST) -> Optional[str]:
-        """Extract docstring from node.
-
-        Args:
-            node: AST node
-
-        Returns:
-            Docstring text or None
-        """
-        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.Module)):
-            docstring = ast.get_docstring(node)
-            return docstring
-
-        return None
-
-    def analyze_python_file(self, source_code: str) -> List[CodeSegment]:
+    def analyze_python_file(
+        self,
+        source_code: str,
+        analysis: Optional[PythonAnalysis] = None
+    ) -> List[CodeSegment]:
         """Analyze Python source code and extract semantic segments.
 
         Args:
             source_code: Python source code string
+            analysis: Shared analysis record of ``source_code`` (parsed if None)
 
         Returns:
             List of CodeSegment objects sorted by priority
         """
-        try:
-            tree = ast.parse(source_code)
-        except SyntaxError:
+        if analysis is None:
+            analysis = analyze_python(source_code)
+        if analysis is None:
             # Return empty list if code can't be parsed
             return []
 
         segments = []
 
         # Extract module docstring
-        module_doc = ast.get_docstring(tree)
-        if module_doc:
+        if analysis.module_doc:
             segments.append(CodeSegment(
                 node_type="module",
                 name="__doc__",
                 lineno=1,
                 end_lineno=1,
                 priority=NodePriority.HIGH,
-                docstring=module_doc,
+                docstring=analysis.module_doc,
                 signature="# Module Documentation",
-                content=module_doc
+                content=analysis.module_doc
             ))
 
-        # Walk through AST nodes
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
-                name = node.name
-                priority = self._get_node_priority(node, name)
-                signature = self._extract_signature(node)
-                docstring = self._extract_docstring(node)
-
-                # Get source lines
-                lineno = node.lineno
-                end_lineno = node.end_lineno or lineno
-
-                segments.append(CodeSegment(
-                    node_type="class" if isinstance(node, ast.ClassDef) else "function",
-                    name=name,
-                    lineno=lineno,
-                    end_lineno=end_lineno,
-                    priority=priority,
-                    docstring=docstring,
-                    signature=signature,
-                    content=""  # Will be filled later if needed
-                ))
+        for symbol in analysis.symbols:
+            segments.append(CodeSegment(
+                node_type=symbol.kind,
+                name=symbol.name,
+                lineno=symbol.lineno,
+                end_lineno=symbol.end_lineno,
+                priority=self._get_node_priority(symbol.kind, symbol.name),
+                docstring=symbol.docstring,
+                signature=symbol.signature,
+                content="",  # Will be filled later if needed
+                first_lineno=symbol.first_lineno
+            ))
 
         # Sort by priority (high to low) then by line number
         segments.sort(key=lambda s: (-s.priority.value, s.lineno))
@@ -176,22 +137,32 @@ class SemanticSampler:
     def sample_python_code(
         self,
         source_code: str,
-        max_lines: Optional[int] = None
+        max_lines: Optional[int] = None,
+        analysis: Optional[PythonAnalysis] = None,
+        max_tokens: Optional[int] = None
     ) -> Tuple[str, Dict[str, any]]:
         """Sample Python code intelligently, preserving structure.
 
+        The sample is filled greedily up to a token target: signatures first,
+        then docstrings, then bodies of CRITICAL/HIGH functions in order of
+        priority per token. The result never exceeds the target.
+
         Args:
             source_code: Original Python source code
             max_lines: Maximum lines to keep (None = use preserve_ratio)
+            analysis: Shared analysis record of ``source_code`` (parsed if None)
+            max_tokens: Token target (None = derived from max_lines or preserve_ratio)
 
         Returns:
-            Tuple of (sampled_code, stats_dict)
+            Tuple of (sampled_code, stats_dict); ``stats["tokens"]`` is the
+            exact ``estimate_tokens`` cost of the sample and ``stats["omitted"]``
+            the CRITICAL/HIGH definitions it could not name
         """
         lines = source_code.splitlines(keepends=True)
         total_lines = len(lines)
 
         # Analyze code structure
-        segments = self.analyze_python_file(source_code)
+        segments = self.analyze_python_file(source_code, analysis)
 
         if not segments:
             # Fallback: no AST analysis, return original
@@ -202,36 +173,95 @@ class SemanticSampler:
                 "reduction": 0,
             }
 
-        # Calculate target lines
-        if max_lines is None:
-            target_lines = int(total_lines * self.preserve_ratio)
-        else:
-            target_lines = min(max_lines, total_lines)
-
-        # Build sampled content
-        sampled_parts = []
-        included_lines = 0
-
-        # Include high-priority segments first
+        # Calculate target tokens
+        if max_tokens is None:
+            if max_lines is not None:
+                max_tokens = estimate_tokens("".join(lines[:max_lines]))
+            else:
+                max_tokens = int(estimate_tokens(source_code) * self.preserve_ratio)
+        # Selection budgets characters; the ratio is exact for the len/4 heuristic
+        # and the file's own chars-per-token for a real tokenizer.
+        budget = int(max(0, max_tokens) * get_tokenizer().chars_per_token(source_code))
+
+        # Bodies are the real source of the function, decorators included
         for segment in segments:
-            if included_lines >= target_lines:
-                break
-
-            # Always include signature and docstring
-            sampled_parts.append(f"\n# {segment.node_type.upper()}: {segment.name} (line {segment.lineno})\n")
-            sampled_parts.append(segment.signature)
-
-            if segment.docstring:
-                sampled_parts.append(f'\n    """{segment.docstring}"""')
-
-            # For critical/high priority, include partial implementation
+            if segment.node_type == "function" and segment.priority in [NodePriority.CRITICAL, NodePriority.HIGH]:
+                segment.content = "".join(lines[segment.first_lineno - 1:segment.end_lineno]).rstrip("\n")
+
+        enclosing = self._enclosing_functions(segments)
+
+        def render(segment: CodeSegment, level: str) -> str:
+            header = f"\n# {segment.node_type.upper()}: {segment.name} (line {segment.lineno})\n"
+            if level == "body":
+                return f"{header}{segment.content}\n"
+            parts = [header, segment.signature]
+            if level == "doc":
+                parts.append(f'\n    """{segment.docstring}"""')
+            # For critical/high priority, mark the omitted implementation
             if segment.priority in [NodePriority.CRITICAL, NodePriority.HIGH]:
-                sampled_parts.append("\n    ... # (implementation details)")
-
-            sampled_parts.append("\n")
-            included_lines += 5  # Rough estimate
+                parts.append("\n    ... # (implementation details)")
+            parts.append("\n")
+            return "".join(parts)
+
+        def select(budget: int) -> Dict[int, str]:
+            chosen: Dict[int, str] = {}
+            used = 0
+
+            def upgrade(index: int, level: str) -> None:
+                nonlocal used
+                old = len(render(segments[index], chosen[index])) if index in chosen else 0
+                new = len(render(segments[index], level))
+                if used - old + new <= budget:
+                    used += new - old
+                    chosen[index] = level
+
+            # 1. signatures, 2. docstrings, both in priority order
+            for index in range(len(segments)):
+                upgrade(index, "sig")
+            for index in list(chosen):
+                if segments[index].docstring:
+                    upgrade(index, "doc")
+
+            # 3. bodies, best priority per token first; nested bodies are already covered
+            bodies = sorted(
+                (i for i in chosen if segments[i].node_type == "function" and segments[i].content),
+                key=lambda i: -segments[i].priority.value / estimate_tokens(segments[i].content),
+            )
+            for index in bodies:
+                if not self._inside_body(enclosing, chosen, index):
+                    upgrade(index, "body")
+            return chosen
+
+        def assemble(chosen: Dict[int, str]) -> str:
+            return "".join(
+                render(segments[i], chosen[i])
+                for i in range(len(segments))
+                if i in chosen and not self._inside_body(enclosing, chosen, i)
+            )
+
+        chosen = select(budget)
+        sampled_code = assemble(chosen)
+        tokens = estimate_tokens(sampled_code) if chosen else 0
+        for _ in range(3):
+            # A real tokenizer is not exactly proportional to length: shrink and retry
+            if tokens <= max_tokens:
+                break
+            budget = budget * max_tokens // tokens
+            chosen = select(budget)
+            sampled_code = assemble(chosen)
+            tokens = estimate_tokens(sampled_code) if chosen else 0
+        if tokens > max_tokens:
+            chosen = {}
+
+        if not chosen:
+            # Nothing fits the target: leave the decision to the caller
+            return source_code, {
+                "method": "fallback",
+                "original_lines": total_lines,
+                "sampled_lines": total_lines,
+                "reduction": 0,
+            }
 
-        sampled_code = "".join(sampled_parts)
         sampled_lines = len(sampled_code.splitlines())
 
         stats = {
@@ -242,10 +272,53 @@ class SemanticSampler:
             "segments_extracted": len(segments),
             "critical_count": sum(1 for s in segments if s.priority == NodePriority.CRITICAL),
             "high_count": sum(1 for s in segments if s.priority == NodePriority.HIGH),
+            "bodies_included": sum(1 for level in chosen.values() if level == "body"),
+            # CRITICAL/HIGH definitions the target had no room to name at all
+            "omitted": sum(
+                1 for i, segment in enumerate(segments)
+                if segment.priority in [NodePriority.CRITICAL, NodePriority.HIGH]
+                and i not in chosen and not self._inside_body(enclosing, chosen, i)
+            ),
+            "target_tokens": max_tokens,
+            "tokens": tokens,
         }
 
         return sampled_code, stats
 
+    @staticmethod
+    def _enclosing_functions(segments: List[CodeSegment]) -> List[Tuple[int, ...]]:
+        """Per segment, the other function segments whose lines contain its line.
+
+        Definitions nest, so one sweep in line order with a stack of open
+        functions finds them all; the cost is the nesting depth per segment.
+        """
+        functions = sorted(
+            (s.first_lineno, -s.end_lineno, i) for i, s in enumerate(segments) if s.node_type == "function"
+        )
+        enclosing: List[Tuple[int, ...]] = [()] * len(segments)
+        stack: List[int] = []  # open functions, innermost last
+
+        def close_before(line: int) -> None:
+            # Once the top still contains the line, every outer one does too
+            while stack and segments[stack[-1]].end_lineno < line:
+                stack.pop()
+
+        k = 0
+        for i in sorted(range(len(segments)), key=lambda i: segments[i].lineno):
+            line = segments[i].lineno
+            while k < len(functions) and functions[k][0] <= line:
+                close_before(functions[k][0])
+                stack.append(functions[k][2])
+                k += 1
+            close_before(line)
+            enclosing[i] = tuple(j for j in stack if j != i)
+        return enclosing
+
+    @staticmethod
+    def _inside_body(enclosing: List[Tuple[int, ...]], chosen: Dict[int, str], index: int) -> bool:
+        """True if segment ``index`` lies within another segment whose body is included."""
+        return any(chosen.get(other) == "body" for other in enclosing[index])
+
     def should_use_semantic_sampling(self, file_path: str, file_size: int) -> bool:
         """Determine if semantic sampling should be used for a file.
 
@@ -1,25 +1,83 @@
 """Lightweight query matching utilities for dir2md."""
 
 import textwrap
+from bisect import bisect_right
+from typing import Iterable, Sequence
 
 
-def match_query_snippet(content: str, query: str, window: int = 160, width: int = 300) -> tuple[int, str]:
-    """Return a simple match score and surrounding snippet for a query string."""
+MAX_MATCH_OFFSETS = 1000  # kept per file for query windows; the score still counts every hit
+
+
+def find_query_matches(content: str, query: str, window: int = 160) -> tuple[int, int, int, list[int]]:
+    """Like ``find_query_window``, plus the offsets of the hits, from one scan.
+
+    Hits are case-insensitive and non-overlapping; at most
+    ``MAX_MATCH_OFFSETS`` offsets are kept.
+    """
     if not content or not query:
-        return 0, ""
+        return 0, 0, 0, []
 
     haystack = content.lower()
     needle = query.lower()
+    offsets: list[int] = []
+    score = 0
     idx = haystack.find(needle)
-    if idx == -1:
-        return 0, ""
+    while idx != -1:
+        score += 1
+        if len(offsets) < MAX_MATCH_OFFSETS:
+            offsets.append(idx)
+        idx = haystack.find(needle, idx + len(needle))
+    if not score:
+        return 0, 0, 0, []
+
+    first = offsets[0]
+    start = max(first - window, 0)
+    end = min(first + len(needle) + window, len(content))
+    return score, start, end, offsets
+
+
+def find_query_window(content: str, query: str, window: int = 160) -> tuple[int, int, int]:
+    """Return (score, start, end) of the raw region around the first query hit.
 
-    # Score: count of case-insensitive occurrences
-    score = haystack.count(needle)
+    ``start == end == 0`` when the query does not occur.
+    """
+    score, start, end, _ = find_query_matches(content, query, window)
+    return score, start, end
 
-    start = max(idx - window, 0)
-    end = min(idx + len(needle) + window, len(content))
-    snippet = content[start:end].replace("\n", " ").strip()
+
+def match_windows(line_starts: Sequence[int], offsets: Iterable[int], context: int) -> list[tuple[int, int, int]]:
+    """Line windows around match ``offsets``: ``(first, last, hits)`` with ``last`` exclusive.
+
+    ``line_starts[i]`` is the offset where line ``i`` begins (plus a final
+    end offset); hits past the last line are ignored. Each hit takes
+    ``context`` lines either side, and overlapping or touching windows are
+    merged, in file order.
+    """
+    n = len(line_starts) - 1
+    windows: list[list[int]] = []
+    for off in offsets:
+        if off >= line_starts[-1]:
+            break
+        line = bisect_right(line_starts, off) - 1
+        first, last = max(0, line - context), min(n, line + context + 1)
+        if windows and first <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], last)
+            windows[-1][2] += 1
+        else:
+            windows.append([first, last, 1])
+    return [(first, last, hits) for first, last, hits in windows]
+
+
+def format_snippet(region: str, width: int = 300) -> str:
+    """Collapse whitespace in a snippet region and shorten it to ``width``."""
+    snippet = region.replace("\n", " ").strip()
     snippet = " ".join(snippet.split())
-    snippet = textwrap.shorten(snippet, width=width, placeholder="...")
-    return score, snippet
+    return textwrap.shorten(snippet, width=width, placeholder="...")
+
+
+def match_query_snippet(content: str, query: str, window: int = 160, width: int = 300) -> tuple[int, str]:
+    """Return a simple match score and surrounding snippet for a query string."""
+    score, start, end = find_query_window(content, query, window)
+    if not score:
+        return 0, ""
+    return score, format_snippet(content[start:end], width)
@@ -1,24 +1,391 @@
 """Candidate selection, sampling, and deduplication."""
 from __future__ import annotations
 
+import codecs
+import threading
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Iterator, List, Mapping, Optional, Tuple
 
 from .manifest import sha256_string, sha256_file
-from .masking import apply_masking
+from .masking import SecretHit, mask_stream
 from .simhash import simhash64, hamming
-from .summary import summarize
-from .search import match_query_snippet
+from .search import find_query_matches
+from .analysis import analyze_python
+from .token import estimate_tokens
+from .strip import strip_comments
+from .notebook import notebook_text
+from .symbols import extract_symbols
+from .structure import ChunkStream, structure_summary
+from .graph import ENTRY_POINT_NAMES, centrality, import_specs, is_entry_point
+from .chunking import chunk_text
+from .boilerplate import HEADER_SCAN_BYTES, HEADER_SCAN_LINES, SharedHeader, cut_lines, find_shared_headers
 from .samplers.semantic import SemanticSampler
 
 SINGLE_FILE_MAX_BYTES = 1 * 1024 * 1024  # 1MB guard per file
+OVERSIZED_EXCERPT_CHARS = 32 * 1024  # of masked text kept from each end of a file over the guard
+_STATS_LOCK = threading.Lock()  # roll-ups load candidates from worker threads
 
 
-def build_candidates(cfg, files: List[Path], root: Path, is_included, is_omitted) -> Tuple[List[dict], Dict[Path, str]]:
-    candidates: list[dict] = []
-    sim_seen: list[int] = []
-    candidate_hash: dict[Path, str] = {}
+@dataclass(frozen=True)
+class StagePlan:
+    """Per-file stages a run needs, derived from mode, preset and query.
+
+    ``contents``: files are opened at all (off/fast runs only walk the tree).
+    ``sample``: semantic sampling, which only changes inline output.
+    ``match``: query scoring, needed up front to filter and rank.
+    ``dedup``: simhash, needed up front to drop near-duplicates.
+    ``symbols``: definitions for the cross-file symbol index.
+    ``centrality``: import-graph PageRank per file, a value signal for the
+    optimizer and roll-ups.
+    ``rank``: order by that centrality when there is no query (opt-in).
+    ``headers``: shared license/boilerplate headers, detected across files.
+    ``rollup``: symbols of every candidate, for directory roll-up summaries.
+    ``chunks``: content-defined chunks, for cross-file dedup of inline windows.
+    ``stream``: rank from metadata alone and read in that order only until
+    the budget is full; query matching and dedup then happen per file as
+    ``stream_candidates`` is consumed.
+    """
+
+    contents: bool
+    sample: bool
+    match: bool
+    dedup: bool
+    symbols: bool = False
+    centrality: bool = False
+    rank: bool = False
+    headers: bool = False
+    stream: bool = False
+    rollup: bool = False
+    chunks: bool = False
+
+
+def plan_stages(cfg) -> StagePlan:
+    contents = bool(cfg.include_contents) and cfg.llm_mode != "off"
+    rollup = contents and bool(getattr(cfg, "rollup", False))
+    symbols = contents and bool(getattr(cfg, "symbol_index", False))
+    # The optimizer, roll-ups and the symbol index weigh every file, so they cannot stop early
+    stream = (
+        contents and bool(getattr(cfg, "early_stop", False))
+        and not getattr(cfg, "optimize", False) and not rollup and not symbols
+    )
+    rank = bool(getattr(cfg, "rank_centrality", False))
+    scored = contents and not cfg.query and not stream and (rank or bool(getattr(cfg, "optimize", False)) or rollup)
+    return StagePlan(
+        contents=contents,
+        sample=contents and cfg.llm_mode == "inline" and cfg.preset in ("ai", "pro"),
+        match=contents and bool(cfg.query),
+        dedup=contents and cfg.dedup_bits > 0,
+        symbols=symbols,
+        centrality=scored,
+        rank=scored and rank,
+        headers=contents and bool(getattr(cfg, "elide_headers", False)),
+        stream=stream,
+        rollup=rollup,
+        chunks=contents and cfg.llm_mode == "inline" and bool(getattr(cfg, "chunk_dedup", False)),
+    )
+
+
+class Candidate(dict):
+    """Candidate record whose per-file artifacts are computed on first access.
+
+    ``text`` (``None`` if the file cannot be read), ``analysis``, ``sha256``,
+    ``simhash``, ``match_score``, ``snippet_span``, ``match_offsets`` (every
+    query hit, for query-focused inline windows), ``symbols`` (definitions
+    found in the unmodified text, for the symbol index), ``imports`` (the
+    import specs the graph ranking resolves), ``chunks`` (content-defined
+    chunks of the text, for cross-file dedup) and ``skeleton`` (the data-file
+    structure summary of the text, "" for none) are loaded when read
+    through ``rec[key]`` or ``rec.get(key)``, so each run pays only for the
+    stages its mode touches: ``ref`` never samples, and the full-file hash is
+    computed only for files that are emitted.
+    """
+
+    LAZY = ("text", "analysis", "sha256", "simhash", "match_score", "snippet_span", "match_offsets", "symbols", "imports", "chunks", "skeleton")
+
+    def __init__(self, cfg, plan: StagePlan, path: Path, size: int, stats=None, mtime: float = 0.0):
+        super().__init__(path=path)
+        self._cfg = cfg
+        self._plan = plan
+        self.mtime = mtime  # recency signal for the budget optimizer
+        self._stats = stats
+        self._header_span: Optional[Tuple[int, int]] = None  # set by shared-header detection
+        self.secret_hits: List[SecretHit] = []  # masked while an oversized file streamed past
+        self["size"] = size  # bytes on disk
+        self["summary_lines"] = 10 if self.oversized else 40
+
+    def __missing__(self, key):
+        if key not in self.LAZY:
+            raise KeyError(key)
+        getattr(self, f"_load_{key}")()
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        if key in self or key in self.LAZY:
+            return self[key]
+        return default
 
+    @property
+    def oversized(self) -> bool:
+        # Notebooks are judged by their compacted cell text, not their size on disk (see _read_text)
+        return self["size"] > SINGLE_FILE_MAX_BYTES and self["path"].suffix.lower() != ".ipynb"
+
+    def _placeholder(self) -> str:
+        return f"<Skipped: File too large ({self['size']} bytes > {SINGLE_FILE_MAX_BYTES} bytes limit)>"
+
+    def _load_text(self) -> None:
+        if self.oversized:
+            text = self._read_excerpt()
+        else:
+            text = self._read_text()
+            if text is not None and self._plan.sample and str(self["path"]).endswith(".py") and len(text) > 500:
+                # Phase 3: AST semantic sampling (auto-enabled for Python files in ai/pro presets)
+                if "analysis" not in self:
+                    self["analysis"] = analyze_python(text)
+                analysis = self["analysis"]
+                sampler = SemanticSampler(preserve_ratio=0.6 if self._cfg.preset == 'ai' else 0.7)
+                target = min(int(estimate_tokens(text) * sampler.preserve_ratio), self._cfg.max_file_tokens)
+                sampled_text, stats = sampler.sample_python_code(text, analysis=analysis, max_tokens=target)
+                # An outline that cannot name every key definition is worse than the head/tail window
+                if stats['method'] == 'ast_semantic' and stats['reduction'] > 10 and not stats['omitted']:
+                    text = sampled_text  # ``analysis`` still describes the original source
+        self["text"] = text
+
+    def _read_text(self) -> Optional[str]:
+        path = self["path"]
+        if path.suffix.lower() == ".ipynb":
+            # Read one character past the guard, so an oversized notebook is detected without keeping more
+            limit = SINGLE_FILE_MAX_BYTES + 1
+            if self._cfg.max_bytes is not None:
+                limit = min(limit, self._cfg.max_bytes)
+            try:
+                with path.open("r", encoding="utf-8", errors="replace") as handle:
+                    text = notebook_text(handle, max_chars=limit)
+            except OSError:
+                return None
+            if text is not None and len(text) > SINGLE_FILE_MAX_BYTES:
+                print(f"[WARN] Skipping {path} (notebook cells exceed the {SINGLE_FILE_MAX_BYTES} bytes limit)")
+                return self._placeholder()
+            if text is not None:
+                return text
+        try:
+            # Collect limited bytes for content sampling
+            collected = bytearray()
+            limit = self._cfg.max_bytes
+            with path.open("rb") as handle:
+                while limit is None or len(collected) < limit:
+                    chunk = handle.read(65536 if limit is None else min(65536, limit - len(collected)))
+                    if not chunk:
+                        break
+                    collected.extend(chunk)
+            raw = bytes(collected)
+        except Exception:
+            return None
+
+        text = raw.decode("utf-8", errors="replace")
+        if self._plan.symbols or self._plan.rollup:
+            # Line numbers must refer to the file on disk, so index before stripping
+            analysis = analyze_python(text) if path.suffix.lower() == ".py" else None
+            self["symbols"] = extract_symbols(path, self._rel(), text, analysis)
+            if self._header_span is None and not self._cfg.strip_comments:
+                self["analysis"] = analysis  # the text stays as read, so the parse is reused
+        if self._header_span is not None:
+            text = cut_lines(text, self._header_span)
+        if self._cfg.strip_comments:
+            stripped = strip_comments(path, text)
+            if self._stats is not None:
+                with _STATS_LOCK:
+                    self._stats.comment_bytes_saved += len(text.encode("utf-8")) - len(stripped.encode("utf-8"))
+            text = stripped
+        return text
+
+    def _read_excerpt(self) -> Optional[str]:
+        """Head and tail of an oversized file, masked while the whole file streams past.
+
+        The file (up to ``max_bytes``) goes through ``mask_stream`` in chunks, so
+        a secret is masked whole even where the excerpt cuts it, every secret in
+        the file lands in ``secret_hits``, and memory stays at one masking
+        window plus ``OVERSIZED_EXCERPT_CHARS`` from each end. A data file's
+        ``skeleton`` is scanned from the same masked stream, so it covers the
+        whole file rather than the excerpt.
+        """
+        cfg = self._cfg
+        path = self["path"]
+
+        def chunks() -> Iterator[str]:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            read, limit = 0, cfg.max_bytes
+            with path.open("rb") as handle:
+                while limit is None or read < limit:
+                    raw = handle.read(65536 if limit is None else min(65536, limit - read))
+                    if not raw:
+                        break
+                    read += len(raw)
+                    yield decoder.decode(raw)
+            yield decoder.decode(b"", final=True)
+
+        head: List[str] = []
+        tail: deque = deque()
+        head_len = tail_len = dropped_chars = dropped_lines = 0
+
+        def collected() -> Iterator[str]:
+            nonlocal head_len, tail_len, dropped_chars, dropped_lines
+            for piece in mask_stream(
+                chunks(), cfg.masking_mode, cfg.custom_mask_patterns, cfg.custom_mask_anchors,
+                hits=self.secret_hits, path=self._rel(),
+            ):
+                yield piece
+                if head_len < OVERSIZED_EXCERPT_CHARS:
+                    take = piece[:OVERSIZED_EXCERPT_CHARS - head_len]
+                    head.append(take)
+                    head_len += len(take)
+                    piece = piece[len(take):]
+                if piece:
+                    tail.append(piece)
+                    tail_len += len(piece)
+                    while tail_len - len(tail[0]) >= OVERSIZED_EXCERPT_CHARS:
+                        dropped = tail.popleft()
+                        tail_len -= len(dropped)
+                        dropped_chars += len(dropped)
+                        dropped_lines += dropped.count("\n")
+
+        try:
+            pieces = collected()
+            self["skeleton"] = structure_summary(path, ChunkStream(pieces), self["summary_lines"]) or ""
+            for _ in pieces:  # the scanner may stop early; the tail and secret hits need the rest
+                pass
+        except OSError:
+            return None
+        first, last = "".join(head), "".join(tail)
+        if not dropped_chars and tail_len <= OVERSIZED_EXCERPT_CHARS:
+            return first + last
+        # Cut at line breaks where there are any; the text is already masked, so no cut can split a secret
+        first = first[:first.rfind("\n") + 1 or len(first)]
+        start = max(0, len(last) - OVERSIZED_EXCERPT_CHARS)
+        newline = last.find("\n", start)
+        kept_from = start if newline == -1 else newline + 1
+        omitted = dropped_lines + last.count("\n", 0, kept_from)
+        return (
+            f"<Excerpt: File too large ({self['size']} bytes > {SINGLE_FILE_MAX_BYTES} bytes limit); "
+            f"{omitted} lines omitted between its head and tail>\n"
+            f"{first}...\n{last[kept_from:]}"
+        )
+
+    def _read_head(self) -> List[str]:
+        """First lines of the file, for shared-header detection (complete lines only)."""
+        if self.oversized or self["path"].suffix.lower() == ".ipynb":
+            return []
+        try:
+            with self["path"].open("rb") as handle:
+                raw = handle.read(HEADER_SCAN_BYTES)
+        except OSError:
+            return []
+        lines = raw.decode("utf-8", errors="replace").splitlines(keepends=True)
+        if len(raw) == HEADER_SCAN_BYTES and lines:
+            lines.pop()
+        return lines[:HEADER_SCAN_LINES]
+
+    def _rel(self) -> str:
+        try:
+            return self["path"].relative_to(self._cfg.root).as_posix()
+        except ValueError:
+            return self["path"].as_posix()
+
+    def _load_symbols(self) -> None:
+        self["text"]  # indexed while reading
+        self.setdefault("symbols", [])
+
+    def _load_imports(self) -> None:
+        text = self["text"]
+        self["imports"] = import_specs(self["path"], text, self["analysis"]) if text is not None else ()
+
+    def _load_chunks(self) -> None:
+        text = self["text"]
+        self["chunks"] = chunk_text(text) if text is not None else ()
+
+    def _load_skeleton(self) -> None:
+        text = self["text"]  # an oversized file's skeleton is scanned while it streams
+        if "skeleton" not in self:
+            skeleton = structure_summary(self["path"], text, self["summary_lines"]) if text is not None else None
+            self["skeleton"] = skeleton or ""
+
+    def _load_analysis(self) -> None:
+        text = self["text"]  # sampling records the analysis of the source it sampled
+        if "analysis" not in self:
+            python = text is not None and not self.oversized and self["path"].suffix.lower() == ".py"
+            self["analysis"] = analyze_python(text) if python else None
+
+    def _load_sha256(self) -> None:
+        if self.oversized:
+            self["sha256"] = sha256_string(self._placeholder())
+            return
+        try:
+            # Compute full file hash (OSOT: using manifest.sha256_file)
+            self["sha256"] = sha256_file(self["path"])
+        except OSError:
+            self["sha256"] = None
+
+    def _load_simhash(self) -> None:
+        self["simhash"] = simhash64(self["text"] or "")
+
+    def _load_match_score(self) -> None:
+        match_score, snippet_span, offsets = 0, None, []
+        if self._cfg.query and self["text"]:
+            match_score, start, end, offsets = find_query_matches(self["text"], self._cfg.query)
+            snippet_span = (start, end) if match_score else None
+        self["match_score"] = match_score
+        self["snippet_span"] = snippet_span
+        self["match_offsets"] = offsets
+
+    _load_snippet_span = _load_match_score
+    _load_match_offsets = _load_match_score
+
+
+class CandidateHashes(Mapping):
+    """``path -> sha256`` over candidates, hashing a file only when looked up."""
+
+    def __init__(self, candidates: List[Candidate]):
+        self._records = {rec["path"]: rec for rec in candidates}
+
+    def __getitem__(self, path: Path) -> Optional[str]:
+        return self._records[path]["sha256"]
+
+    def __iter__(self) -> Iterator[Path]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+def build_candidates(
+    cfg, files: List[Path], root: Path, is_included, is_omitted, stats=None,
+) -> Tuple[List[dict], Mapping[Path, str], List[SharedHeader]]:
+    """Filter files into lazily loaded, deduplicated candidate records.
+
+    ``plan_stages(cfg)`` decides what is computed here: nothing is opened when
+    contents are not emitted, and text is read up front only when the query
+    or dedup needs it. Everything else loads on access in ``render_blocks``.
+    Candidates keep raw text; masking happens at emit time over the summary,
+    snippet and inline regions that are actually written. Sampled Python files
+    carry the ``PythonAnalysis`` of their original source under ``analysis``.
+    With ``cfg.strip_comments`` comments and blank lines are removed before
+    sampling, simhash and token estimation; ``stats`` records the bytes saved.
+    With ``cfg.elide_headers`` license headers shared by many files are cut
+    before any of that; the distinct headers are returned third, most common
+    first.
+    Without a query they keep walk order, or with ``cfg.rank_centrality`` are
+    ordered by import-graph centrality.
+    With ``cfg.early_stop`` nothing is read here: candidates come back in
+    ``metadata_rank`` order for ``stream_candidates`` to filter lazily.
+    """
+    plan = plan_stages(cfg)
+    candidates: list[Candidate] = []
+    shared_headers: List[SharedHeader] = []
+    if not plan.contents:
+        return candidates, CandidateHashes(candidates), shared_headers
+
+    records: list[Candidate] = []
     for f in files:
         if cfg.only_ext and f.suffix.lstrip(".").lower() not in cfg.only_ext:
             continue
@@ -39,89 +406,116 @@ def build_candidates(cfg, files: List[Path], root: Path, is_included, is_omitted
                 continue
 
         try:
-            size = f.stat().st_size
+            st = f.stat()
         except OSError:
             continue
+        size = st.st_size
 
-        if size > SINGLE_FILE_MAX_BYTES:
-            print(f"[WARN] Skipping {f} ({size} bytes > {SINGLE_FILE_MAX_BYTES} bytes limit)")
-            text = f"<Skipped: File too large ({size} bytes > {SINGLE_FILE_MAX_BYTES} bytes limit)>"
-            placeholder_hash = sha256_string(text)
-            match_score = 0
-            snippet = ""
-            if cfg.query:
-                match_score, snippet = match_query_snippet(text, cfg.query)
-            sh = simhash64(text)
-            if cfg.dedup_bits > 0 and any(hamming(sh, h0) <= cfg.dedup_bits for h0 in sim_seen):
-                continue
-            sim_seen.append(sh)
-            candidates.append({
-                "path": f,
-                "sha256": placeholder_hash,
-                "summary": summarize(f, text, max_lines=10),
-                "text": text,
-                "simhash": sh,
-                "match_score": match_score,
-                "snippet": snippet,
-            })
-            candidate_hash[f] = placeholder_hash
-            continue
+        rec = Candidate(cfg, plan, f, size, stats, mtime=st.st_mtime)
+        if rec.oversized:
+            print(f"[WARN] Keeping only the head and tail of {f} ({size} bytes > {SINGLE_FILE_MAX_BYTES} bytes limit)")
+        records.append(rec)
 
-        try:
-            # Compute full file hash (OSOT: using manifest.sha256_file)
-            full_file_hash = sha256_file(f)
+    if plan.headers:
+        # Headers must be known before any text is read, so detection reads only the file heads
+        spans, shared_headers = find_shared_headers({i: rec._read_head() for i, rec in enumerate(records)})
+        for i, span in spans.items():
+            records[i]._header_span = span
 
-            # Collect limited bytes for content sampling
-            collected = bytearray()
-            limit = cfg.max_bytes
-            with f.open("rb") as handle:
-                for chunk in iter(lambda: handle.read(65536), b""):
-                    if limit is None or len(collected) < limit:
-                        if limit is None:
-                            collected.extend(chunk)
-                        else:
-                            remaining = limit - len(collected)
-                            if remaining > 0:
-                                collected.extend(chunk[:remaining])
-            raw = bytes(collected)
-        except Exception:
-            continue
+    if plan.stream:
+        rels = [rec._rel() for rec in records]
+        order = sorted(range(len(records)), key=lambda i: metadata_rank(rels[i], records[i]["size"], cfg.query))
+        candidates = [records[i] for i in order]
+        return candidates, CandidateHashes(candidates), shared_headers
 
-        text = raw.decode("utf-8", errors="replace")
-        if cfg.masking_mode != "off" or cfg.custom_mask_patterns:
-            text = apply_masking(text, mode=cfg.masking_mode, custom_patterns=cfg.custom_mask_patterns)
-
-        # Phase 3: AST semantic sampling (auto-enabled for Python files in ai/pro presets)
-        if cfg.preset in ['ai', 'pro'] and str(f).endswith('.py') and len(text) > 500:
-            sampler = SemanticSampler(preserve_ratio=0.6 if cfg.preset == 'ai' else 0.7)
-            sampled_text, stats = sampler.sample_python_code(text)
-            if stats['method'] == 'ast_semantic' and stats['reduction'] > 10:
-                text = sampled_text
-                # Note: Semantic sampling applied with {stats['reduction']:.1f}% reduction
-
-        match_score = 0
-        snippet = ""
-        if cfg.query:
-            match_score, snippet = match_query_snippet(text, cfg.query)
-        sh = simhash64(text)
-        if cfg.dedup_bits > 0 and any(hamming(sh, h0) <= cfg.dedup_bits for h0 in sim_seen):
+    sim_seen: list[int] = []
+    for rec in records:
+        if (plan.match or plan.dedup) and rec["text"] is None:
             continue
-        sim_seen.append(sh)
-        candidates.append({
-            "path": f,
-            "sha256": full_file_hash,
-            "summary": summarize(f, text, max_lines=40),
-            "text": text,
-            "simhash": sh,
-            "match_score": match_score,
-            "snippet": snippet,
-        })
-        candidate_hash[f] = full_file_hash
-
-    if cfg.query:
-        matched = [rec for rec in candidates if rec.get("match_score", 0) > 0]
+        if plan.dedup:
+            sh = rec["simhash"]
+            if any(hamming(sh, h0) <= cfg.dedup_bits for h0 in sim_seen):
+                continue
+            sim_seen.append(sh)
+        candidates.append(rec)
+
+    if plan.match:
+        matched = [rec for rec in candidates if rec["match_score"] > 0]
         if matched:
             candidates = matched
-        candidates.sort(key=lambda rec: rec.get("match_score", 0), reverse=True)
+        candidates.sort(key=lambda rec: rec["match_score"], reverse=True)
+    elif plan.centrality:
+        _score_centrality(candidates)
+        if plan.rank:
+            candidates.sort(key=lambda rec: rec["centrality"], reverse=True)  # stable: ties keep walk order
+
+    return candidates, CandidateHashes(candidates), shared_headers
+
+
+def _score_centrality(candidates: List[Candidate]) -> None:
+    """Set each candidate's ``centrality`` to its import-graph PageRank."""
+    by_rel = {rec._rel(): rec for rec in candidates}
+    entry_points = [
+        rel for rel, rec in by_rel.items()
+        if rec["text"] is not None and is_entry_point(rec["path"], rec["text"])
+    ]
+    scores = centrality({rel: rec["imports"] for rel, rec in by_rel.items()}, entry_points)
+    for rel, rec in by_rel.items():
+        rec["centrality"] = scores[rel]
+
+
+_EXT_PRIORITY = {  # source first, then docs, then config and data
+    **{ext: 0 for ext in ("py", "ts", "tsx", "js", "jsx", "go", "rs", "java", "kt", "c", "h", "cpp", "hpp", "cs", "rb", "php", "swift")},
+    **{ext: 1 for ext in ("md", "rst", "txt", "ipynb")},
+    **{ext: 2 for ext in ("toml", "yaml", "yml", "json", "cfg", "ini")},
+}
 
-    return candidates, candidate_hash
+
+def metadata_rank(rel: str, size: int, query: Optional[str]) -> tuple:
+    """Sort key from the path and size alone, for ranking before anything is read.
+
+    Query words in the path come first, then entry points, source before
+    docs before config, shallow before deep, and small before large (more
+    files fit the budget).
+    """
+    lowered = rel.lower()
+    path_hits = sum(1 for word in (query or "").lower().split() if word in lowered)
+    name = rel.rsplit("/", 1)[-1]
+    ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+    return (-path_hits, name not in ENTRY_POINT_NAMES, _EXT_PRIORITY.get(ext, 3), rel.count("/"), size, rel)
+
+
+def stream_candidates(cfg, candidates: List[Candidate]) -> Iterator[Candidate]:
+    """Readable, deduplicated candidates in rank order, reading each only when reached.
+
+    With a query, files whose content misses it are held back and yielded
+    only if nothing matched, as ``build_candidates`` does when it ranks up
+    front. The consumer stops iterating once the budget is full, so the
+    files after that point are never opened.
+    """
+    plan = plan_stages(cfg)
+    sim_seen: list[int] = []
+    misses: list[Candidate] = []
+    matched = False
+
+    def fresh(rec: Candidate) -> bool:
+        if rec["text"] is None:
+            return False
+        if plan.dedup:
+            sh = rec["simhash"]
+            if any(hamming(sh, h0) <= cfg.dedup_bits for h0 in sim_seen):
+                return False
+            sim_seen.append(sh)
+        return True
+
+    for rec in candidates:
+        if rec["text"] is None:
+            continue
+        if plan.match and rec["match_score"] <= 0:
+            misses.append(rec)
+            continue
+        matched = True
+        if fresh(rec):
+            yield rec
+    if not matched:
+        yield from (rec for rec in misses if fresh(rec))
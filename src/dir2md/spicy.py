@@ -5,6 +5,9 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, List, Tuple
 
+from .masking import MaskingSession
+from .selector import plan_stages
+
 SPICY_LEVELS = ["ok", "warn", "risk", "high", "critical"]
 LEVEL_TO_CHILI = {
     "ok": "⚪️",
@@ -15,6 +18,25 @@ LEVEL_TO_CHILI = {
 }
 
 
+# Severity of a masked secret by masking rule; custom patterns are treated as high.
+SECRET_SEVERITY = {
+    "PRIVATE_KEY": "critical",
+    "AWS_ACCESS_KEY_ID": "high",
+    "AWS_SECRET_ACCESS_KEY": "high",
+    "GITHUB_TOKEN": "high",
+    "GITHUB_PAT": "high",
+    "SLACK_TOKEN": "high",
+    "GCP_KEY": "high",
+    "GENERIC_API_KEY": "high",
+    "OAUTH_CLIENT_SECRET": "high",
+    "BEARER_TOKEN": "high",
+    "DATABASE_URL": "high",
+    "JWT_TOKEN": "risk",
+    "AZURE_KEY": "warn",
+}
+SEVERITY_SCORE = {"warn": 5, "risk": 10, "high": 20, "critical": 30}
+
+
 @dataclass
 class Finding:
     file: str
@@ -40,9 +62,34 @@ def _add(findings: List[Finding], level: str, category: str, message: str, sugge
     )
 
 
-def evaluate_spicy(cfg, stats, candidates, selected_blocks) -> Tuple[int, Dict[str, int], List[Finding]]:
+def scan_secrets(masker: MaskingSession, candidates) -> None:
+    """Record the secrets of every candidate's text in ``masker``, emitted or not (for ``--spicy-strict``).
+
+    Masking only scans the regions it emits, so its hits miss files that did
+    not fit the budget. This is an extra pass over each candidate's loaded
+    text (capped at ``max_bytes``) through the run's own views, so only what
+    emitting did not cover is scanned and nothing is recorded twice. Files
+    over the size guard were masked as they streamed in; their hits are
+    already on the candidate.
+    """
+    if not masker.active:
+        return
+    for rec in candidates:
+        if rec.oversized:
+            rec["text"]  # streamed through masking as it loads
+            continue
+        text = rec["text"]
+        if text:
+            masker.view(text, rec._rel()).scan()
+
+
+def evaluate_spicy(cfg, stats, candidates, selected_blocks, secret_hits=None, written_hits=None) -> Tuple[int, Dict[str, int], List[Finding]]:
     """
     Evaluate simple rule-based risk and produce severity counts and findings.
+    ``secret_hits`` are the ``SecretHit`` records collected while masking (and
+    by ``scan_secrets``); each (rule, file) pair becomes one finding at the
+    rule's severity. Hits in ``written_hits`` were masked in blocks that went
+    into the output; the rest are reported as found in the repository.
     Returns (score 0-100, counts dict, findings list).
     """
     findings: List[Finding] = []
@@ -57,6 +104,29 @@ def evaluate_spicy(cfg, stats, candidates, selected_blocks) -> Tuple[int, Dict[s
     if cfg.masking_mode == "off" and cfg.preset != "raw":
         bump("high", 20, "security", "masking is off in non-raw preset (secrets may leak)", "use --masking basic or advanced")
 
+    for pattern, reason in cfg.mask_disabled_rules.items():
+        bump("high", 20, "security", f"custom mask pattern {pattern!r} disabled ({reason}); its secrets were not masked", "simplify the pattern or declare anchors for it")
+
+    written = set(written_hits or ())
+    grouped: Dict[Tuple[str, str, bool], List[int]] = {}
+    for hit in secret_hits or []:
+        grouped.setdefault((hit.rule, hit.file, hit in written), []).append(hit.line)
+    for (rule, file, shown), lines in grouped.items():
+        custom = rule.startswith("CUSTOM:")
+        level = "high" if custom else SECRET_SEVERITY.get(rule, "risk")
+        label = f"custom pattern {rule[7:]!r}" if custom else rule
+        plural = "es" if len(lines) > 1 else ""
+        where = "masked in output" if shown else "found in the repository"
+        bump(
+            level,
+            SEVERITY_SCORE[level],
+            "security",
+            f"{len(lines)} {label} match{plural} {where}",
+            "remove the secret from the repository and rotate it",
+            file=file,
+            line=min(lines),
+        )
+
     # NOTE: Phantom Code Detection via external tools (like vulture) removed in v1.2.1
     # Reason: Security risk (RCE vector via malicious binary in PATH) + unreliable dependency
     # Future: Implement dead code detection using AST analysis or vulture library API (not subprocess)
@@ -71,7 +141,9 @@ def evaluate_spicy(cfg, stats, candidates, selected_blocks) -> Tuple[int, Dict[s
     if cfg.include_contents and cfg.max_bytes and cfg.max_bytes > 500_000:
         bump("warn", 5, "performance", "max_bytes set very high; large files may be ingested", "lower --max-bytes or use --fast/--omit-glob")
 
-    if cfg.query and not any(rec.get("match_score", 0) > 0 for rec in candidates):
+    plan = plan_stages(cfg)
+    scored = (rec for rec in candidates if not plan.stream or "match_score" in rec)  # never read more files here
+    if plan.match and not any(rec.get("match_score", 0) > 0 for rec in scored):
         bump("warn", 5, "relevance", "query provided but no files matched", "adjust --query or include_glob/only_ext")
 
     # counts by severity
@@ -0,0 +1,349 @@
+"""Comment and blank-line stripping for inline content.
+
+Python goes through ``tokenize``; other languages use a small lexer that
+knows their comment markers, string quotes and literal forms (JS regexes,
+Rust raw strings, C# verbatim strings, C++ raw strings), so comment markers
+inside them (and blank lines inside multi-line strings) are left alone.
+Unknown extensions and text that fails to lex are returned unchanged.
+"""
+from __future__ import annotations
+
+import io
+import re
+import tokenize
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set, Tuple
+
+_CHAR_LITERAL = re.compile(r"'(?:\\[^'\n]{1,10}|[^\\'\n])'")
+_HEREDOC = re.compile(r"<<-?\s*(['\"]?)([A-Za-z_][A-Za-z0-9_]*)\1")
+_YAML_BLOCK_SCALAR = re.compile(r"[|>][0-9+-]*$")
+
+
+def _keep_lines(text: str, protected: Set[int], cut: Set[int]) -> str:
+    """Drop blank lines (except protected ones) and trailing space left by removed comments."""
+    out = []
+    for i, ln in enumerate(text.split("\n")):
+        if i in protected:
+            out.append(ln)
+            continue
+        if i in cut:
+            ln = ln.rstrip()
+        if ln.strip():
+            out.append(ln)
+    result = "\n".join(out)
+    return result + "\n" if text.endswith("\n") and result else result
+
+
+def _strip_python(text: str) -> str:
+    """Remove ``#`` comments with ``tokenize``; keep the shebang and string contents."""
+    removals: list[Tuple[int, int]] = []  # (row, col), 0-based
+    protected: Set[int] = set()
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(text).readline):
+            if tok.type == tokenize.COMMENT:
+                row, col = tok.start
+                if not (row == 1 and tok.string.startswith("#!")):
+                    removals.append((row - 1, col))
+            elif tok.type == tokenize.STRING or tok.type == getattr(tokenize, "FSTRING_MIDDLE", -1):
+                protected.update(range(tok.start[0], tok.end[0]))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return text
+    lines = text.split("\n")
+    for row, col in removals:
+        lines[row] = lines[row][:col]
+    return _keep_lines("\n".join(lines), protected, {row for row, _ in removals})
+
+
+class _Ambiguous(Exception):
+    """The lexer cannot tell literal text from code; the input is kept as is."""
+
+
+def _ident_before(text: str, i: int) -> bool:
+    return i > 0 and (text[i - 1].isalnum() or text[i - 1] in "_$")
+
+
+_RUST_RAW = re.compile(r'b?r(#*)"')
+_CSHARP_VERBATIM = re.compile(r'(?:\$+@|@\$*)"')
+_CPP_RAW = re.compile(r'(?:u8|[uUL])?R"([^()\\\s]{0,16})\(')
+_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw", "yield", "await", "instanceof"}
+
+
+def _rust_raw_string(text: str, i: int) -> Optional[int]:
+    """End of a Rust raw string ``r"..."``/``r#"..."#`` (no escapes) starting at ``i``."""
+    m = _RUST_RAW.match(text, i)
+    if not m or _ident_before(text, i):
+        return None
+    end = text.find('"' + m.group(1), m.end())
+    if end < 0:
+        raise _Ambiguous
+    return end + 1 + len(m.group(1))
+
+
+def _csharp_verbatim_string(text: str, i: int) -> Optional[int]:
+    """End of a C# verbatim string ``@"..."`` (``""`` is its only escape)."""
+    m = _CSHARP_VERBATIM.match(text, i)
+    if not m:
+        return None
+    j = m.end()
+    while True:
+        j = text.find('"', j)
+        if j < 0:
+            raise _Ambiguous
+        if not text.startswith('""', j):
+            return j + 1
+        j += 2
+
+
+def _cpp_raw_string(text: str, i: int) -> Optional[int]:
+    """End of a C++ raw string ``R"delim(...)delim"``."""
+    m = _CPP_RAW.match(text, i)
+    if not m or _ident_before(text, i):
+        return None
+    end = text.find(")" + m.group(1) + '"', m.end())
+    if end < 0:
+        raise _Ambiguous
+    return end + len(m.group(1)) + 2
+
+
+def _js_regex(text: str, i: int) -> Optional[int]:
+    """End of a JS regex literal at ``i``, or None where ``/`` is division.
+
+    A ``/`` starts a regex after an operator, an opening bracket or one of
+    ``_REGEX_KEYWORDS``; after a name, a number or a closing bracket it is
+    division. A regex runs to the next unescaped ``/`` outside a ``[...]``
+    class, then its flags; reaching a newline first means the guess was
+    wrong.
+    """
+    if text.startswith(("//", "/*"), i):
+        return None
+    k = i - 1
+    while k >= 0 and text[k] in " \t\r\n":
+        k -= 1
+    if k >= 0 and text[k] not in _REGEX_AFTER:
+        w = k
+        while w >= 0 and (text[w].isalnum() or text[w] in "_$"):
+            w -= 1
+        if text[w + 1:k + 1] not in _REGEX_KEYWORDS:
+            return None
+    j, n, in_class = i + 1, len(text), False
+    while j < n:
+        ch = text[j]
+        if ch == "\\":
+            j += 2
+            continue
+        if ch == "\n":
+            raise _Ambiguous
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "/":
+            j += 1
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            return j
+        j += 1
+    raise _Ambiguous
+
+
+@dataclass(frozen=True)
+class _LexSpec:
+    line_comments: Tuple[str, ...]
+    block_comment: Optional[Tuple[str, str]] = None
+    quotes: Tuple[str, ...] = ('"',)  # longest first
+    raw_quotes: Tuple[str, ...] = ()  # quotes without backslash escapes
+    multiline_quotes: Tuple[str, ...] = ()  # quotes whose strings may span lines
+    char_literals: bool = False  # C-style 'x' literals; a lone ' is plain text (Rust lifetimes)
+    literals: Tuple[Tuple[str, Callable[[str, int], Optional[int]]], ...] = ()  # (first chars, end finder) for raw strings, regexes
+    comment_at_word_start: bool = False  # shell: '#' only starts a comment after whitespace
+    heredocs: bool = False
+    keep_shebang: bool = False
+
+
+def _strip_lexed(text: str, spec: _LexSpec) -> str:
+    """Strip with ``spec``; text the lexer cannot follow (a string running
+    into a line end it may not span, an unterminated string or comment) is
+    returned unchanged rather than risk cutting code after a fake quote.
+    """
+    try:
+        return _lex(text, spec)
+    except _Ambiguous:
+        return text
+
+
+def _lex(text: str, spec: _LexSpec) -> str:
+    out: list[str] = []
+    protected: Set[int] = set()
+    cut: Set[int] = set()
+    line = 0
+    heredoc: Optional[str] = None
+    i, n = 0, len(text)
+    if spec.keep_shebang and text.startswith("#!"):
+        i = text.find("\n")
+        i = n if i < 0 else i
+        out.append(text[:i])
+    while i < n:
+        c = text[i]
+        if c == "\n":
+            out.append(c)
+            line += 1
+            i += 1
+            if heredoc is not None:
+                # Copy the here-document body verbatim up to its delimiter line
+                while i < n:
+                    end = text.find("\n", i)
+                    end = n if end < 0 else end
+                    body = text[i:end]
+                    out.append(text[i:end + 1])
+                    protected.add(line)
+                    i = end + 1
+                    if body.strip() == heredoc:
+                        break
+                    line += 1
+                else:
+                    break
+                line += 1
+                heredoc = None
+            continue
+        end_of = next((find(text, i) for starts, find in spec.literals if c in starts), None)
+        if end_of is not None:
+            for _ in range(text.count("\n", i, end_of)):
+                line += 1
+                protected.add(line)
+            out.append(text[i:end_of])
+            i = end_of
+            continue
+        quote = next((q for q in spec.quotes if text.startswith(q, i)), None)
+        if quote == "'" and spec.char_literals:
+            m = _CHAR_LITERAL.match(text, i)
+            quote = None
+            if m:
+                out.append(m.group(0))
+                i = m.end()
+                continue
+        if quote:
+            raw = quote in spec.raw_quotes
+            j = i + len(quote)
+            while j < n and not text.startswith(quote, j):
+                step = 2 if text[j] == "\\" and not raw else 1
+                if "\n" in text[j:j + step]:
+                    if step == 1 and quote not in spec.multiline_quotes:
+                        raise _Ambiguous
+                    line += 1
+                    protected.add(line)
+                j += step
+            if j >= n:
+                raise _Ambiguous
+            j += len(quote)
+            out.append(text[i:j])
+            i = j
+            continue
+        if spec.block_comment and text.startswith(spec.block_comment[0], i):
+            end = text.find(spec.block_comment[1], i + len(spec.block_comment[0]))
+            if end < 0:
+                raise _Ambiguous
+            end += len(spec.block_comment[1])
+            newlines = text.count("\n", i, end)
+            cut.update(range(line, line + newlines + 1))
+            out.append("\n" * newlines)
+            line += newlines
+            i = end
+            continue
+        marker = next((m for m in spec.line_comments if text.startswith(m, i)), None)
+        if marker and (not spec.comment_at_word_start or i == 0 or text[i - 1] in " \t\n;"):
+            end = text.find("\n", i)
+            i = n if end < 0 else end
+            cut.add(line)
+            continue
+        if spec.heredocs and c == "<":
+            m = _HEREDOC.match(text, i)
+            if m:
+                heredoc = m.group(2)
+                out.append(m.group(0))
+                i = m.end()
+                continue
+        out.append(c)
+        i += 1
+    return _keep_lines("".join(out), protected, cut)
+
+
+def _strip_yaml(text: str) -> str:
+    """Remove YAML comments line by line, leaving block scalars (``|``/``>``) verbatim."""
+    out: list[str] = []
+    block_indent: Optional[int] = None
+    for ln in text.split("\n"):
+        indent = len(ln) - len(ln.lstrip())
+        if block_indent is not None:
+            if not ln.strip() or indent > block_indent:
+                out.append(ln)
+                continue
+            block_indent = None
+        quote = None
+        cut_at = len(ln)
+        for j, ch in enumerate(ln):
+            if quote:
+                if ch == quote:
+                    quote = None
+            elif ch in "\"'" and (j == 0 or ln[j - 1] in " \t:[{,-"):
+                quote = ch
+            elif ch == "#" and (j == 0 or ln[j - 1] in " \t"):
+                cut_at = j
+                break
+        code = ln[:cut_at].rstrip()
+        if not code.strip():
+            continue
+        if _YAML_BLOCK_SCALAR.search(code):
+            block_indent = indent
+        out.append(code)
+    result = "\n".join(out)
+    return result + "\n" if text.endswith("\n") and result else result
+
+
+_C = _LexSpec(("//",), ("/*", "*/"), quotes=('"', "'"), char_literals=True, literals=(("uULR", _cpp_raw_string),))
+_JVM = _LexSpec(("//",), ("/*", "*/"), quotes=('"""', '"', "'"), multiline_quotes=('"""',), char_literals=True)
+_CSHARP = _LexSpec(
+    ("//",), ("/*", "*/"), quotes=('"""', '"', "'"), raw_quotes=('"""',), multiline_quotes=('"""',),
+    char_literals=True, literals=(("@$", _csharp_verbatim_string),),
+)
+_RUST = _LexSpec(("//",), ("/*", "*/"), quotes=('"', "'"), multiline_quotes=('"',), char_literals=True, literals=(("br", _rust_raw_string),))
+_JS = _LexSpec(("//",), ("/*", "*/"), quotes=('"', "'", "`"), multiline_quotes=("`",), literals=(("/", _js_regex),))
+_GO = _LexSpec(("//",), ("/*", "*/"), quotes=('"', "'", "`"), raw_quotes=("`",), multiline_quotes=("`",), char_literals=True)
+_SHELL = _LexSpec(
+    ("#",), quotes=('"', "'"), raw_quotes=("'",), multiline_quotes=('"', "'"),
+    comment_at_word_start=True, heredocs=True, keep_shebang=True,
+)
+_TOML = _LexSpec(("#",), quotes=('"""', "'''", '"', "'"), raw_quotes=("'''", "'"), multiline_quotes=('"""', "'''"))
+
+
+def _lexed(spec: _LexSpec) -> Callable[[str], str]:
+    return lambda text: _strip_lexed(text, spec)
+
+
+STRIPPERS: Dict[str, Callable[[str], str]] = {
+    ".py": _strip_python,
+    ".pyi": _strip_python,
+    ".yaml": _strip_yaml,
+    ".yml": _strip_yaml,
+    ".toml": _lexed(_TOML),
+    ".go": _lexed(_GO),
+    ".rs": _lexed(_RUST),
+    ".cs": _lexed(_CSHARP),
+}
+for _ext in (".c", ".h", ".cc", ".cpp", ".cxx", ".hpp", ".hh"):
+    STRIPPERS[_ext] = _lexed(_C)
+for _ext in (".java", ".kt", ".swift", ".scala"):
+    STRIPPERS[_ext] = _lexed(_JVM)
+for _ext in (".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".mts", ".cts"):
+    STRIPPERS[_ext] = _lexed(_JS)
+for _ext in (".sh", ".bash", ".zsh"):
+    STRIPPERS[_ext] = _lexed(_SHELL)
+
+
+def strip_comments(path: Path, text: str) -> str:
+    """Return ``text`` without comments and blank lines for known languages."""
+    stripper = STRIPPERS.get(path.suffix.lower())
+    if stripper is None:
+        return text
+    return stripper(text)
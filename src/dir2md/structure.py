@@ -0,0 +1,500 @@
+"""Streaming key-path skeletons for JSON, YAML and TOML.
+
+Data and config files are summarized by their structure rather than their
+first lines: one line per key path with the value types seen there, array
+lengths and object sizes. The scanners read a text stream incrementally
+(JSON in chunks, YAML/TOML by line) and keep only the skeleton, bounded by
+``MAX_SKELETON_DEPTH`` and ``MAX_SKELETON_PATHS``; string values are never
+held beyond ``MAX_KEY_CHARS``. Over a ``ChunkStream`` a multi-megabyte file
+is summarized in bounded memory as it is read. ``JsonTokens`` and
+``Skeleton`` are public so other streaming readers (notebooks) can reuse them.
+"""
+from __future__ import annotations
+
+import io
+import re
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+MAX_SKELETON_DEPTH = 6
+MAX_SKELETON_PATHS = 200
+MAX_KEYS_PER_OBJECT = 16  # further keys of one object are folded into ``parent.*``
+MAX_KEY_CHARS = 256
+MAX_SCAN_BYTES = 16 * 1024 * 1024  # stop reading (and say so) after this much input
+_CHUNK = 64 * 1024
+
+
+class Skeleton:
+    """Ordered key-path -> (types, sizes) with depth and path caps."""
+
+    def __init__(self) -> None:
+        self.paths: Dict[str, Dict[str, object]] = {}
+        self.dropped = 0
+        self.documents = 0
+        self.truncated = False
+
+    def record(self, path: str, kind: str, size: Optional[int] = None, depth: int = 0) -> None:
+        if depth > MAX_SKELETON_DEPTH:
+            return
+        info = self.paths.get(path)
+        if info is None:
+            if len(self.paths) >= MAX_SKELETON_PATHS:
+                self.dropped += 1
+                return
+            info = self.paths[path] = {"types": [], "min": None, "max": None}
+        types = info["types"]
+        if kind not in types:
+            types.append(kind)  # type: ignore[union-attr]
+        if size is not None:
+            info["min"] = size if info["min"] is None else min(info["min"], size)  # type: ignore[type-var]
+            info["max"] = size if info["max"] is None else max(info["max"], size)  # type: ignore[type-var]
+
+    def lines(self, max_lines: int) -> List[str]:
+        out: List[str] = []
+        if self.documents > 1:
+            out.append(f"- documents: {self.documents}")
+        for path, info in self.paths.items():
+            desc = []
+            for kind in info["types"]:  # type: ignore[union-attr]
+                lo, hi = info["min"], info["max"]
+                if kind in ("array", "object") and lo is not None:
+                    n = str(lo) if lo == hi else f"{lo}-{hi}"
+                    desc.append(f"array[{n}]" if kind == "array" else f"object{{{n}}}")
+                else:
+                    desc.append(kind)
+            out.append(f"- {path}: {' | '.join(desc)}")
+        if len(out) > max_lines:
+            self.dropped += len(out) - max_lines
+            out = out[:max_lines]
+        if self.dropped:
+            out.append(f"- ... {self.dropped} more paths")
+        if self.truncated:
+            out.append(f"- ... (scan stopped after {MAX_SCAN_BYTES} bytes)")
+        return out
+
+
+_PLAIN_KEY = re.compile(r"[A-Za-z_][\w-]*")
+
+
+def _child(parent: str, key: str, seen: int) -> str:
+    if seen >= MAX_KEYS_PER_OBJECT:
+        return f"{parent}.*"
+    key = key[:64]
+    return f"{parent}.{key}" if _PLAIN_KEY.fullmatch(key) else f"{parent}[{key!r}]"
+
+
+_JSON_STOP = re.compile(r'[\\"]')
+_JSON_ATOM = re.compile(r"[^\s,:\[\]{}\"]+")
+_JSON_WS = re.compile(r"\s*")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?$")
+
+
+class JsonTokens:
+    """Incremental JSON tokenizer over a text stream (keeps one chunk plus short strings).
+
+    Strings are yielded raw (escapes not decoded) and cut to ``keep_chars``
+    (``None`` keeps them whole), which a consumer may change between tokens.
+    """
+
+    def __init__(self, stream: TextIO, skeleton: Skeleton, max_scan: int = MAX_SCAN_BYTES):
+        self.stream = stream
+        self.skeleton = skeleton
+        self.max_scan = max_scan
+        self.keep_chars: Optional[int] = MAX_KEY_CHARS
+        self.buf = ""
+        self.pos = 0
+        self.read = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(_CHUNK)
+        self.read += len(chunk)
+        if not chunk or self.read > self.max_scan:
+            self.eof = True
+            self.skeleton.truncated = bool(chunk)
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[str]]]:
+        while True:
+            m = _JSON_WS.match(self.buf, self.pos)
+            self.pos = m.end()
+            if self.pos >= len(self.buf):
+                if not self._fill():
+                    return
+                continue
+            c = self.buf[self.pos]
+            if c in "{}[],:":
+                self.pos += 1
+                yield c, None
+            elif c == '"':
+                yield "str", self._string()
+            else:
+                m = _JSON_ATOM.match(self.buf, self.pos)
+                if m is None:
+                    return  # not JSON
+                while m.end() == len(self.buf) and self._fill():
+                    m = _JSON_ATOM.match(self.buf, self.pos)
+                self.pos = m.end()
+                yield "atom", m.group(0)
+
+    def _string(self) -> str:
+        """Consume a string; only its first ``keep_chars`` chars are kept."""
+        kept: List[str] = []
+        size = 0
+        limit = sys.maxsize if self.keep_chars is None else self.keep_chars
+        k = self.pos + 1
+        while True:
+            m = _JSON_STOP.search(self.buf, k)
+            if m is None:
+                if size < limit:
+                    kept.append(self.buf[k:k + limit - size])
+                    size += len(kept[-1])
+                self.pos = len(self.buf)
+                if not self._fill():
+                    return "".join(kept)
+                k = 0
+                continue
+            j = m.start()
+            if self.buf[j] == "\\" and j + 1 >= len(self.buf):
+                # escape split across chunks: refill and rescan from the backslash
+                if size < limit:
+                    kept.append(self.buf[k:min(j, k + limit - size)])
+                    size += len(kept[-1])
+                self.pos = j
+                if not self._fill():
+                    return "".join(kept)
+                k = 0
+                continue
+            stop = j if self.buf[j] == '"' else j + 2
+            if size < limit:
+                kept.append(self.buf[k:min(stop, k + limit - size)])
+                size += len(kept[-1])
+            if self.buf[j] == '"':
+                self.pos = j + 1
+                return "".join(kept)
+            k = stop
+
+
+def _atom_type(atom: str) -> str:
+    if atom in ("true", "false"):
+        return "bool"
+    if atom == "null":
+        return "null"
+    m = _NUMBER.match(atom)
+    if m:
+        return "float" if m.group(1) or m.group(2) else "int"
+    return "str"
+
+
+def _json_skeleton(stream: TextIO) -> Skeleton:
+    sk = Skeleton()
+    # stack entries: [kind, path, depth, count, pending_key]
+    stack: List[list] = []
+
+    def value_path() -> Tuple[str, int]:
+        if not stack:
+            return "$", 0
+        kind, path, depth, count, key = stack[-1]
+        if kind == "arr":
+            return f"{path}[]", depth + 1
+        return _child(path, key or "", count - 1), depth + 1
+
+    expect_key = False
+    for tok, val in JsonTokens(stream, sk):
+        if tok == "str" and expect_key:
+            stack[-1][3] += 1
+            stack[-1][4] = val
+            expect_key = False
+            continue
+        if tok in ("{", "["):
+            path, depth = value_path()
+            if stack and stack[-1][0] == "arr":
+                stack[-1][3] += 1
+            stack.append(["obj" if tok == "{" else "arr", path, depth, 0, None])
+            sk.record(path, "object" if tok == "{" else "array", depth=depth)  # keep paths in document order
+            expect_key = tok == "{"
+        elif tok in ("}", "]"):
+            if not stack:
+                break
+            kind, path, depth, count, _ = stack.pop()
+            sk.record(path, "object" if kind == "obj" else "array", count, depth)
+            expect_key = False
+            if not stack:
+                sk.documents += 1
+        elif tok == ",":
+            expect_key = bool(stack) and stack[-1][0] == "obj"
+        elif tok == ":":
+            continue
+        else:
+            path, depth = value_path()
+            if stack and stack[-1][0] == "arr":
+                stack[-1][3] += 1
+            sk.record(path, "str" if tok == "str" else _atom_type(val or ""), depth=depth)
+    # unterminated input (truncated file): report what was open
+    while stack:
+        kind, path, depth, count, _ = stack.pop()
+        sk.record(path, "object" if kind == "obj" else "array", None, depth)
+    return sk
+
+
+_YAML_KEY = re.compile(r"""(?P<key>"[^"]*"|'[^']*'|[^\s#'"{\[][^:#]*?)\s*:(?:\s+(?P<value>.*?))?\s*$""")
+
+
+def _scalar_type(raw: str) -> str:
+    value = raw.strip()
+    if not value or value in ("~", "null", "Null", "NULL"):
+        return "null"
+    if value[0] in "\"'":
+        return "str"
+    if value[0] in "|>":
+        return "str"
+    if value[0] == "{":
+        return "object"
+    if value[0] == "[":
+        return "array"
+    if value.lower() in ("true", "false", "yes", "no", "on", "off"):
+        return "bool"
+    if re.fullmatch(r"[-+]?\d[\d_]*", value):
+        return "int"
+    if re.fullmatch(r"[-+]?(\d[\d_]*)?\.\d+([eE][-+]?\d+)?|[-+]?\.(inf|Inf)|\.nan", value):
+        return "float"
+    return "str"
+
+
+def _strip_inline_comment(text: str) -> str:
+    quote = None
+    for j, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "\"'" and (j == 0 or text[j - 1] in " \t:[{,-"):
+            quote = ch
+        elif ch == "#" and (j == 0 or text[j - 1] in " \t"):
+            return text[:j].rstrip()
+    return text.rstrip()
+
+
+def _lines(stream: TextIO, sk: Skeleton) -> Iterator[str]:
+    read = 0
+    for line in stream:
+        read += len(line)
+        if read > MAX_SCAN_BYTES:
+            sk.truncated = True
+            return
+        yield line.rstrip("\r\n")
+
+
+def _yaml_skeleton(stream: TextIO) -> Skeleton:
+    sk = Skeleton()
+    # open containers: [indent of children, path, depth, "map"|"seq", child count]
+    stack: List[list] = []
+    pending: Optional[Tuple[str, int, int]] = None  # "key:" awaiting a nested block
+    block_indent: Optional[int] = None
+
+    def close(frame: list) -> None:
+        sk.record(frame[1], "array" if frame[3] == "seq" else "object", frame[4], frame[2])
+
+    def end_document() -> None:
+        nonlocal pending
+        if pending:
+            sk.record(pending[0], "null", depth=pending[1])
+            pending = None
+        while stack:
+            close(stack.pop())
+        sk.documents += 1
+
+    for raw in _lines(stream, sk):
+        stripped = raw.strip()
+        indent = len(raw) - len(raw.lstrip(" "))
+        if block_indent is not None:
+            if not stripped or indent > block_indent:
+                continue
+            block_indent = None
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped in ("---", "...") or stripped.startswith("--- "):
+            if stack or pending:
+                end_document()
+            continue
+        text = _strip_inline_comment(stripped)
+        is_item = text == "-" or text.startswith("- ")
+        if pending:
+            path, depth, key_indent = pending
+            pending = None
+            if indent > key_indent or (indent == key_indent and is_item):
+                stack.append([indent, path, depth, "seq" if is_item else "map", 0])
+                sk.record(path, "array" if is_item else "object", depth=depth)
+            else:
+                sk.record(path, "null", depth=depth)
+        while stack and (stack[-1][0] > indent or (stack[-1][0] == indent and (stack[-1][3] == "seq") != is_item)):
+            close(stack.pop())
+        if not stack:
+            stack.append([indent, "$", 0, "seq" if is_item else "map", 0])
+            sk.record("$", "array" if is_item else "object", depth=0)
+        frame = stack[-1]
+        frame[4] += 1
+        if is_item:
+            item_path, item_depth = f"{frame[1]}[]", frame[2] + 1
+            item = text[1:].lstrip()
+            if not item:
+                pending = (item_path, item_depth, indent)
+                continue
+            if _YAML_KEY.match(item) is None:
+                sk.record(item_path, _scalar_type(item), depth=item_depth)
+                continue
+            # "- key: value" opens a mapping whose keys sit after the dash
+            indent = indent + (len(text) - len(item))
+            frame = [indent, item_path, item_depth, "map", 1]
+            stack.append(frame)
+            sk.record(item_path, "object", depth=item_depth)
+            text = item
+        m = _YAML_KEY.match(text)
+        if m is None:
+            sk.record(frame[1], _scalar_type(text), depth=frame[2])
+            continue
+        path, depth = _child(frame[1], m.group("key").strip("\"'"), frame[4] - 1), frame[2] + 1
+        value = m.group("value") or ""
+        if not value:
+            pending = (path, depth, indent)
+            continue
+        if value[0] in "|>":
+            block_indent = indent
+        sk.record(path, _scalar_type(value), depth=depth)
+    if stack or pending:
+        end_document()
+    return sk
+
+
+_TOML_TABLE = re.compile(r"\[\[?\s*([^\]]+?)\s*\]\]?")
+_TOML_KEY = re.compile(r"""((?:"[^"]*"|'[^']*'|[\w-]+)(?:\s*\.\s*(?:"[^"]*"|'[^']*'|[\w-]+))*)\s*=\s*(.*)""")
+
+
+def _toml_key_parts(raw: str) -> List[str]:
+    return [p.strip().strip("\"'") for p in re.findall(r"""\s*("[^"]*"|'[^']*'|[^.]+)\s*\.?""", raw)]
+
+
+def _toml_skeleton(stream: TextIO) -> Skeleton:
+    sk = Skeleton()
+    sk.record("$", "object", depth=0)
+    table, table_depth = "$", 0
+    array_tables: Dict[str, int] = {}
+    in_multiline: Optional[str] = None
+    open_brackets = 0
+    for raw in _lines(stream, sk):
+        line = raw.strip()
+        if in_multiline:
+            if in_multiline in line:
+                in_multiline = None
+            continue
+        if open_brackets:
+            open_brackets += line.count("[") - line.count("]")
+            open_brackets = max(0, open_brackets)
+            continue
+        if not line or line.startswith("#"):
+            continue
+        m = _TOML_TABLE.fullmatch(_strip_inline_comment(line))
+        if m and line.startswith("["):
+            table, table_depth = "$", 0
+            for part in _toml_key_parts(m.group(1)):
+                table, table_depth = _child(table, part, 0), table_depth + 1
+            if line.startswith("[["):
+                sk.record(table, "array", depth=table_depth)
+                array_tables[table] = array_tables.get(table, 0) + 1
+                table = f"{table}[]"
+            sk.record(table, "object", depth=table_depth)
+            continue
+        m = _TOML_KEY.match(line)
+        if not m:
+            continue
+        path, depth = table, table_depth
+        for part in _toml_key_parts(m.group(1)):
+            path, depth = _child(path, part, 0), depth + 1
+        value = m.group(2).strip()
+        for quote in ('"""', "'''"):
+            if value.startswith(quote) and value.count(quote) == 1:
+                in_multiline = quote
+        if value.startswith("["):
+            open_brackets = max(0, value.count("[") - value.count("]"))
+            kind = "array"
+        elif value.startswith("{"):
+            kind = "object"
+        elif value[:1] in "\"'":
+            kind = "str"
+        elif re.match(r"\d{4}-\d{2}-\d{2}", value):
+            kind = "datetime"
+        else:
+            kind = _scalar_type(_strip_inline_comment(value))
+        sk.record(path, kind, depth=depth)
+    for path, count in array_tables.items():
+        sk.record(path, "array", count, path.count(".") + path.count("["))
+    return sk
+
+
+SKELETONS: Dict[str, Callable[[TextIO], Skeleton]] = {
+    ".json": _json_skeleton,
+    ".yaml": _yaml_skeleton,
+    ".yml": _yaml_skeleton,
+    ".toml": _toml_skeleton,
+}
+
+
+def register_skeleton(extensions: Iterable[str], scanner: Callable[[TextIO], Skeleton]) -> None:
+    """Use ``scanner`` (text stream -> skeleton) for files with these extensions."""
+    for ext in extensions:
+        SKELETONS[ext.lower()] = scanner
+
+
+class ChunkStream(io.TextIOBase):
+    """Read-only text stream over an iterator of string chunks, for text that is never held whole."""
+
+    def __init__(self, chunks: Iterable[str]) -> None:
+        self._chunks = iter(chunks)
+        self._buf = ""
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def _more(self) -> bool:
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        while (size is None or size < 0 or len(self._buf) - self._pos < size) and self._more():
+            pass
+        end = len(self._buf) if size is None or size < 0 else min(len(self._buf), self._pos + size)
+        out, self._pos = self._buf[self._pos:end], end
+        return out
+
+    def readline(self, size: Optional[int] = -1) -> str:
+        newline = self._buf.find("\n", self._pos)
+        while newline == -1 and self._more():
+            newline = self._buf.find("\n", self._pos)
+        end = len(self._buf) if newline == -1 else newline + 1
+        if size is not None and size >= 0:
+            end = min(end, self._pos + size)
+        out, self._pos = self._buf[self._pos:end], end
+        return out
+
+
+def structure_summary(path: Path, content: Union[str, TextIO], max_lines: int) -> Optional[str]:
+    """Skeleton summary for a data file, or None when no scanner is registered.
+
+    ``content`` is the file's text as loaded, or a stream of it (see
+    ``ChunkStream``) when the file is too large to hold.
+    """
+    scanner = SKELETONS.get(path.suffix.lower())
+    if scanner is None:
+        return None
+    stream = io.StringIO(content) if isinstance(content, str) else content
+    return "\n".join(scanner(stream).lines(max_lines)) or None
@@ -1,34 +1,60 @@
 from pathlib import Path
-import ast
 
-def summarize(path: Path, content: str, max_lines: int = 60) -> str:
+from .analysis import analyze_python
+from .outline import extract_outline, format_outline
+from .structure import structure_summary
+from .notebook import summarize_notebook
+
+def summarize(path: Path, content: str, max_lines: int = 60, view=None, analysis=None, skeleton=None) -> str:
+    """Summarize a file; ``view`` (a ``MaskedView`` of ``content``) masks what is emitted.
+
+    ``analysis`` is the file's shared ``PythonAnalysis`` and ``skeleton`` its
+    structure summary ("" for none); each is computed from ``content`` when
+    not supplied.
+    """
     ext = path.suffix.lower()
     if ext == ".py":
-        try:
-            tree = ast.parse(content)
-            funcs = [n.name for n in tree.body if isinstance(n, ast.FunctionDef)]
-            clss = [n.name for n in tree.body if isinstance(n, ast.ClassDef)]
-            imps: list[str] = []
-            for n in tree.body:
-                if isinstance(n, ast.Import):
-                    imps.extend([a.name for a in n.names])
-                if isinstance(n, ast.ImportFrom):
-                    imps.extend([a.name for a in n.names])
+        if analysis is None:
+            analysis = analyze_python(content)
+        if analysis is not None:
             lines: list[str] = []
-            if imps:
-                lines.append(f"- imports: {', '.join(imps)[:200]}")
-            if clss:
-                lines.append(f"- classes: {', '.join(clss)[:200]}")
-            if funcs:
-                lines.append(f"- functions: {', '.join(funcs)[:200]}")
-            return "\n".join(lines) or "- (no symbols)"
-        except Exception:
-            pass
+            if analysis.imports:
+                lines.append(f"- imports: {', '.join(analysis.imports)[:200]}")
+            if analysis.classes:
+                lines.append(f"- classes: {', '.join(analysis.classes)[:200]}")
+            if analysis.functions:
+                lines.append(f"- functions: {', '.join(analysis.functions)[:200]}")
+            out = "\n".join(lines) or "- (no symbols)"
+            return view.mask_derived(out) if view is not None else out
     if ext in {".md", ".markdown"}:
-        heads = [ln.strip() for ln in content.splitlines() if ln.strip().startswith("#")][:10]
-        return "\n".join([f"- {h}" for h in heads]) or _first_lines(content, max_lines)
-    return _first_lines(content, max_lines)
+        heads: list[str] = []
+        pos = 0
+        for ln in content.splitlines(keepends=True):
+            if ln.strip().startswith("#"):
+                raw = view.region(pos, pos + len(ln)) if view is not None else ln
+                heads.append(raw.strip())
+                if len(heads) == 10:
+                    break
+            pos += len(ln)
+        if heads:
+            return "\n".join([f"- {h}" for h in heads])
+    if ext == ".ipynb":
+        outline = summarize_notebook(content, max_lines)
+        if outline:
+            return view.mask_derived(outline) if view is not None else outline
+    if skeleton is None:
+        skeleton = structure_summary(path, content, max_lines)
+    if skeleton:
+        return view.mask_derived(skeleton) if view is not None else skeleton
+    outline = extract_outline(path, content) if ext != ".py" else None
+    if outline:
+        out = format_outline(outline)
+        return view.mask_derived(out) if view is not None else out
+    return _first_lines(content, max_lines, view)
 
-def _first_lines(content: str, max_lines: int) -> str:
+def _first_lines(content: str, max_lines: int, view=None) -> str:
+    if view is not None:
+        end = sum(len(ln) for ln in content.splitlines(keepends=True)[:max_lines])
+        content = view.region(0, end)
     lines = content.splitlines()[:max_lines]
     return "\n".join([f"- {ln}" for ln in lines if ln.strip()])
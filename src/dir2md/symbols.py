@@ -0,0 +1,112 @@
+"""Repository-wide symbol index.
+
+Definitions come from the same passes that feed summaries: ``analyze_python``
+for Python (exact line spans, methods scoped to their class) and the
+registered outliners for other languages (start line only). The index is
+emitted as a compact blueprint section, as ``{"symbol": ...}`` JSONL records
+and as an Exuberant-ctags ``tags`` file, so a lookup is one read instead of
+a re-scan of the repository.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from .analysis import PythonAnalysis, analyze_python
+from .outline import extract_outline
+
+
+@dataclass(frozen=True)
+class SymbolDef:
+    """Where a name is defined; ``end_line`` is None when the outliner cannot tell."""
+
+    name: str
+    kind: str
+    path: str  # relative to the root, POSIX separators
+    line: int
+    end_line: Optional[int]
+    scope: Optional[str] = None  # enclosing class for Python methods
+
+    @property
+    def qualname(self) -> str:
+        return f"{self.scope}.{self.name}" if self.scope else self.name
+
+    @property
+    def span(self) -> str:
+        if self.end_line and self.end_line != self.line:
+            return f"{self.line}-{self.end_line}"
+        return str(self.line)
+
+
+def _python_symbols(rel: str, content: str, analysis: Optional[PythonAnalysis] = None) -> List[SymbolDef]:
+    if analysis is None:
+        analysis = analyze_python(content)
+    if analysis is None:
+        return []
+    out: List[SymbolDef] = []
+    enclosing: List[tuple[int, str, Optional[str]]] = []  # (end, kind, class qualname)
+    for s in sorted(analysis.symbols, key=lambda s: (s.lineno, -s.end_lineno)):
+        while enclosing and s.lineno > enclosing[-1][0]:
+            enclosing.pop()
+        parent_kind, scope = (enclosing[-1][1], enclosing[-1][2]) if enclosing else (None, None)
+        if parent_kind == "function":
+            enclosing.append((s.end_lineno, "function", None))
+            continue  # local helper, not addressable from other files
+        kind = "method" if s.kind == "function" and scope else s.kind
+        sym = SymbolDef(s.name, kind, rel, s.lineno, s.end_lineno, scope)
+        out.append(sym)
+        enclosing.append((s.end_lineno, s.kind, sym.qualname if s.kind == "class" else None))
+    return out
+
+
+def extract_symbols(path: Path, rel: str, content: str, analysis: Optional[PythonAnalysis] = None) -> List[SymbolDef]:
+    """Definitions in ``content``, the unmodified text of ``path`` (``analysis`` is its parse, if known)."""
+    if path.suffix.lower() == ".py":
+        return _python_symbols(rel, content, analysis)
+    items = extract_outline(path, content) or []
+    return [
+        SymbolDef(item.name, item.kind, rel, item.line, None)
+        for item in items
+        if item.kind not in ("package", "export")
+    ]
+
+
+def sort_symbols(symbols: Iterable[SymbolDef]) -> List[SymbolDef]:
+    return sorted(symbols, key=lambda s: (s.qualname, s.path, s.line))
+
+
+def format_symbol_index(symbols: List[SymbolDef]) -> str:
+    """One ``qualname kind path:span`` line per definition, sorted by name."""
+    return "\n".join(f"{s.qualname} {s.kind} {s.path}:{s.span}" for s in symbols)
+
+
+def symbol_record(sym: SymbolDef) -> dict:
+    record = {"name": sym.qualname, "kind": sym.kind, "path": sym.path, "line": sym.line}
+    if sym.end_line is not None:
+        record["end_line"] = sym.end_line
+    return record
+
+
+def to_ctags(symbols: List[SymbolDef]) -> str:
+    """Exuberant-ctags extended format, sorted by tag name as ``readtags`` expects."""
+    lines = [
+        "!_TAG_FILE_FORMAT\t2\t/extended format/",
+        "!_TAG_FILE_SORTED\t1\t/0=unsorted, 1=sorted, 2=foldcase/",
+        "!_TAG_PROGRAM_NAME\tdir2md\t//",
+    ]
+    rows = []
+    for s in symbols:
+        fields = [f"kind:{s.kind}", f"line:{s.line}"]
+        if s.scope:
+            fields.append(f"class:{s.scope}")
+        if s.end_line is not None:
+            fields.append(f"end:{s.end_line}")
+        rows.append(f"{s.name}\t{s.path}\t{s.line};\"\t" + "\t".join(fields))
+    lines.extend(sorted(rows))
+    return "\n".join(lines) + "\n"
+
+
+def write_ctags(symbols: List[SymbolDef], out: Path) -> None:
+    """Write the index as a ctags file."""
+    out.write_text(to_ctags(symbols), encoding="utf-8")
@@ -0,0 +1,146 @@
+"""Directory tree with du-style aggregates.
+
+``collect_files`` builds a ``TreeNode`` per walked directory and folds file
+counts, bytes, omitted files and extension counts into every ancestor as the
+walk unwinds, so the totals cost no second pass. ``render_tree`` prints the
+tree, optionally bounded: directories below ``max_depth`` or whose files are
+all omitted collapse to one aggregate line, and entries past ``max_entries``
+in a directory are summed into a ``... N more`` line. ``fit_tree`` tightens
+those bounds until the tree fits its share of the token budget.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from .token import CHARS_PER_TOKEN
+
+AGGREGATE_TOP_EXTENSIONS = 3
+TREE_BUDGET_SHARE = 0.2  # of budget_tokens, when file contents are emitted too
+
+
+@dataclass
+class TreeNode:
+    """A walked directory and the totals of everything below it."""
+
+    name: str
+    dirs: List["TreeNode"] = field(default_factory=list)
+    files: List[Tuple[str, int]] = field(default_factory=list)  # (name, bytes) directly inside
+    file_count: int = 0
+    size: int = 0
+    omitted: int = 0  # files below that match the omit globs
+    exts: Counter = field(default_factory=Counter)
+
+    def add_file(self, name: str, size: int, omitted: bool) -> None:
+        self.files.append((name, size))
+        self.file_count += 1
+        self.size += size
+        self.omitted += omitted
+        self.exts[_ext(name)] += 1
+
+    def absorb(self, child: "TreeNode") -> None:
+        """Fold a walked subdirectory's totals into this one."""
+        self.dirs.append(child)
+        self.file_count += child.file_count
+        self.size += child.size
+        self.omitted += child.omitted
+        self.exts.update(child.exts)
+
+
+def _ext(name: str) -> str:
+    return "." + name.rsplit(".", 1)[-1].lower() if "." in name.lstrip(".") else "(none)"
+
+
+def _human_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def _human_count(n: float) -> str:
+    for unit in ("", "k", "M"):
+        if n < 1000 or unit == "M":
+            return f"{n:.0f}{unit}" if not unit else f"{n:.1f}{unit}"
+        n /= 1000
+    return f"{n:.1f}M"
+
+
+def format_aggregate(files: int, size: int, exts: Counter) -> str:
+    """``[12 files, 4.2 KB, ~1.1k tok: .py 9, .md 3]``; tokens are estimated from bytes."""
+    top = ", ".join(f"{ext} {n}" for ext, n in sorted(exts.items(), key=lambda kv: (-kv[1], kv[0]))[:AGGREGATE_TOP_EXTENSIONS])
+    label = "file" if files == 1 else "files"
+    out = f"[{files} {label}, {_human_bytes(size)}, ~{_human_count(size / CHARS_PER_TOKEN)} tok"
+    return out + (f": {top}]" if top else "]")
+
+
+def render_tree(root: TreeNode, label: str, max_depth: Optional[int] = None, max_entries: Optional[int] = None) -> List[str]:
+    """Tree lines in ``|-- name`` form; unbounded output lists every entry."""
+    bounded = max_depth is not None or max_entries is not None
+    lines = [label]
+
+    def emit(node: TreeNode, prefix: str, depth: int) -> None:
+        entries: List[Tuple[str, Optional[TreeNode], int]] = [(d.name, d, d.size) for d in node.dirs]
+        entries.extend((name, None, size) for name, size in node.files)
+        hidden: List[Tuple[str, Optional[TreeNode], int]] = []
+        if max_entries is not None and len(entries) > max_entries:
+            entries, hidden = entries[: max(0, max_entries - 1)], entries[max(0, max_entries - 1):]
+        for i, (name, child, _) in enumerate(entries):
+            last = i == len(entries) - 1 and not hidden
+            joint = "`-- " if last else "|-- "
+            if child is None:
+                lines.append(f"{prefix}{joint}{name}")
+                continue
+            low_value = child.file_count > 0 and child.omitted == child.file_count
+            if bounded and child.file_count and (low_value or (max_depth is not None and depth >= max_depth)):
+                lines.append(f"{prefix}{joint}{name}/ {format_aggregate(child.file_count, child.size, child.exts)}")
+                continue
+            lines.append(f"{prefix}{joint}{name}")
+            emit(child, prefix + ("    " if last else "|   "), depth + 1)
+        if hidden:
+            files, size, exts = 0, 0, Counter()
+            for name, child, entry_size in hidden:
+                if child is None:
+                    files, size = files + 1, size + entry_size
+                    exts[_ext(name)] += 1
+                else:
+                    files, size = files + child.file_count, size + child.size
+                    exts.update(child.exts)
+            lines.append(f"{prefix}`-- ... {len(hidden)} more {format_aggregate(files, size, exts)}")
+
+    emit(root, "", 0)
+    return lines
+
+
+def fit_tree(
+    root: TreeNode,
+    label: str,
+    max_depth: Optional[int],
+    max_entries: Optional[int],
+    budget: int,
+    cost: Callable[[str], int],
+) -> List[str]:
+    """``render_tree`` within ``budget`` tokens: lower the depth first, then halve the entry cap."""
+    depth = max_depth
+    entries = max_entries
+    lines = render_tree(root, label, depth, entries)
+    while cost("\n".join(lines)) > budget:
+        if depth is None or depth > 0:
+            depth = _depth(root) - 1 if depth is None else depth - 1
+            depth = max(depth, 0)
+        elif entries is None or entries > 1:
+            entries = max(1, (entries or _widest(root)) // 2)
+        else:
+            break  # one aggregate line per root entry is as small as the tree gets
+        lines = render_tree(root, label, depth, entries)
+    return lines
+
+
+def _depth(node: TreeNode) -> int:
+    return 1 + max((_depth(d) for d in node.dirs), default=0)
+
+
+def _widest(node: TreeNode) -> int:
+    return max([len(node.dirs) + len(node.files)] + [_widest(d) for d in node.dirs])
@@ -10,6 +10,7 @@ except Exception:
     PathSpec = None  # type: ignore
 
 from .gitignore import build_gitignore_matcher
+from .tree import TreeNode
 
 
 _GLOB_SPECIAL_CHARS = set("*?[")
@@ -91,8 +92,12 @@ def collect_files(
     respect_gitignore: bool,
     follow_symlinks: bool,
     stats,
-) -> tuple[List[Path], List[str], Callable[[Path], bool], Callable[[Path], bool]]:
-    """Walk the tree and return (files, tree_lines, is_included, is_omitted)."""
+) -> tuple[List[Path], TreeNode, Callable[[Path], bool], Callable[[Path], bool]]:
+    """Walk the tree and return (files, tree, is_included, is_omitted).
+
+    ``tree`` carries per-directory totals gathered by this walk; render it
+    with ``tree.render_tree`` or ``tree.fit_tree``.
+    """
     gitignore = build_gitignore_matcher(root) if respect_gitignore else None
     include_spec = _compile_pathspec(include_globs)
     exclude_spec = _compile_pathspec(exclude_globs)
@@ -111,26 +116,29 @@ def collect_files(
             return True
         return _matches_spec(include_spec, root, p)
 
-    tree_lines: list[str] = [str(root)]
+    tree = TreeNode(str(root))
     files: list[Path] = []
 
-    def walk(current: Path, prefix: str = "") -> None:
+    def walk(current: Path, node: TreeNode) -> None:
         stats.total_dirs += 1
         try:
             entries = sorted(list(current.iterdir()), key=lambda x: (not x.is_dir(), x.name.lower()))
         except PermissionError:
             return
         entries = [e for e in entries if not is_ignored(e)]
-        for i, child in enumerate(entries):
-            last = i == len(entries) - 1
-            joint = "`-- " if last else "|-- "
-            tree_lines.append(f"{prefix}{joint}{child.name}")
+        for child in entries:
             if child.is_dir():
-                if child.is_symlink() and not follow_symlinks:
-                    continue
-                walk(child, prefix + ("    " if last else "|   "))
+                sub = TreeNode(child.name)
+                if not child.is_symlink() or follow_symlinks:
+                    walk(child, sub)
+                node.absorb(sub)
             else:
+                try:
+                    size = child.stat().st_size
+                except OSError:
+                    size = 0
+                node.add_file(child.name, size, is_omitted(child))
                 files.append(child)
 
-    walk(root)
-    return files, tree_lines, is_included, is_omitted
+    walk(root, tree)
+    return files, tree, is_included, is_omitted
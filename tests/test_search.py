@@ -13,3 +13,18 @@ def test_match_query_snippet_miss():
     score, snippet = match_query_snippet(text, "missing")
     assert score == 0
     assert snippet == ""
+
+
+def test_query_matches_and_windows_share_one_scan():
+    from dir2md.search import find_query_matches, match_windows
+
+    text = "".join(f"line {i}{' needle' if i in (3, 5, 40) else ''}\n" for i in range(50))
+    score, start, end, offsets = find_query_matches(text, "NEEDLE")
+    assert score == 3 and len(offsets) == 3 and text[offsets[0]:offsets[0] + 6] == "needle"
+    assert start < offsets[0] < end
+    line_starts = [0]
+    for ln in text.splitlines(keepends=True):
+        line_starts.append(line_starts[-1] + len(ln))
+    # Hits on lines 3 and 5 overlap once widened by two lines; line 40 stands alone.
+    assert match_windows(line_starts, offsets, 2) == [(1, 8, 2), (38, 43, 1)]
+    assert find_query_matches(text, "absent") == (0, 0, 0, [])
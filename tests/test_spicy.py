@@ -1,4 +1,5 @@
 from dir2md.spicy import evaluate_spicy
+from dir2md.masking import SecretHit
 from dir2md.core import Config, Stats
 from pathlib import Path
 
@@ -43,3 +44,69 @@ def test_spicy_warn_masking_off():
     assert score >= 5
     assert counts.get("warn", 0) >= 1
     assert any("masking" in f.message for f in findings)
+
+
+def test_spicy_flags_watchdog_disabled_mask_pattern():
+    cfg = dummy_cfg()
+    cfg.masking_mode = "basic"
+    cfg.mask_disabled_rules = {r"(a+)+$": "exceeded 0.5s on slow.txt"}
+    score, counts, findings = evaluate_spicy(cfg, Stats(), [], [])
+    assert counts["high"] == 1
+    assert any("(a+)+$" in f.message for f in findings)
+
+
+def test_spicy_reports_masked_secrets_by_rule_severity():
+    cfg = dummy_cfg()
+    cfg.masking_mode = "basic"
+    hits = [
+        SecretHit("PRIVATE_KEY", "id_rsa", 1),
+        SecretHit("AWS_ACCESS_KEY_ID", "conf.py", 7),
+        SecretHit("AWS_ACCESS_KEY_ID", "conf.py", 3),
+    ]
+    score, counts, findings = evaluate_spicy(cfg, Stats(), [], [], secret_hits=hits)
+    assert counts["critical"] == 1
+    assert counts["high"] == 1
+    aws = next(f for f in findings if f.file == "conf.py")
+    assert aws.line == 3 and "2 AWS_ACCESS_KEY_ID matches" in aws.message
+    assert score >= 50
+
+
+def test_spicy_labels_only_written_hits_as_masked_in_output():
+    cfg = dummy_cfg()
+    cfg.masking_mode = "basic"
+    written = SecretHit("AWS_ACCESS_KEY_ID", "conf.py", 3)
+    hits = [written, SecretHit("AWS_ACCESS_KEY_ID", "conf.py", 9)]
+    _, _, findings = evaluate_spicy(cfg, Stats(), [], [], secret_hits=hits, written_hits=[written])
+    assert sorted((f.line, f.message) for f in findings if f.file == "conf.py") == [
+        (3, "1 AWS_ACCESS_KEY_ID match masked in output"),
+        (9, "1 AWS_ACCESS_KEY_ID match found in the repository"),
+    ]
+
+
+def test_spicy_strict_scans_files_that_were_not_emitted(tmp_path: Path):
+    import json
+    from dataclasses import replace
+    from dir2md.core import generate_markdown_report
+
+    (tmp_path / "a_main.py").write_text("".join(f"VALUE_{i} = {i}\n" for i in range(60)), encoding="utf-8")
+    cfg = replace(
+        dummy_cfg(), root=tmp_path, output=tmp_path / "OUT.md", max_bytes=100_000, max_lines=1000,
+        llm_mode="inline", budget_tokens=1000, max_file_tokens=1000, masking_mode="basic", output_format="json",
+    )
+    # A budget that holds a_main.py and nothing else
+    budget = json.loads(generate_markdown_report(replace(cfg)))["stats"]["est_tokens_prompt"]
+    (tmp_path / "z_conf.py").write_text("KEY = 'AKIA1234567890ABCD12'\n", encoding="utf-8")
+
+    bundle = json.loads(generate_markdown_report(replace(cfg, budget_tokens=budget)))
+    assert [f["path"] for f in bundle["files"]] == ["a_main.py"]
+    assert not any("AWS_ACCESS_KEY_ID" in f["message"] for f in bundle["spicy"]["findings"])
+
+    bundle = json.loads(generate_markdown_report(replace(cfg, budget_tokens=budget, spicy_strict=True)))
+    aws = [f for f in bundle["spicy"]["findings"] if "AWS_ACCESS_KEY_ID" in f["message"]]
+    assert [(f["file"], f["line"], f["severity"]) for f in aws] == [("z_conf.py", 1, "high")]
+    assert aws[0]["message"].endswith("found in the repository")
+
+    # The scan reads candidates as the selector loaded them: capped at max_bytes
+    (tmp_path / "z_conf.py").write_text("x = 1\n" * 20 + "KEY = 'AKIA1234567890ABCD12'\n", encoding="utf-8")
+    bundle = json.loads(generate_markdown_report(replace(cfg, budget_tokens=budget, spicy_strict=True, max_bytes=60)))
+    assert not any("AWS_ACCESS_KEY_ID" in f["message"] for f in bundle["spicy"]["findings"])
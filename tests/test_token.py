@@ -6,3 +6,64 @@ def test_estimate_tokens_basics():
     assert estimate_tokens("abcd") == 1
     assert estimate_tokens("abcdefgh") == 2  # 8 chars -> 2 tokens with ceil
     assert estimate_tokens("a" * 9) == 3  # round up
+
+
+def _train_merges(corpus: str, n: int) -> list[str]:
+    """Tiny GPT-2 style merges.txt learned from ``corpus`` (ASCII only)."""
+    from collections import Counter
+    from dir2md.token import _PRETOKEN
+
+    words = Counter(tuple(p.replace(" ", "Ġ").replace("\n", "Ċ")) for p in _PRETOKEN.findall(corpus))
+    merges = []
+    for _ in range(n):
+        pairs = Counter()
+        for w, c in words.items():
+            for pair in zip(w, w[1:]):
+                pairs[pair] += c
+        if not pairs:
+            break
+        (a, b), _ = pairs.most_common(1)[0]
+        merges.append(f"{a} {b}")
+        merged = Counter()
+        for w, c in words.items():
+            out, i = [], 0
+            while i < len(w):
+                if w[i:i + 2] == (a, b):
+                    out.append(a + b)
+                    i += 2
+                else:
+                    out.append(w[i])
+                    i += 1
+            merged[tuple(out)] += c
+        words = merged
+    return merges
+
+
+def test_bpe_tokenizer_counts_and_switches(tmp_path):
+    import base64
+    from dir2md.token import BPETokenizer, get_tokenizer, set_tokenizer
+    from dir2md.samplers.semantic import SemanticSampler
+
+    corpus = "".join(f"def handler_{i}(request, response):\n    return response.send(request.body)\n\n" for i in range(50))
+    merges = tmp_path / "merges.txt"
+    merges.write_text("#version: 0.2\n" + "\n".join(_train_merges(corpus, 60)) + "\n", encoding="utf-8")
+    bpe = BPETokenizer.from_file(merges)
+    assert bpe.count_exact(" return") == 1
+    exact = bpe.count_exact(corpus)
+    assert abs(bpe.count(corpus) - exact) <= exact * 0.03
+    assert bpe.count_batch(["return", "", "return response"]) == [bpe.count("return"), 0, bpe.count("return response")]
+
+    # .tiktoken rank files load to the same table
+    ranks = tmp_path / "vocab.tiktoken"
+    ranks.write_text("\n".join(f"{base64.b64encode(tok).decode()} {rank}" for tok, rank in bpe.ranks.items()), encoding="utf-8")
+    assert BPETokenizer.from_file(ranks).count(corpus) == bpe.count(corpus)
+
+    try:
+        set_tokenizer(bpe)
+        assert estimate_tokens(corpus) == bpe.count(corpus) != -(-len(corpus) // 4)
+        sampled, stats = SemanticSampler().sample_python_code(corpus, max_tokens=150)
+        assert stats["method"] == "ast_semantic" and stats["tokens"] == bpe.count(sampled) <= 150
+    finally:
+        set_tokenizer(None)
+    assert type(get_tokenizer()).__name__ == "Tokenizer"
+    assert estimate_tokens("a" * 9) == 3